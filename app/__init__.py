@@ -10,6 +10,9 @@ from .config.config import FLASK_CONFIG, MAIL_CONFIG
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
+    # Spool, hash and size-limit uploads while they are parsed
+    from .services.upload_stream import UploadRequest
+    app.request_class = UploadRequest
     
     # Configure logging
     logging.basicConfig(
@@ -21,14 +24,7 @@ def create_app():
     app.config.update(FLASK_CONFIG)
     
     # Configure mail settings
-    app.config.update({
-        'MAIL_SERVER': 'smtp.gmail.com',
-        'MAIL_PORT': 587,
-        'MAIL_USE_TLS': True,
-        'MAIL_USERNAME': os.getenv('MAIL_USERNAME'),
-        'MAIL_PASSWORD': os.getenv('MAIL_PASSWORD'),
-        'MAIL_DEFAULT_SENDER': os.getenv('MAIL_USERNAME')
-    })
+    app.config.update(MAIL_CONFIG)
     
     # Initialize extensions
     mail = Mail(app)
@@ -40,5 +36,13 @@ def create_app():
     
     # Create required directories
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    
-    return app 
\ No newline at end of file
+
+    # Warm up shared state so forked workers serve their first request warm
+    app.warmup_state = {'ready': False, 'steps': {}}
+    if app.config.get('WARMUP_ON_STARTUP'):
+        from .services.warmup import warm_up
+        warm_up(app)
+    else:
+        app.warmup_state['ready'] = True
+
+    return app
\ No newline at end of file
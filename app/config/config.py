@@ -9,6 +9,9 @@ load_dotenv()
 # Flask Configuration
 UPLOAD_FOLDER = 'uploads'
 REPORTS_FOLDER = 'app/static/reports'
+DATA_FOLDER = 'data'
+# Uploaded content and everything derived from it is kept for 24 hours
+RETENTION_SECONDS = 24 * 60 * 60
 ALLOWED_EXTENSIONS = {
     'pdf', 'doc', 'docx', 'xls', 'xlsx',
     'txt', 'csv', 'md', 'rtf', 'ppt', 'pptx'
@@ -31,10 +34,25 @@ REPORT_CONFIG = {
     'charts': {
         'default_size': (4, 3),
         'bar_color': '#4d6df3',
-        'max_percentage': 100
+        'max_percentage': 100,
+        # 'matplotlib' embeds PNG charts, 'vector' draws them natively with fpdf
+        'renderer': os.getenv('TRENDLYZER_CHART_RENDERER', 'matplotlib')
+    },
+    # Render PDFs on first download instead of during analysis
+    'lazy_render': os.getenv('TRENDLYZER_LAZY_REPORTS', '1') == '1',
+    # Post-layout image optimization before the PDF is written
+    'optimize': {
+        'enabled': os.getenv('TRENDLYZER_OPTIMIZE_PDF', '1') == '1',
+        'image_dpi': 150,  # downsample images above this resolution at their displayed size
+        'palette_colors': 256  # indexed palette for charts and other non-JPEG images, 0 keeps RGB
     }
 }
 
+# In-process LRU cache of rendered chart PNGs (per worker process)
+CHART_CACHE_CONFIG = {
+    'max_bytes': int(os.getenv('TRENDLYZER_CHART_CACHE_BYTES', 32 * 1024 * 1024))
+}
+
 # Theme Mapping
 THEME_MAPPING = {
     'Lead Capture': ['email', 'phone', 'contact', 'address'],
@@ -53,18 +71,181 @@ LOCATIONS = [
 
 # Email Configuration
 MAIL_CONFIG = {
-    'MAIL_SERVER': 'smtp.gmail.com',
-    'MAIL_PORT': 587,
-    'MAIL_USE_TLS': True,
+    'MAIL_SERVER': os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+    'MAIL_PORT': int(os.getenv('MAIL_PORT', '587')),
+    'MAIL_USE_TLS': os.getenv('MAIL_USE_TLS', '1') == '1',
     'MAIL_USERNAME': os.getenv("MAIL_USERNAME"),
     'MAIL_PASSWORD': os.getenv("MAIL_PASSWORD"),
     'MAIL_DEFAULT_SENDER': os.getenv("MAIL_USERNAME")
 }
 
+# Server-side storage for /results (the session cookie only holds the id)
+RESULT_STORE_CONFIG = {
+    'path': os.path.join(DATA_FOLDER, 'results.sqlite3'),
+    'ttl_seconds': RETENTION_SECONDS
+}
+
+# Report specs and render-once PDF cache for lazily rendered reports
+REPORT_STORE_CONFIG = {
+    'folder': os.path.join(DATA_FOLDER, 'reports'),
+    'ttl_seconds': RETENTION_SECONDS
+}
+
+# Per-company metric history with daily/weekly/monthly rollups (kept
+# indefinitely; it holds only aggregate numbers, no document content)
+TREND_STORE_CONFIG = {
+    'path': os.path.join(DATA_FOLDER, 'trends.sqlite3')
+}
+
+# Full-text search over analyzed documents (expires with the uploads)
+SEARCH_INDEX_CONFIG = {
+    'path': os.path.join(DATA_FOLDER, 'search.sqlite3'),
+    'ttl_seconds': RETENTION_SECONDS,
+    'batch_size': 20,  # pending documents that trigger a flush
+    'flush_interval': 2.0  # seconds a queued document may wait to be indexed
+}
+
+# MinHash/LSH index of analysed documents (expires with the uploads)
+SIMILARITY_INDEX_CONFIG = {
+    'path': os.path.join(DATA_FOLDER, 'similarity.sqlite3'),
+    'ttl_seconds': RETENTION_SECONDS,
+    'threshold': 0.85  # minimum estimated Jaccard similarity of word 5-grams
+}
+
+# Reuse of earlier analyses for near-duplicate uploads
+ANALYSIS_REUSE_CONFIG = {
+    'enabled': os.getenv('TRENDLYZER_REUSE_ANALYSES', '1') == '1',
+    # Update a reused analysis with only the added lines (one small LLM call)
+    'delta_refresh': True,
+    # Re-analyse the whole document when more than this much text was added
+    'max_delta_chars': 4000
+}
+
+# Opt-in request profiling: requests sending "X-Trendlyzer-Profile: 1" (when
+# allowed) or picked by the sampling rate are profiled; profiles expire with
+# the uploads
+PROFILING_CONFIG = {
+    'folder': os.path.join(DATA_FOLDER, 'profiles'),
+    'ttl_seconds': RETENTION_SECONDS,
+    'sample_rate': float(os.getenv('TRENDLYZER_PROFILE_SAMPLE_RATE', '0')),
+    'header': 'X-Trendlyzer-Profile',
+    # Off by default: anyone able to send the header could profile requests.
+    # With a token set, the header must carry the token instead of "1".
+    'allow_header': os.getenv('TRENDLYZER_PROFILE_HEADER', '0') == '1',
+    'header_token': os.getenv('TRENDLYZER_PROFILE_TOKEN') or None,
+    'stack_interval': 0.005  # seconds between stack samples
+}
+
+# Uploads are parsed into spooled temporary files: files up to spool_bytes
+# stay in memory, larger ones go to an unlinked temporary file in the upload
+# folder. Requests over max_request_bytes and files over max_file_bytes are
+# rejected with 413 while streaming.
+UPLOAD_CONFIG = {
+    'max_request_bytes': int(os.getenv('TRENDLYZER_MAX_UPLOAD_MB', '50')) * 1024 * 1024 + 64 * 1024,
+    'max_file_bytes': int(os.getenv('TRENDLYZER_MAX_UPLOAD_MB', '50')) * 1024 * 1024,
+    'spool_bytes': 1024 * 1024,
+    'spool_dir': UPLOAD_FOLDER
+}
+
+# Text extraction
+EXTRACTION_CONFIG = {
+    # Read DOCX/PPTX XML incrementally with lxml instead of building the
+    # python-docx/python-pptx object model (which remains the fallback)
+    'ooxml_fast_path': os.getenv('TRENDLYZER_OOXML_FAST_PATH', '1') == '1'
+}
+
+# Per-request memory budget (on top of the worker's baseline RSS). Uploads
+# estimated to exceed it are read partially when the format streams (text,
+# PDF, XLSX, DOCX/PPTX with the fast path) and in full with a warning otherwise.
+MEMORY_CONFIG = {
+    'budget_bytes': int(os.getenv('TRENDLYZER_MEMORY_BUDGET_MB', '512')) * 1024 * 1024,
+    # Estimated peak bytes per upload byte, extraction and analysis included
+    # (OOXML uploads that are not valid zips fall back to these as well)
+    'expansion': {
+        'txt': 18, 'csv': 18, 'md': 18, 'rtf': 18,
+        'pdf': 10,
+        'xlsx': 100, 'xls': 100,
+        'docx': 250, 'doc': 250,
+        'pptx': 40, 'ppt': 40
+    },
+    # Estimated peak bytes per uncompressed byte of the XML holding the text
+    # of OOXML uploads; python-docx/pptx build a full tree of it (the lxml
+    # fast path does not, but the extracted text still grows)
+    'text_part_expansion': {
+        'docx': 25, 'doc': 25,
+        'pptx': 25, 'ppt': 25,
+        'xlsx': 15
+    },
+    # Peak bytes per extracted character while analysing (~11 for ASCII text)
+    'bytes_per_char': 16,
+    'sample_interval': 0.05,  # seconds between RSS samples
+    # Also record Python allocation peaks per stage (slower; for investigations)
+    'tracemalloc': os.getenv('TRENDLYZER_TRACEMALLOC', '0') == '1'
+}
+
+# Headless batch processing (batch.py)
+BATCH_CONFIG = {
+    # Worker processes; each has its own LLM governor, so the total number of
+    # concurrent LLM calls is up to workers x the governor's limit
+    'workers': int(os.getenv('TRENDLYZER_BATCH_WORKERS', '4')),
+    # Recycle workers to bound memory over long backfills
+    'max_tasks_per_worker': 50
+}
+
+# ASGI serving path (asgi.py): LLM calls are awaited on the event loop and
+# CPU-bound stages run on a pool of worker processes
+ASYNC_CONFIG = {
+    'cpu_workers': int(os.getenv('TRENDLYZER_CPU_WORKERS', str(os.cpu_count() or 2))),
+    # Recycle workers to bound memory growth
+    'max_tasks_per_worker': 200
+}
+
 # Flask App Configuration
 FLASK_CONFIG = {
     'SECRET_KEY': 'your_secret_key_here',
-    'UPLOAD_FOLDER': UPLOAD_FOLDER
+    'UPLOAD_FOLDER': UPLOAD_FOLDER,
+    # Whole request body, enforced while streaming (form fields get 64 KB)
+    'MAX_CONTENT_LENGTH': UPLOAD_CONFIG['max_request_bytes'],
+    # Initialise matplotlib, NLTK, report fonts and the OpenAI client inside
+    # create_app (i.e. in the gunicorn master when preloading) before forking.
+    'WARMUP_ON_STARTUP': os.getenv('TRENDLYZER_WARMUP', '1') == '1'
+}
+
+# LLM Configuration
+LLM_CONFIG = {
+    'base_url': os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1'),
+    'model': 'qwen/qwen3-235b-a22b:free',
+    # Ordered list of alternate models used for hedges and after failures,
+    # e.g. LLM_FALLBACK_MODELS="model-a:free,model-b:free"
+    'fallback_models': [
+        m.strip() for m in os.getenv('LLM_FALLBACK_MODELS', '').split(',') if m.strip()
+    ],
+    'request_timeout': 120.0,  # seconds per upstream attempt
+    'max_input_chars': 20000  # document characters sent to the model
+}
+
+# Process-wide LLM admission control (limits apply per worker process)
+LLM_GOVERNOR_CONFIG = {
+    'initial_limit': 4,
+    'min_limit': 1,
+    'max_limit': 32,
+    'backoff_factor': 0.5,  # limit multiplier on a 429
+    'latency_tolerance': 2.0,  # shrink limit when avg latency exceeds best by this factor
+    'queue_timeout': 300.0,  # seconds a call may wait for a slot
+    'max_throttle_retries': 3,
+    'throttle_base_delay': 1.0  # seconds, doubled per retry unless Retry-After is sent
+}
+
+# Hedged requests and model fallback for LLM tail latency
+LLM_HEDGING_CONFIG = {
+    'hedge_percentile': 90,  # send a hedge once this latency percentile has elapsed
+    'default_hedge_delay': 30.0,  # seconds, until enough latency samples exist
+    'min_hedge_delay': 5.0,
+    'max_hedge_delay': 60.0,
+    'min_samples': 20,
+    'max_attempts': 3,  # primary + hedges/fallbacks per call
+    'hedge_to_fallback': True,  # hedge on the next fallback model when one is configured
+    'total_timeout': 180.0  # hard bound for one logical LLM call
 }
 
 AI_ANALYTICS_SCHEMA = {
@@ -173,6 +354,21 @@ Instructions:
     - Do NOT return any prose, markdown, or explanation—just valid, minified JSON.
 """
 
+prompt_delta_user = """
+Below is the JSON analysis of a document, followed by lines that were added to the document after it was analysed.
+---
+ {{PREVIOUS_ANALYSIS}}
+---
+Added lines:
+ {{ADDED_LINES}}
+---
+
+Instructions:
+    - Update the analysis so it covers the whole document including the added lines; keep everything the added lines do not change.
+    - Use exactly the same JSON schema as the previous analysis.
+    - Do NOT return any prose, markdown, or explanation—just valid, minified JSON.
+"""
+
 prompt2_system = """
 You are a data visualization expert. Based on the provided document analysis (key metrics and detailed analysis), suggest up to 3 high-impact charts or graphs using the exact JSON schema below. No explanations, no markdown—JSON ONLY.
 """
@@ -0,0 +1,99 @@
+"""
+Columnar conversation records for conversational documents.
+"""
+from array import array
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Per-conversation flags, stored as bits of one byte per conversation
+EMAIL_CAPTURED = 1 << 0
+PHONE_CAPTURED = 1 << 1
+FOLLOW_UP = 1 << 2
+CUSTOMER_READINESS = 1 << 3
+TRUST_CONCERNS = 1 << 4
+
+FLAG_COLUMNS = (
+    ('Email Captured', EMAIL_CAPTURED),
+    ('Phone Captured', PHONE_CAPTURED),
+    ('Follow-up', FOLLOW_UP),
+    ('Customer Readiness', CUSTOMER_READINESS),
+    ('Trust Concerns', TRUST_CONCERNS),
+)
+_FLAG_BITS = np.array([bit for _, bit in FLAG_COLUMNS], dtype=np.uint8)
+
+
+class ConversationTable:
+    """Append-only table of conversations with one column per attribute.
+
+    Flags live in a ``bytearray`` (one byte per conversation) and message
+    counts in an unsigned ``array``, so a conversation costs a few bytes plus
+    its user name instead of a nine-key dict.  Rates are computed with a
+    single vectorized reduction over all flag columns.
+    """
+
+    __slots__ = ('users', '_flags', '_message_counts')
+
+    def __init__(self):
+        self.users: List[str] = []
+        self._flags = bytearray()
+        self._message_counts = array('I')
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def start(self, user: str) -> int:
+        """Start a new conversation for a user and return its id."""
+        self.users.append(user)
+        self._flags.append(0)
+        self._message_counts.append(0)
+        return len(self.users) - 1
+
+    def mark(self, conv_id: int, flag: int):
+        """Set a flag (e.g. ``EMAIL_CAPTURED``) on a conversation."""
+        self._flags[conv_id] |= flag
+
+    def add_message(self, conv_id: int):
+        """Count one more message in a conversation."""
+        self._message_counts[conv_id] += 1
+
+    def flag_matrix(self) -> np.ndarray:
+        """Return an (n, 6) boolean matrix of the flag columns.
+
+        The last column is "Lead Capture Success" (email or phone captured).
+        """
+        flags = np.frombuffer(bytes(self._flags), dtype=np.uint8)
+        matrix = np.empty((len(flags), len(FLAG_COLUMNS) + 1), dtype=bool)
+        np.not_equal(flags[:, None] & _FLAG_BITS, 0, out=matrix[:, :-1])
+        matrix[:, -1] = flags & (EMAIL_CAPTURED | PHONE_CAPTURED) != 0
+        return matrix
+
+    def rates(self, total_conversations: int = None) -> Dict[str, float]:
+        """Return the percentage of conversations with each flag set.
+
+        Args:
+            total_conversations: Denominator, defaults to the number of rows
+
+        Returns:
+            dict: Column name -> percentage, including "Lead Capture Success"
+        """
+        total = len(self) if total_conversations is None else total_conversations
+        names = [name for name, _ in FLAG_COLUMNS] + ['Lead Capture Success']
+        if not total:
+            return dict.fromkeys(names, 0.0)
+        counts = self.flag_matrix().sum(axis=0)
+        return dict(zip(names, (counts / total * 100).tolist()))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Export the table with one row per conversation."""
+        matrix = self.flag_matrix()
+        data = {
+            'Conversation ID': np.arange(len(self)),
+            'User': self.users,
+        }
+        for i, (name, _) in enumerate(FLAG_COLUMNS):
+            data[name] = matrix[:, i]
+        data['Lead Capture Success'] = matrix[:, -1]
+        data['Message Count'] = np.array(self._message_counts, dtype=np.uint32)
+        return pd.DataFrame(data)
@@ -0,0 +1,216 @@
+"""
+ASGI routes for the Trendlyzer application.
+
+``/api/analyze`` is served natively on the event loop (see
+``services.async_pipeline``); every other route is the Flask application
+mounted behind a WSGI adapter.
+"""
+import logging
+import warnings
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+from .. import create_app
+from ..config.config import ALLOWED_EXTENSIONS, UPLOAD_CONFIG
+from ..services.async_pipeline import analyze, get_cpu_pool, shutdown_cpu_pool
+from ..services.content_processor import notify_report
+from ..services.file_processor import allowed_file
+from ..services.memory_guard import memory_guard, MemoryBudgetExceeded
+from ..services.report_generator import CHART_RENDERERS
+from ..services.upload_stream import UploadBuffer, buffer_info
+from .main import RESPONSE_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# Form fields are short strings; anything larger is not a legitimate request
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class ContentLengthLimit:
+    """Reject request bodies over ``max_request_bytes`` before they are read.
+
+    The WSGI adapter buffers a request body completely before Flask sees it,
+    so Flask's own limit would only apply once the upload is in memory.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            for name, value in scope['headers']:
+                if name == b'content-length' and value.isdigit() \
+                        and int(value) > UPLOAD_CONFIG['max_request_bytes']:
+                    response = JSONResponse({'error': _too_large_message()}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+def _too_large_message() -> str:
+    return f"Upload is larger than {UPLOAD_CONFIG['max_file_bytes'] // (1024 * 1024)} MB"
+
+
+async def _receive_form(request, upload: UploadBuffer):
+    """Parse a multipart body as it arrives, writing the file part to ``upload``.
+
+    Returns:
+        tuple: (form fields, uploaded filename or None)
+
+    Raises:
+        ValueError: The body is not multipart/form-data
+        RequestEntityTooLarge: The body, the file or a field is too large
+    """
+    mimetype, options = parse_options_header(request.headers.get('content-type', ''))
+    if mimetype != 'multipart/form-data' or 'boundary' not in options:
+        raise ValueError('Expected a multipart/form-data body')
+    decoder = MultipartDecoder(options['boundary'].encode('latin-1'), max_parts=1000)
+
+    form = {}
+    filename = None
+    part = None
+    field = bytearray()
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > UPLOAD_CONFIG['max_request_bytes']:
+            raise RequestEntityTooLarge(_too_large_message())
+        decoder.receive_data(chunk)
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File):
+                # Only the first file named 'file' is kept, as in the Flask route
+                part = 'file' if event.name == 'file' and filename is None else None
+                if part:
+                    filename = event.filename
+            elif isinstance(event, Field):
+                part = event.name
+                field = bytearray()
+            elif isinstance(event, Data):
+                if part == 'file':
+                    upload.write(event.data)
+                elif part is not None:
+                    field += event.data
+                    if len(field) > MAX_FIELD_BYTES:
+                        raise RequestEntityTooLarge(f"Form field '{part}' is too large")
+                    if not event.more_data:
+                        form.setdefault(part, field.decode('utf-8', 'replace'))
+            event = decoder.next_event()
+    decoder.receive_data(None)
+    return form, filename
+
+
+async def api_analyze(request):
+    """Analyse a document like Flask's ``/api/analyze`` without holding a worker.
+
+    Accepts the same form fields and ``response_format`` and
+    ``chart_renderer`` parameters.  Profiling is not available on this path.
+    """
+    upload = UploadBuffer()
+    try:
+        try:
+            form, original_name = await _receive_form(request, upload)
+        except RequestEntityTooLarge as e:
+            return JSONResponse({'error': e.description}, status_code=413)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+
+        if original_name is None:
+            return JSONResponse({'error': 'No file provided'}, status_code=400)
+
+        def value(name, default=None):
+            return form.get(name, request.query_params.get(name, default))
+
+        company_name = form.get('company_name', 'Company Name not provided')
+        response_format = value('response_format', 'pdf').lower()
+        if response_format not in RESPONSE_FORMATS:
+            return JSONResponse({'error': f'Invalid response_format. Allowed: {RESPONSE_FORMATS}'}, status_code=400)
+        chart_renderer = value('chart_renderer')
+        if chart_renderer and chart_renderer not in CHART_RENDERERS:
+            return JSONResponse({'error': f'Invalid chart_renderer. Allowed: {CHART_RENDERERS}'}, status_code=400)
+
+        if original_name == '':
+            return JSONResponse({'error': 'No file selected'}, status_code=400)
+        if not allowed_file(original_name, ALLOWED_EXTENSIONS):
+            return JSONResponse({'error': f'Invalid file type. Allowed: {ALLOWED_EXTENSIONS}'}, status_code=400)
+
+        filename = secure_filename(original_name)
+        file_extension = filename.rsplit('.', 1)[1].lower()
+        info = buffer_info(filename, upload)
+        flask_app = request.app.state.flask_app
+
+        def notify(report_path, company):
+            with flask_app.app_context():
+                notify_report(report_path, company)
+
+        try:
+            plan = memory_guard.plan(info['size'], file_extension, upload.source())
+            report_data = await analyze(
+                upload.source(), file_extension, filename, company_name,
+                max_chars=plan.max_chars,
+                render_report=response_format == 'pdf',
+                chart_renderer=chart_renderer,
+                notify=notify)
+        except MemoryBudgetExceeded as e:
+            logger.warning(f"Rejected {original_name}: {e}")
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except Exception as e:
+            logger.error(f"Error in API analysis: {e}")
+            return JSONResponse({'error': str(e)}, status_code=500)
+        if report_data is None:
+            return JSONResponse({'error': 'Could not process file content'}, status_code=400)
+
+        report_url = None
+        if report_data['report_path']:
+            report_url = str(request.base_url).rstrip('/') + report_data['report_path']
+        response = {
+            'report_url': report_url,
+            'company_name': company_name,
+            'overview': report_data['overview'],
+            'key_topics': report_data['key_topics'],
+            'themes': report_data['themes'],
+            'metrics': asdict(report_data['metrics']),
+            'upload_sha256': info['sha256']
+        }
+        if plan.max_chars is not None:
+            # Only the start of the file fit the memory budget
+            response['content_sampled'] = True
+        return JSONResponse(response)
+    finally:
+        upload.close()
+
+
+def create_asgi_app() -> Starlette:
+    """Create the ASGI application: async ``/api/analyze`` plus the mounted Flask app."""
+    flask_app = create_app()
+    with warnings.catch_warnings():
+        # Deprecated in favour of a2wsgi, which is not a dependency; it is only
+        # used for the routes that stay synchronous
+        warnings.simplefilter('ignore', DeprecationWarning)
+        from starlette.middleware.wsgi import WSGIMiddleware
+
+    @asynccontextmanager
+    async def lifespan(app):
+        get_cpu_pool()
+        try:
+            yield
+        finally:
+            shutdown_cpu_pool()
+
+    app = Starlette(
+        routes=[
+            Route('/api/analyze', api_analyze, methods=['POST']),
+            Mount('/', ContentLengthLimit(WSGIMiddleware(flask_app))),
+        ],
+        lifespan=lifespan
+    )
+    app.state.flask_app = flask_app
+    return app
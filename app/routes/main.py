@@ -3,23 +3,66 @@ Main routes for the Trendlyzer application.
 """
 import os
 import logging
-from flask import Blueprint, request, render_template, redirect, url_for, session, jsonify, current_app
+from flask import Blueprint, request, render_template, redirect, url_for, session, jsonify, current_app, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-from ..config.config import (
-    UPLOAD_FOLDER, ALLOWED_EXTENSIONS
-)
+from ..config.config import ALLOWED_EXTENSIONS
 from ..services.file_processor import process_file, allowed_file
 
 from ..services.content_processor import process_content
+from ..services.report_generator import CHART_RENDERERS
+from ..services.result_store import result_store
+from ..services.report_store import report_store
+from ..services.trend_store import trend_store, GRANULARITIES
+from ..services.search_index import search_index
+from ..services.similarity_index import similarity_index
+from ..services.chart_cache import chart_cache
+from ..services.request_profiler import request_profiler, PROFILE_FORMATS
+from ..services.memory_guard import memory_guard, memory_stage, MemoryBudgetExceeded
+from ..services.upload_stream import upload_info, upload_stats
+from ..services.llm_governor import llm_governor
+from ..services.llm_hedging import llm_hedger
+from ..utils.json_parsing import parse_stats
 
 logger = logging.getLogger(__name__)
 main = Blueprint('main', __name__)
 
+RESPONSE_FORMATS = ('pdf', 'json')
+
 @main.route('/')
 def home():
     """Render the home page."""
     return render_template('index.html')
 
+@main.route('/readyz')
+def readiness():
+    """Report readiness once startup warmup has completed without a required step failing."""
+    state = current_app.warmup_state
+    return jsonify(state), 200 if state['ready'] else 503
+
+@main.route('/api/stats')
+def api_stats():
+    """Report runtime statistics for this worker process."""
+    return jsonify({
+        'llm_governor': llm_governor.stats(),
+        'llm_hedging': llm_hedger.stats(),
+        'json_parsing': parse_stats(),
+        'chart_cache': chart_cache.stats(),
+        'analysis_reuse': similarity_index.stats(),
+        'memory': memory_guard.stats(),
+        'uploads': upload_stats()
+    })
+
+@main.app_errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Reject uploads over the request or file size limit."""
+    message = e.description
+    if message == RequestEntityTooLarge.description:
+        # Raised by werkzeug for MAX_CONTENT_LENGTH; the per-file limit sets its own
+        message = f"Upload is larger than {current_app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB"
+    logger.warning(f"Rejected upload to {request.path}: {message}")
+    return jsonify({'error': message}), 413
+
 @main.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and analysis."""
@@ -28,6 +71,9 @@ def upload_file():
 
     file = request.files['file']
     company_name = request.form.get('company_name', 'Company Name not provided')
+    chart_renderer = request.values.get('chart_renderer')
+    if chart_renderer and chart_renderer not in CHART_RENDERERS:
+        return jsonify({'error': f'Invalid chart_renderer. Allowed: {CHART_RENDERERS}'}), 400
 
     # Debug logging
     current_app.logger.info(f"Mail config: {current_app.config.get('MAIL_USERNAME')}")
@@ -40,19 +86,21 @@ def upload_file():
     if file and allowed_file(file.filename, ALLOWED_EXTENSIONS):
         try:
             filename = secure_filename(file.filename)
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-            file.save(filepath)
             file_extension = filename.rsplit('.', 1)[1].lower()
+            upload = upload_info(file)
 
-            content = process_file(filepath, file_extension)
-            if content is None:
-                return jsonify({'error': 'Could not process file content'}), 400
+            with memory_guard.track(filename):
+                plan = memory_guard.plan(upload['size'], file_extension, file.stream)
+                with memory_stage('extract'):
+                    content = process_file(file.stream, file_extension, max_chars=plan.max_chars)
+                if content is None:
+                    return jsonify({'error': 'Could not process file content'}), 400
 
-            report_data = process_content(content, filename, company_name)
+                report_data = process_content(
+                    content, filename, company_name, chart_renderer=chart_renderer)
             
-            # Store results in session
-            session['results'] = {
+            # Store results server-side; the session only carries the id
+            session['result_id'] = result_store.put({
                 'company_name': company_name,
                 'overview': report_data['overview'],
 
@@ -60,11 +108,14 @@ def upload_file():
                 'themes': report_data['themes'],
 
                 'report_path': report_data['report_path']
-            }
+            })
             
             
             return redirect(url_for('main.results_page'))
 
+        except MemoryBudgetExceeded as e:
+            current_app.logger.warning(f"Rejected {file.filename}: {e}")
+            return jsonify({'error': str(e)}), 413
         except Exception as e:
             current_app.logger.error(f"Error in file analysis: {e}")
             return jsonify({'error': str(e)}), 500
@@ -73,12 +124,26 @@ def upload_file():
 
 @main.route('/api/analyze', methods=['POST'])
 def api_analyze():
-    """API endpoint for programmatic document analysis."""
+    """API endpoint for programmatic document analysis.
+
+    Pass ``response_format=json`` (form field or query parameter) to get the
+    structured analysis only, without rendering or emailing a PDF report, and
+    ``chart_renderer=vector`` to draw the report charts natively in the PDF.
+    When the profiling header is enabled (see ``PROFILING_CONFIG``), send
+    ``X-Trendlyzer-Profile`` to profile the analysis; the response then
+    includes a ``profile_id`` for ``/api/profiles/<profile_id>``.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
 
     file = request.files['file']
     company_name = request.form.get('company_name', 'Company Name not provided')
+    response_format = request.values.get('response_format', 'pdf').lower()
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({'error': f'Invalid response_format. Allowed: {RESPONSE_FORMATS}'}), 400
+    chart_renderer = request.values.get('chart_renderer')
+    if chart_renderer and chart_renderer not in CHART_RENDERERS:
+        return jsonify({'error': f'Invalid chart_renderer. Allowed: {CHART_RENDERERS}'}), 400
 
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
@@ -86,39 +151,148 @@ def api_analyze():
     if file and allowed_file(file.filename, ALLOWED_EXTENSIONS):
         try:
             filename = secure_filename(file.filename)
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-            file.save(filepath)
             file_extension = filename.rsplit('.', 1)[1].lower()
+            upload = upload_info(file)
 
-            content = process_file(filepath, file_extension)
-            if content is None:
-                return jsonify({'error': 'Could not process file content'}), 400
+            with memory_guard.track(filename), \
+                    request_profiler.capture(request.headers, 'api_analyze') as profile:
+                plan = memory_guard.plan(upload['size'], file_extension, file.stream)
+                with memory_stage('extract'):
+                    content = process_file(file.stream, file_extension, max_chars=plan.max_chars)
+                if content is None:
+                    return jsonify({'error': 'Could not process file content'}), 400
 
-            # Process the content and generate report
-            report_data = process_content(content, filename, company_name)
+                # Process the content and generate report
+                report_data = process_content(
+                    content, filename, company_name,
+                    render_report=response_format == 'pdf',
+                    chart_renderer=chart_renderer)
+            report_url = None
+            if report_data['report_path']:
+                report_url = request.host_url.rstrip('/') + report_data['report_path']
             
-            return jsonify({
-                'report_url': request.host_url.rstrip('/') + report_data['report_path'],
+            response = {
+                'report_url': report_url,
                 'company_name': company_name,
                 'overview': report_data['overview'],
 
                 'key_topics': report_data['key_topics'],
                 'themes': report_data['themes'],
 
-                'metrics': report_data['metrics']
-            })
+                'metrics': report_data['metrics'],
+                'upload_sha256': upload['sha256']
+            }
+            if plan.max_chars is not None:
+                # Only the start of the file fit the memory budget
+                response['content_sampled'] = True
+            if profile.id:
+                response['profile_id'] = profile.id
+            return jsonify(response)
 
+        except MemoryBudgetExceeded as e:
+            logger.warning(f"Rejected {file.filename}: {e}")
+            return jsonify({'error': str(e)}), 413
         except Exception as e:
             logger.error(f"Error in API analysis: {e}")
             return jsonify({'error': str(e)}), 500
 
     return jsonify({'error': f'Invalid file type. Allowed: {ALLOWED_EXTENSIONS}'}), 400
 
+@main.route('/api/trends')
+def api_trends():
+    """Return a company's metric history from the pre-aggregated rollups.
+
+    Query parameters: ``company`` (required), ``metric`` (omit to list the
+    recorded metrics), ``granularity`` (day, week or month) and ``periods``.
+    """
+    company = request.args.get('company', '').strip()
+    if not company:
+        return jsonify({'error': 'No company provided'}), 400
+
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({'company': company, 'metrics': trend_store.metrics(company)})
+
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'Invalid granularity. Allowed: {GRANULARITIES}'}), 400
+    periods = request.args.get('periods', 12, type=int)
+    if not periods or periods < 1:
+        return jsonify({'error': 'periods must be a positive integer'}), 400
+
+    return jsonify({
+        'company': company,
+        'metric': metric,
+        'granularity': granularity,
+        'series': trend_store.series(company, metric, granularity, periods)
+    })
+
+@main.route('/api/search')
+def api_search():
+    """Search one company's analyzed documents by extracted text and AI summary.
+
+    Query parameters: ``q`` and ``company`` (required), and ``limit``.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    company = request.args.get('company', '').strip()
+    if not company:
+        return jsonify({'error': 'No company provided'}), 400
+    limit = request.args.get('limit', 20, type=int)
+    if not limit or not 1 <= limit <= 100:
+        return jsonify({'error': 'limit must be between 1 and 100'}), 400
+
+    try:
+        results = search_index.search(query, company, limit)
+    except Exception as e:
+        current_app.logger.error(f"Error searching documents: {e}")
+        return jsonify({'error': 'Search failed'}), 500
+    return jsonify({'query': query, 'company': company, 'results': results})
+
+@main.route('/reports/<report_id>.pdf')
+def download_report(report_id):
+    """Serve a report, rendering and caching it on the first request.
+
+    With ``X-Trendlyzer-Profile`` the profile id of the render is returned
+    in the ``X-Trendlyzer-Profile-Id`` response header.
+    """
+    try:
+        with memory_guard.track(f"report {report_id}"), \
+                request_profiler.capture(request.headers, 'report_render') as profile:
+            pdf_path = report_store.render(report_id)
+    except Exception as e:
+        current_app.logger.error(f"Error rendering report {report_id}: {e}")
+        return jsonify({'error': 'Could not render report'}), 500
+    if pdf_path is None:
+        return jsonify({'error': 'Report not found'}), 404
+    response = send_file(pdf_path, mimetype='application/pdf', max_age=3600)
+    if profile.id:
+        response.headers['X-Trendlyzer-Profile-Id'] = profile.id
+    return response
+
+@main.route('/api/profiles/<profile_id>')
+def api_profile(profile_id):
+    """Return a saved request profile.
+
+    ``format`` is ``summary`` (default, JSON with per-stage times),
+    ``pstats`` (cProfile data) or ``folded`` (flame graph input).
+    """
+    profile_format = request.args.get('format', 'summary')
+    if profile_format not in PROFILE_FORMATS:
+        return jsonify({'error': f'Invalid format. Allowed: {tuple(PROFILE_FORMATS)}'}), 400
+    path = request_profiler.path(profile_id, profile_format)
+    if path is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(path, mimetype=PROFILE_FORMATS[profile_format][1],
+                     as_attachment=profile_format != 'summary',
+                     download_name=os.path.basename(path))
+
 @main.route('/results')
 def results_page():
     """Render the results page."""
-    results = session.get('results')
+    result_id = session.get('result_id')
+    results = result_store.get(result_id) if result_id else None
     if not results:
         return redirect(url_for('main.home'))
     return render_template(
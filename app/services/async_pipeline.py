@@ -0,0 +1,186 @@
+"""
+Service for running the analysis pipeline from an event loop (ASGI path).
+
+A request spends most of its time waiting for the model, so the LLM call is
+awaited on the event loop with the non-blocking client and holds no thread
+or process while it waits.  The CPU-bound stages run on a pool of worker
+processes:
+
+    extract_and_classify  extraction and document classification
+    complete_in_worker    conversation metrics, trends, search indexing and
+                          report rendering (charts and PDF output)
+
+The document text is returned from the first stage and sent to the second,
+since both may run in different workers.  If a worker dies (e.g. killed for
+memory), the pool is replaced and the stage is retried once.  Similarity lookups (SQLite) and
+emails run in threads; a delta refresh of a reused analysis is awaited like
+the main LLM call.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from .content_processor import (
+    analysis_document, analysis_prompt, call_openai_async, classify_content, complete_analysis,
+    find_reusable_analysis, get_async_openai_client, parse_openai_response, remember_analysis
+)
+from .file_processor import process_file
+from .search_index import search_index
+from ..config.config import ASYNC_CONFIG, prompt1_system
+
+logger = logging.getLogger(__name__)
+
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(log_level: int):
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def get_cpu_pool() -> ProcessPoolExecutor:
+    """Return the process pool for CPU-bound stages, starting it on first use.
+
+    Workers are spawned rather than forked: the serving process already runs
+    an event loop and background threads that a fork would copy mid-state.
+    """
+    global _cpu_pool
+    with _pool_lock:
+        if _cpu_pool is None:
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=ASYNC_CONFIG['cpu_workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(logging.getLogger().getEffectiveLevel(),),
+                max_tasks_per_child=ASYNC_CONFIG['max_tasks_per_worker']
+            )
+            logger.info(f"Started {ASYNC_CONFIG['cpu_workers']} CPU workers")
+        return _cpu_pool
+
+
+def _replace_broken_pool(pool: ProcessPoolExecutor):
+    """Discard ``pool`` after a worker died, unless another request already replaced it."""
+    global _cpu_pool
+    with _pool_lock:
+        if _cpu_pool is not pool:
+            return
+        _cpu_pool = None
+    logger.warning("A CPU worker terminated abruptly; restarting the worker pool")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_cpu_pool():
+    """Stop the CPU worker pool after its running tasks finish."""
+    global _cpu_pool
+    with _pool_lock:
+        pool, _cpu_pool = _cpu_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def _run_in_pool(fn: Callable, *args):
+    """Run ``fn(*args)`` on the CPU pool, retrying once on a fresh pool if it is broken."""
+    loop = asyncio.get_running_loop()
+    pool = get_cpu_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        _replace_broken_pool(pool)
+    return await loop.run_in_executor(get_cpu_pool(), fn, *args)
+
+
+def extract_and_classify(source, file_extension: str, max_chars: Optional[int]) -> tuple:
+    """Extract and classify a document; runs in a worker process.
+
+    Args:
+        source: Upload bytes, or the path of an upload spilled to disk
+
+    Returns:
+        tuple: (content, classification), or (None, None) if nothing was extracted
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    content = process_file(source, file_extension, max_chars=max_chars)
+    if not content:
+        return None, None
+    return content, classify_content(content)
+
+
+def complete_in_worker(content: str, filename: str, company_name: str, classification,
+                       analysis: dict, render_report: bool, chart_renderer: Optional[str]) -> dict:
+    """Run ``complete_analysis`` without emailing; runs in a worker process."""
+    try:
+        return complete_analysis(content, filename, company_name, classification, analysis,
+                                 render_report=render_report, chart_renderer=chart_renderer,
+                                 notify=False)
+    finally:
+        # Workers exit without running atexit hooks, so never leave documents queued
+        try:
+            search_index.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush search index: {str(e)}")
+
+
+async def _reuse_analysis(document: str, company_name: str) -> Optional[dict]:
+    """Counterpart of ``content_processor.reuse_analysis`` awaiting the delta refresh."""
+    previous, delta_prompt = await asyncio.to_thread(find_reusable_analysis, document, company_name)
+    if delta_prompt is None:
+        return previous
+    try:
+        analysis = parse_openai_response(
+            await call_openai_async(get_async_openai_client(), delta_prompt, prompt1_system))
+    except Exception as e:
+        logger.warning(f"Delta refresh failed, reusing previous analysis: {str(e)}")
+        return previous
+    await asyncio.to_thread(remember_analysis, document, company_name, analysis)
+    return analysis
+
+
+async def analyze(source, file_extension: str, filename: str, company_name: str,
+                  max_chars: Optional[int] = None, render_report: bool = True,
+                  chart_renderer: Optional[str] = None,
+                  notify: Optional[Callable[[str, str], None]] = None) -> Optional[dict]:
+    """Analyse an upload without blocking the event loop.
+
+    Args:
+        source: Upload bytes, or the path of an upload spilled to disk
+        file_extension: Lowercase extension without the dot
+        filename: Name of the uploaded file
+        company_name: Name of the company
+        max_chars: Extract at most this many characters (``memory_guard.plan``)
+        render_report: See ``process_content``
+        chart_renderer: See ``process_content``
+        notify: Called in a thread with ``(report_path, company_name)`` once
+            a report exists, e.g. ``notify_report`` in an app context
+
+    Returns:
+        dict: As ``process_content``, or None if no text could be extracted
+    """
+    content, classification = await _run_in_pool(
+        extract_and_classify, source, file_extension, max_chars)
+    if content is None:
+        return None
+
+    document = analysis_document(content)
+    analysis = await _reuse_analysis(document, company_name)
+    if analysis is None:
+        response = await call_openai_async(
+            get_async_openai_client(), analysis_prompt(document), prompt1_system)
+        logger.info(f"AI analysis: {response}")
+        analysis = parse_openai_response(response)
+        await asyncio.to_thread(remember_analysis, document, company_name, analysis)
+
+    report_data = await _run_in_pool(
+        complete_in_worker, content, filename, company_name, classification,
+        analysis, render_report, chart_renderer)
+    if report_data['report_path'] and notify is not None:
+        await asyncio.to_thread(notify, report_data['report_path'], company_name)
+    return report_data
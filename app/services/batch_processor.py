@@ -0,0 +1,181 @@
+"""
+Service for analysing a directory of documents without the web app.
+
+Each document goes through the same pipeline as an upload (extraction,
+analysis, metrics, trends and search indexing) and, optionally, a PDF report,
+on a pool of worker processes.  Results are written next to each other in an
+output directory that mirrors the input tree:
+
+    <output>/<relative path>.json        analysis, metrics and overview
+    <output>/<relative path>_report.pdf  report, unless disabled
+    <output>/summary.json                per-file status of the whole run
+
+Files that already have a result are skipped, so an interrupted backfill can
+simply be restarted.  No emails are sent.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import time
+from dataclasses import asdict
+from typing import Iterator, List, Optional
+
+from .file_processor import process_file, allowed_file
+from .content_processor import process_content
+from .report_generator import ReportGenerator
+from .search_index import search_index
+from ..config.config import ALLOWED_EXTENSIONS, BATCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPANY = 'Company Name not provided'
+
+
+def find_documents(input_dir: str) -> Iterator[str]:
+    """Yield the supported documents under a directory, relative to it, in order."""
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if allowed_file(name, ALLOWED_EXTENSIONS):
+                yield os.path.relpath(os.path.join(root, name), input_dir)
+
+
+def company_for(relative_path: str, company_name: Optional[str], company_from_dir: bool) -> str:
+    """Return the company of a document: its top-level directory or a fixed name."""
+    if company_from_dir and os.sep in relative_path:
+        return relative_path.split(os.sep, 1)[0]
+    return company_name or DEFAULT_COMPANY
+
+
+def process_document(job: dict) -> dict:
+    """Analyse one document and write its result; runs in a worker process.
+
+    Args:
+        job: input_dir, relative_path, output_dir, company_name,
+            render_report and chart_renderer
+
+    Returns:
+        dict: Status line for the summary
+    """
+    relative_path = job['relative_path']
+    source = os.path.join(job['input_dir'], relative_path)
+    result_path = os.path.join(job['output_dir'], relative_path + '.json')
+    filename = os.path.basename(relative_path)
+    started = time.perf_counter()
+    status = {'file': relative_path, 'company_name': job['company_name'], 'result': None, 'report': None}
+
+    try:
+        content = process_file(source, filename.rsplit('.', 1)[1].lower())
+        if not content:
+            status.update(status='skipped', error='Could not process file content')
+            return status
+
+        report_data = process_content(content, filename, job['company_name'], render_report=False)
+        metrics = report_data['metrics']
+
+        os.makedirs(os.path.dirname(result_path), exist_ok=True)
+        if job['render_report']:
+            report_path = os.path.join(job['output_dir'], relative_path + '_report.pdf')
+            generator = ReportGenerator(filename, job['company_name'], chart_renderer=job['chart_renderer'])
+            generator.generate(mode=metrics.mode, metrics=metrics, output_path=report_path)
+            status['report'] = report_path
+
+        # Written last: its presence marks the document as done
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'file': relative_path,
+                'company_name': job['company_name'],
+                'overview': report_data['overview'],
+                'key_topics': report_data['key_topics'],
+                'themes': report_data['themes'],
+                'metrics': asdict(metrics),
+                'report': status['report']
+            }, f, ensure_ascii=False, indent=2)
+        status.update(status='ok', result=result_path)
+    except Exception as e:
+        logger.error(f"Failed to process {relative_path}: {str(e)}")
+        status.update(status='failed', error=str(e))
+    finally:
+        # Workers exit without running atexit hooks, so never leave documents queued
+        try:
+            search_index.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush search index: {str(e)}")
+        status['seconds'] = round(time.perf_counter() - started, 3)
+    return status
+
+
+def _init_worker(log_level: int):
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def run_batch(input_dir: str, output_dir: str, company_name: Optional[str] = None,
+              company_from_dir: bool = False, workers: Optional[int] = None,
+              render_reports: bool = True, chart_renderer: Optional[str] = None,
+              force: bool = False) -> List[dict]:
+    """Analyse every supported document under a directory.
+
+    Args:
+        input_dir: Directory searched recursively for documents
+        output_dir: Directory receiving results, reports and summary.json
+        company_name: Company of every document
+        company_from_dir: Use each document's top-level directory as its company
+        workers: Worker processes, defaults to BATCH_CONFIG['workers']
+        render_reports: Also render a PDF report per document
+        chart_renderer: 'matplotlib' or 'vector' report charts
+        force: Re-process documents that already have a result
+
+    Returns:
+        list: Status of each document, in completion order
+    """
+    workers = workers or BATCH_CONFIG['workers']
+    jobs = []
+    skipped = 0
+    for relative_path in find_documents(input_dir):
+        if not force and os.path.exists(os.path.join(output_dir, relative_path + '.json')):
+            skipped += 1
+            continue
+        jobs.append({
+            'input_dir': input_dir,
+            'relative_path': relative_path,
+            'output_dir': output_dir,
+            'company_name': company_for(relative_path, company_name, company_from_dir),
+            'render_report': render_reports,
+            'chart_renderer': chart_renderer
+        })
+    logger.info(f"Processing {len(jobs)} documents with {workers} workers "
+                f"({skipped} already done)")
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    started = time.perf_counter()
+    if jobs:
+        with multiprocessing.Pool(
+            processes=min(workers, len(jobs)),
+            initializer=_init_worker,
+            initargs=(logging.getLogger().getEffectiveLevel(),),
+            maxtasksperchild=BATCH_CONFIG['max_tasks_per_worker']
+        ) as pool:
+            for status in pool.imap_unordered(process_document, jobs):
+                results.append(status)
+                logger.info(f"[{len(results)}/{len(jobs)}] {status['status']} {status['file']} "
+                            f"({status['seconds']}s)")
+
+    elapsed = time.perf_counter() - started
+    counts = {state: sum(1 for r in results if r['status'] == state) for state in ('ok', 'skipped', 'failed')}
+    with open(os.path.join(output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'input_dir': input_dir,
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'already_done': skipped,
+            **counts,
+            'documents': results
+        }, f, ensure_ascii=False, indent=2)
+    logger.info(f"Batch finished in {elapsed:.1f}s: {counts['ok']} ok, {counts['skipped']} skipped, "
+                f"{counts['failed']} failed, {skipped} already done")
+    return results
@@ -0,0 +1,103 @@
+"""
+Service for caching rendered chart images in memory.
+
+Rendering a matplotlib chart costs far more than embedding it, and reports
+often repeat the same chart: the conversational section draws three charts
+from a handful of percentages, and re-analysing a document tends to produce
+identical visualizations.  Rendered PNGs are kept in a size-bounded LRU cache
+keyed by a hash of everything that affects the image, so an identical chart
+is only rendered once per worker process.
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from ..config.config import CHART_CACHE_CONFIG, REPORT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def chart_key(chart_type: str, title: str, data: Dict) -> str:
+    """Hash the chart type, title, data and chart style into a cache key.
+
+    Data is hashed in insertion order because it determines the order of
+    bars, points and wedges.
+    """
+    payload = json.dumps(
+        [chart_type, title, [[str(k), v] for k, v in data.items()], REPORT_CONFIG['charts']],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    """Thread-safe LRU cache of rendered chart images bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Upper bound on the total size of cached images
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str):
+        """Return the cached image for a key, or None."""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return image
+
+    def put(self, key: str, image: bytes):
+        """Cache an image, evicting least recently used entries to fit."""
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = image
+            self._bytes += len(image)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._evictions += 1
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """Return the cached image for a key, rendering and caching it on a miss."""
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+        return image
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+chart_cache = ChartCache(**CHART_CACHE_CONFIG)
@@ -3,66 +3,144 @@ Service for processing and analyzing content from uploaded files.
 """
 import re
 import os
-import json_repair
 import json
-from flask import current_app
-from openai import OpenAI
+import logging
+from typing import Optional
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 from ..models.report_metrics import ReportMetrics
-from ..services.report_generator import ReportGenerator
-from ..services.email_service import send_report_email
-from ..config.config import prompt1_user, prompt1_system
+from ..models.conversation_table import (
+    ConversationTable, EMAIL_CAPTURED, PHONE_CAPTURED, FOLLOW_UP,
+    CUSTOMER_READINESS, TRUST_CONCERNS
+)
+from ..services.report_generator import ReportGenerator, build_overview
+from ..services.email_service import send_report_email, send_report_link_email
+from ..services.report_store import report_store
+from ..services.trend_store import trend_store
+from ..services.search_index import search_index
+from ..services.similarity_index import similarity_index, added_lines
+from ..services.llm_governor import llm_governor
+from ..services.llm_hedging import llm_hedger
+from ..utils.json_parsing import parse_model_json
+from ..utils.document_classifier import classify_document
+from ..utils.lead_signals import MAX_MESSAGE_CHARS, contains_email, contains_phone
+from ..services.memory_guard import memory_stage
+from ..config.config import (
+    prompt1_user, prompt1_system, prompt_delta_user, LLM_CONFIG, REPORT_CONFIG, ANALYSIS_REUSE_CONFIG
+)
 
 
 load_dotenv()
 
-def create_conv_record(conv_id: int, user_name: str) -> dict:
-    """Create a new conversation record."""
-    return {
-        "Conversation ID": conv_id,
-        "User": user_name,
-        "Email Captured": False,
-        "Phone Captured": False,
-        "Lead Capture Success": False,
-        "Follow‑up": False,
-        "Customer Readiness": False,
-        "Trust Concerns": False,
-        "Message Count": 0
-    }
+logger = logging.getLogger(__name__)
+
+_openai_client = None
+_async_openai_client = None
 
 def get_openai_client():
     """
-    Initialize and return OpenAI client
+    Initialize and return the shared OpenAI client.
+
+    The client is built once per process (normally during warmup, before
+    gunicorn forks its workers) and reused by every request.
     """
+    global _openai_client
+    if _openai_client is not None:
+        return _openai_client
     try:
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+        _openai_client = OpenAI(
+            base_url=LLM_CONFIG['base_url'],
             api_key=os.getenv("OPENROUTER_API_KEY"),
+            timeout=LLM_CONFIG['request_timeout'],
+            # Retries are handled by the governor (429s) and the hedger
+            max_retries=0,
         )
-        current_app.logger.debug("OpenAI client initialized successfully")
-        return client
+        logger.debug("OpenAI client initialized successfully")
+        return _openai_client
     except Exception as e:
-        current_app.logger.error(f"Failed to initialize OpenAI client: {str(e)}")
+        logger.error(f"Failed to initialize OpenAI client: {str(e)}")
         raise
 
+def get_async_openai_client():
+    """Initialize and return the shared non-blocking client for the ASGI path."""
+    global _async_openai_client
+    if _async_openai_client is None:
+        _async_openai_client = AsyncOpenAI(
+            base_url=LLM_CONFIG['base_url'],
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            timeout=LLM_CONFIG['request_timeout'],
+            max_retries=0,
+        )
+    return _async_openai_client
+
+def _create_completion(client, model, user_prompt, system_prompt):
+    """Perform a single chat completion request and return its content."""
+    completion = client.chat.completions.create(
+        extra_body={},
+        model=model,
+        messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+    )
+    return _completion_content(completion)
+
+async def _create_completion_async(client, model, user_prompt, system_prompt):
+    """Await a single chat completion request and return its content."""
+    completion = await client.chat.completions.create(
+        extra_body={},
+        model=model,
+        messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+    )
+    return _completion_content(completion)
+
+def _completion_content(completion):
+    """Return the message content of a completion, raising on empty responses."""
+    if not completion:
+        logger.error("OpenAI API returned None completion object")
+        raise Exception("OpenAI API returned None completion object")
+
+    if not completion.choices:
+        logger.error(f"OpenAI API returned empty response: {str(completion)}")
+        raise Exception("Empty response from OpenAI API")
+
+    return completion.choices[0].message.content
+
+def _is_valid_completion(content) -> bool:
+    """Check that a completion looks like the JSON object we asked for."""
+    return bool(content) and "{" in content
+
 def call_openai(client, user_prompt, system_prompt):
+    """Call the LLM through the process-wide governor and hedger.
+
+    Identical prompts already in flight are coalesced into a single logical
+    call. Each upstream attempt is admitted by the governor, whose
+    concurrency adapts to latency and 429 responses; slow or failed attempts
+    are hedged onto the fallback models configured in ``LLM_CONFIG``.
+    """
+    key = llm_governor.request_key(LLM_CONFIG['model'], system_prompt, user_prompt)
+
+    def attempt(model, guarded):
+        return llm_governor.execute(
+            lambda: guarded(lambda: _create_completion(client, model, user_prompt, system_prompt)))
+
     try:
-        completion = client.chat.completions.create(
-            extra_body={},
-            model="qwen/qwen3-235b-a22b:free",
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
-        )
-        if not completion:
-            current_app.logger.error("OpenAI API returned None completion object")
-            raise Exception("OpenAI API returned None completion object")
+        return llm_governor.coalesce(
+            key, lambda: llm_hedger.call(attempt, validate=_is_valid_completion))
+    except Exception as e:
+        logger.error(f"Error calling OpenAI API: {str(e)}")
+        raise Exception(f"Failed to get response from OpenAI API: {str(e)}")
 
-        if not completion.choices:
-            current_app.logger.error(f"OpenAI API returned empty response: {str(completion)}")
-            raise Exception("Empty response from OpenAI API")
-        
-        return completion.choices[0].message.content
+async def call_openai_async(client, user_prompt, system_prompt):
+    """Await the LLM through the governor and hedger without blocking (see ``call_openai``)."""
+    key = llm_governor.request_key(LLM_CONFIG['model'], system_prompt, user_prompt)
+
+    def attempt(model, guarded):
+        return llm_governor.execute_async(
+            lambda: guarded(lambda: _create_completion_async(client, model, user_prompt, system_prompt)))
+
+    try:
+        return await llm_governor.coalesce_async(
+            key, lambda: llm_hedger.call_async(attempt, validate=_is_valid_completion))
     except Exception as e:
-        current_app.logger.error(f"Error calling OpenAI API: {str(e)}")
+        logger.error(f"Error calling OpenAI API: {str(e)}")
         raise Exception(f"Failed to get response from OpenAI API: {str(e)}")
     
 def extract_trimmed_json(response_json):
@@ -74,28 +152,19 @@ def extract_trimmed_json(response_json):
 
 def parse_openai_response(response_content):
     """
-    Extract and parse the JSON object that follows the last `prefix` in the model output.
-    Handles common noise like markdown fences or trailing commentary.
+    Extract and parse the JSON object embedded in the model output.
+
+    Tries a strict decode of the brace-delimited region first and only falls
+    back to fence stripping and ``json_repair`` when that fails.
     """
     try:
-        candidate = re.sub(r"```(?:json)?|```", "", response_content).strip()
-
-        start = candidate.find("{")
-        end   = candidate.rfind("}")
-        if start == -1 or end == -1:
-            raise ValueError("No JSON braces found after prefix")
-
-        json_str = candidate[start:end + 1]
-
-        def _escaper(match):
-            return match.group(0).replace("\n", "\\n")
-        json_str = re.sub(r'"(?:[^"\\]|\\.)*"', _escaper, json_str, flags=re.DOTALL)
-
-        return json_repair.loads(json_str)
+        result, tier = parse_model_json(response_content)
+        logger.debug(f"Model output parsed with '{tier}' tier")
+        return result
 
     except Exception as e:
-        current_app.logger.error(f"JSON parsing error: {e}")
-        current_app.logger.debug(f"Original model output:\n{response_content}")
+        logger.error(f"JSON parsing error: {e}")
+        logger.debug(f"Original model output:\n{response_content}")
         raise
 
 def process_conversations(lines: list, company_name: str) -> tuple:
@@ -106,7 +175,7 @@ def process_conversations(lines: list, company_name: str) -> tuple:
         company_name: Name of the company for keyword categorization
         
     Returns:
-        tuple: (conversations, conv_data, all_keywords, top_keywords, theme_counts)
+        tuple: (conversations, conv_table)
     """
     conversation_ids = []
     conversations = []
@@ -114,10 +183,6 @@ def process_conversations(lines: list, company_name: str) -> tuple:
     current_user = None
     current_conversation = ""
 
-    email_pattern = re.compile(
-        r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
-    phone_pattern = re.compile(
-        r"(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{3}[-.\s]?\d{3,4}[-.\s]?\d{0,4}")
     followup_keywords = re.compile(
         r"\b(follow up|schedule|demo|call|reach out|appointment|book)\b", re.IGNORECASE)
     readiness_keywords = re.compile(
@@ -125,7 +190,7 @@ def process_conversations(lines: list, company_name: str) -> tuple:
     trust_keywords = re.compile(
         r"\b(scam|fake|trust|secure|safety|safe|legit|fraud|privacy|data leak|security)\b", re.IGNORECASE)
 
-    conv_data = []
+    conv_table = ConversationTable()
 
     # Parse the file to identify conversations and collect stats
     for line in lines:
@@ -140,78 +205,54 @@ def process_conversations(lines: list, company_name: str) -> tuple:
             if current_conv_id < 0:
                 continue
             # Follow‑up detection
-            if followup_keywords.search(message):
-                conv_data[current_conv_id]["Follow‑up"] = True
+            if followup_keywords.search(message[:MAX_MESSAGE_CHARS]):
+                conv_table.mark(current_conv_id, FOLLOW_UP)
 
-            conv_data[current_conv_id]["Message Count"] += 1
+            conv_table.add_message(current_conv_id)
 
         else:
             if speaker != current_user:
                 current_user = speaker
-                current_conv_id += 1
+                current_conv_id = conv_table.start(current_user)
                 conversation_ids.append(current_conv_id)
                 conversations.append(current_conversation)
-                conv_data.append(create_conv_record(
-                    current_conv_id, current_user))
                 current_conversation = ""
 
+            # Lead signals are only looked for in the start of long messages
+            scanned = message[:MAX_MESSAGE_CHARS]
+
             # Email / phone
-            if email_pattern.search(message):
-                conv_data[current_conv_id]["Email Captured"] = True
-            if phone_pattern.search(message):
-                nums = re.sub(
-                    r"\D", "", phone_pattern.search(message).group())
-                if len(nums) >= 7:
-                    conv_data[current_conv_id]["Phone Captured"] = True
+            if contains_email(scanned):
+                conv_table.mark(current_conv_id, EMAIL_CAPTURED)
+            if contains_phone(scanned):
+                conv_table.mark(current_conv_id, PHONE_CAPTURED)
             # Readiness
-            if readiness_keywords.search(message):
-                conv_data[current_conv_id]["Customer Readiness"] = True
+            if readiness_keywords.search(scanned):
+                conv_table.mark(current_conv_id, CUSTOMER_READINESS)
 
             # Trust concerns
-            if trust_keywords.search(message):
-                conv_data[current_conv_id]["Trust Concerns"] = True
+            if trust_keywords.search(scanned):
+                conv_table.mark(current_conv_id, TRUST_CONCERNS)
 
-            conv_data[current_conv_id]["Message Count"] += 1
+            conv_table.add_message(current_conv_id)
                     
-    return conversations, conv_data
+    return conversations, conv_table
 
 
-def calculate_conversation_metrics(conv_data: list, total_conversations: int) -> tuple:
+def calculate_conversation_metrics(conv_table: ConversationTable, total_conversations: int) -> tuple:
     """Calculate metrics from conversation data.
     
     Args:
-        conv_data: List of conversation data dictionaries
+        conv_table: Columnar conversation records
         total_conversations: Total number of conversations
         
     Returns:
         tuple: (email_conversion_rate, phone_conversion_rate, follow_up_rate, 
                 readiness_rate, lead_success_rate, trust_rate)
     """
-    # Calculate lead success
-    lead_success_count = sum(d["Lead Capture Success"] for d in conv_data)
-    readiness_count = sum(d["Customer Readiness"] for d in conv_data)
-    trust_count = sum(d["Trust Concerns"] for d in conv_data)
-
-    lead_success_rate = (
-        lead_success_count / total_conversations * 100) if total_conversations else 0
-    readiness_rate = (
-        readiness_count / total_conversations * 100) if total_conversations else 0
-    trust_rate = (trust_count / total_conversations * 100) if total_conversations else 0
-
-    # Calculate conversion rates
-    email_leads = sum(d["Email Captured"] for d in conv_data)
-    phone_leads = sum(d["Phone Captured"] for d in conv_data)
-    followup_conv_count = sum(d["Follow‑up"] for d in conv_data)
-
-    email_conversion_rate = (
-        email_leads / total_conversations) * 100 if total_conversations else 0
-    phone_conversion_rate = (
-        phone_leads / total_conversations) * 100 if total_conversations else 0
-    follow_up_rate = (
-        followup_conv_count / total_conversations * 100) if total_conversations else 0
-        
-    return (email_conversion_rate, phone_conversion_rate, follow_up_rate,
-            readiness_rate, lead_success_rate, trust_rate)
+    rates = conv_table.rates(total_conversations)
+    return (rates["Email Captured"], rates["Phone Captured"], rates["Follow-up"],
+            rates["Customer Readiness"], rates["Lead Capture Success"], rates["Trust Concerns"])
 
 def has_meaningful_data(trimmed_json: dict) -> bool:
     """Check if the trimmed JSON contains meaningful data for visualization.
@@ -237,52 +278,167 @@ def has_meaningful_data(trimmed_json: dict) -> bool:
         
     return False
 
-def process_content(content: str, filename: str, company_name: str) -> dict:
+def remember_analysis(document: str, company_name: str, analysis: dict):
+    """Store an analysis so near-duplicate uploads can reuse it."""
+    if not ANALYSIS_REUSE_CONFIG['enabled']:
+        return
+    try:
+        similarity_index.add(company_name, document, analysis)
+    except Exception as e:
+        logger.error(f"Failed to store analysis for reuse: {str(e)}")
+
+def find_reusable_analysis(document: str, company_name: str) -> tuple:
+    """Look up the analysis of an earlier near-duplicate upload.
+
+    If the document only differs in whitespace, case or removed lines, the
+    stored analysis is reused as is. If a few lines were added, the stored
+    analysis is refreshed with a delta prompt containing only those lines.
+    Larger changes find nothing, so the whole document is analysed again.
+
+    Args:
+        document: Document text that would be sent to the model
+        company_name: Name of the company; only its own uploads are reused
+
+    Returns:
+        tuple: (analysis, delta_prompt) - the stored analysis or None, and
+            the user prompt refreshing it or None to use it as is
+    """
+    if not ANALYSIS_REUSE_CONFIG['enabled']:
+        return None, None
+    try:
+        match = similarity_index.find(company_name, document)
+    except Exception as e:
+        logger.error(f"Similarity lookup failed: {str(e)}")
+        return None, None
+    if match is None:
+        return None, None
+
+    delta = added_lines(match.text, document)
+    if not delta:
+        logger.info(f"Reusing analysis of a previous upload (similarity {match.similarity:.2f})")
+        return match.analysis, None
+    if len(delta) > ANALYSIS_REUSE_CONFIG['max_delta_chars']:
+        logger.info(
+            f"Similar upload found (similarity {match.similarity:.2f}) but {len(delta)} characters "
+            f"were added; analysing the whole document")
+        return None, None
+    if not ANALYSIS_REUSE_CONFIG['delta_refresh']:
+        logger.info(f"Reusing analysis of a similar upload (similarity {match.similarity:.2f})")
+        return match.analysis, None
+
+    logger.info(
+        f"Refreshing analysis of a similar upload (similarity {match.similarity:.2f}) "
+        f"with {len(delta)} characters of added lines")
+    user_prompt = (prompt_delta_user
+                   .replace("{{PREVIOUS_ANALYSIS}}", json.dumps(match.analysis, ensure_ascii=False))
+                   .replace("{{ADDED_LINES}}", delta))
+    return match.analysis, user_prompt
+
+def reuse_analysis(document: str, company_name: str) -> Optional[dict]:
+    """Return the analysis of an earlier near-duplicate upload, or None.
+
+    See ``find_reusable_analysis``; a delta refresh that fails falls back to
+    the stored analysis.
+    """
+    previous, delta_prompt = find_reusable_analysis(document, company_name)
+    if delta_prompt is None:
+        return previous
+    try:
+        analysis = parse_openai_response(call_openai(get_openai_client(), delta_prompt, prompt1_system))
+    except Exception as e:
+        logger.warning(f"Delta refresh failed, reusing previous analysis: {str(e)}")
+        return previous
+    remember_analysis(document, company_name, analysis)
+    return analysis
+
+def classify_content(content: str):
+    """Classify a document as conversational or not from a bounded sample of lines."""
+    with memory_stage('classify'):
+        classification = classify_document(content)
+    logger.info(
+        f"Classified as {classification.mode} ({classification.document_type}) "
+        f"from {classification.sampled_chars:,} of {len(content):,} characters")
+    return classification
+
+def analysis_document(content: str) -> str:
+    """Return the part of a document that is sent to the model."""
+    return content[:LLM_CONFIG['max_input_chars']]
+
+def analysis_prompt(document: str) -> str:
+    """Build the user prompt of the main analysis call."""
+    return prompt1_user.replace("{{DOCUMENT_CONTENT}}", document)
+
+def process_content(content: str, filename: str, company_name: str,
+                    render_report: bool = True,
+                    chart_renderer: Optional[str] = None) -> dict:
     """Process content and generate report data.
     
     Args:
         content: The text content to analyze
         filename: Name of the uploaded file
         company_name: Name of the company
+        render_report: Produce a PDF report and email it. When False only
+            the structured analysis is returned and ``report_path`` is None.
+            With ``REPORT_CONFIG['lazy_render']`` the PDF is not built here;
+            ``report_path`` points at an endpoint that renders it on first
+            download.
+        chart_renderer: 'matplotlib' or 'vector' charts for this report;
+            defaults to REPORT_CONFIG['charts']['renderer']
         
     Returns:
         dict: Analysis results including metrics, keywords, and report path
     """
+    classification = classify_content(content)
+
+    # Get AI analysis, reusing the analysis of a near-duplicate upload when possible
+    document = analysis_document(content)
+    with memory_stage('analysis'):
+        ai_analysis_json = reuse_analysis(document, company_name)
+        if ai_analysis_json is None:
+            client = get_openai_client()
+            ai_analysis = call_openai(client, analysis_prompt(document), prompt1_system)
+
+            logger.info(f"AI analysis: {ai_analysis}")
+            ai_analysis_json = parse_openai_response(ai_analysis)
+            remember_analysis(document, company_name, ai_analysis_json)
+
+    return complete_analysis(content, filename, company_name, classification, ai_analysis_json,
+                             render_report=render_report, chart_renderer=chart_renderer)
+
+def complete_analysis(content: str, filename: str, company_name: str, classification,
+                      ai_analysis_json: dict, render_report: bool = True,
+                      chart_renderer: Optional[str] = None, notify: bool = True) -> dict:
+    """Compute metrics from a classified document and its AI analysis, then report.
+
+    Records trends, indexes the document for search and renders (or
+    schedules) the report as described in ``process_content``.
+
+    Args:
+        notify: Email the report; callers without an application context
+            (e.g. worker processes) pass False and call ``notify_report``
+    """
     word_count = len(content.split())
     line_count = len(content.splitlines())
+    mode = classification.mode
 
-    lines = [line.rstrip("\n") for line in content.splitlines()]
-    # Detect if it's a conversational document
-    has_agent = any(re.match(r"Agent:", line) for line in lines)
-    has_other_speaker = any(re.match(
-        r"[^:]{1,40}:", line) and not line.startswith("Agent:") for line in lines)
-    mode = "Conversational Document" if has_agent and has_other_speaker else "Normal Document"
-
-    # Get AI analysis
-    client = get_openai_client()
-    user_prompt = prompt1_user.replace("{{DOCUMENT_CONTENT}}", content[:20000])
-    ai_analysis = call_openai(client, user_prompt, prompt1_system)
-   
-    current_app.logger.info(f"AI analysis: {ai_analysis}")
-    ai_analysis_json = parse_openai_response(ai_analysis)
-    current_app.logger.info(f"=================================================")
-    current_app.logger.info(f"=================================================")
-    current_app.logger.info(f"=================================================")
-    current_app.logger.info(f"PARSED AI analysis: {ai_analysis_json}")
-    current_app.logger.info(f"=================================================")
-    current_app.logger.info(f"=================================================")
+    logger.info(f"=================================================")
+    logger.info(f"=================================================")
+    logger.info(f"=================================================")
+    logger.info(f"PARSED AI analysis: {ai_analysis_json}")
+    logger.info(f"=================================================")
+    logger.info(f"=================================================")
 
     if mode == "Conversational Document":
-        conversations, conv_data = process_conversations(lines, company_name)
+        with memory_stage('conversations'):
+            lines = [line.rstrip("\n") for line in content.splitlines()]
+            conversations, conv_table = process_conversations(lines, company_name)
+            del lines
         total_conversations = len(conversations)
-        
-        for d in conv_data:
-            d["Lead Capture Success"] = d["Email Captured"] or d["Phone Captured"]
                     
         # Calculate metrics
         (email_conversion_rate, phone_conversion_rate, follow_up_rate,
          readiness_rate, lead_success_rate, trust_rate) = calculate_conversation_metrics(
-            conv_data, total_conversations)
+            conv_table, total_conversations)
 
     else:
         email_conversion_rate = 0
@@ -293,7 +449,7 @@ def process_content(content: str, filename: str, company_name: str) -> dict:
         trust_rate = 0
         total_conversations = 0
         conversations = []
-        conv_data = []
+        conv_table = ConversationTable()
         top_keywords = []
 
     metrics = ReportMetrics(
@@ -310,25 +466,60 @@ def process_content(content: str, filename: str, company_name: str) -> dict:
         ai_analysis=ai_analysis_json
     )
 
-    current_app.logger.info(f"Metrics: {metrics}")
+    logger.info(f"Metrics: {metrics}")
+
+    try:
+        recorded = trend_store.record(company_name, metrics, filename=filename)
+        logger.info(f"Recorded {recorded} trend values for {company_name}")
+    except Exception as e:
+        logger.error(f"Failed to record trends: {str(e)}")
+
+    try:
+        search_index.add(company_name, filename, content, ai_analysis_json)
+    except Exception as e:
+        logger.error(f"Failed to index document for search: {str(e)}")
 
-    report_generator = ReportGenerator(filename, company_name)
-    report_path, overview = report_generator.generate(
-        mode=mode,
-        metrics=metrics,
-    )
     key_topics = metrics.ai_analysis.get("key_topics", [])
     themes = metrics.ai_analysis.get("themes", [])
 
+    if not render_report:
+        logger.info("Skipping report rendering (JSON-only analysis)")
+        return {
+            'report_path': None,
+            'overview': build_overview(company_name, metrics),
+            'key_topics': key_topics,
+            'themes': themes,
+            'metrics': metrics
+        }
+
+    report_options = {'chart_renderer': chart_renderer} if chart_renderer else {}
+    if REPORT_CONFIG['lazy_render']:
+        report_id = report_store.save_spec(filename, company_name, mode, metrics, **report_options)
+        report_path = f"/reports/{report_id}.pdf"
+        overview = build_overview(company_name, metrics)
+        logger.info(f"Report {report_id} will be rendered on first download")
+    else:
+        with memory_stage('report'):
+            report_generator = ReportGenerator(filename, company_name, **report_options)
+            report_path, overview = report_generator.generate(
+                mode=mode,
+                metrics=metrics,
+            )
+
+    if notify:
+        notify_report(report_path, company_name)
 
-    
-    # Send email with report
-    send_report_email(report_path, company_name)
-    
     return {
         'report_path': report_path,
         'overview': overview,
         'key_topics': key_topics,
         'themes': themes,
         'metrics': metrics
-    } 
\ No newline at end of file
+    } 
+
+def notify_report(report_path: str, company_name: str):
+    """Email a rendered report, or a link to it when reports render lazily."""
+    if REPORT_CONFIG['lazy_render']:
+        send_report_link_email(report_path, company_name)
+    else:
+        send_report_email(report_path, company_name)
@@ -3,24 +3,42 @@ Service for handling email functionality.
 """
 import os
 import logging
-from flask import current_app
+from typing import Optional, Tuple
+from flask import current_app, has_app_context, has_request_context, request
 from flask_mail import Message
 from ..config.config import MAIL_CONFIG
 
 logger = logging.getLogger(__name__)
 
+def _smtp_settings() -> Tuple[Optional[str], Optional[str]]:
+    """Return ``(recipient, None)``, or ``(None, reason)`` when mail cannot be sent."""
+    if not has_app_context():
+        logger.info("No application context, skipping report email")
+        return None, "Email skipped: no application context"
+
+    recipient_email = os.getenv("RECEIVER_MAIL")
+    if not recipient_email:
+        logger.error("RECEIVER_MAIL environment variable not set")
+        return None, "Error: RECEIVER_MAIL not configured"
+
+    if not os.getenv("MAIL_USERNAME") or not os.getenv("MAIL_PASSWORD"):
+        logger.error("MAIL_USERNAME or MAIL_PASSWORD not configured")
+        return None, "Error: Email credentials not configured"
+    return recipient_email, None
+
+def _send(msg: Message) -> None:
+    """Send a message with the application's mailer."""
+    recipient_email = ', '.join(msg.recipients)
+    logger.info(f"Attempting to send email to {recipient_email}")
+    current_app.mail.send(msg)
+    logger.info(f"Email sent successfully to {recipient_email}")
+
 def send_report_email(report_path: str, company_name: str) -> str:
     """Send report via email."""
+    recipient_email, skipped = _smtp_settings()
+    if skipped:
+        return skipped
     try:
-        recipient_email = os.getenv("RECEIVER_MAIL")
-        if not recipient_email:
-            logger.error("RECEIVER_MAIL environment variable not set")
-            return "Error: RECEIVER_MAIL not configured"
-
-        if not os.getenv("MAIL_USERNAME") or not os.getenv("MAIL_PASSWORD"):
-            logger.error("MAIL_USERNAME or MAIL_PASSWORD not configured")
-            return "Error: Email credentials not configured"
-
         msg = Message(
             subject=f"Trendlyzer Report for {company_name}",
             recipients=[recipient_email],
@@ -38,12 +56,35 @@ def send_report_email(report_path: str, company_name: str) -> str:
                 content_type='application/pdf',
                 data=fp.read()
             )
-        
-        logger.info(f"Attempting to send email to {recipient_email}")
-        current_app.mail.send(msg)
-        logger.info(f"Report sent successfully to {recipient_email}")
+
+        _send(msg)
         return f"EMAIL sent to {recipient_email} with {report_path}"
     except Exception as e:
         logger.error(f"Failed to send email: {str(e)}")
         logger.error(f"Mail config: {MAIL_CONFIG}")
-        return f"Failed to send email: {str(e)}" 
\ No newline at end of file
+        return f"Failed to send email: {str(e)}" 
+
+def send_report_link_email(report_path: str, company_name: str) -> str:
+    """Send a link to a lazily rendered report instead of attaching the PDF."""
+    recipient_email, skipped = _smtp_settings()
+    if skipped:
+        return skipped
+    try:
+        report_url = report_path
+        if has_request_context():
+            report_url = request.host_url.rstrip('/') + report_path
+
+        msg = Message(
+            subject=f"Trendlyzer Report for {company_name}",
+            recipients=[recipient_email],
+            body=(
+                f"A Trendlyzer report for {company_name} was just analyzed!\n\n"
+                f"Download the report: {report_url}"
+            )
+        )
+
+        _send(msg)
+        return f"EMAIL sent to {recipient_email} with {report_url}"
+    except Exception as e:
+        logger.error(f"Failed to send email: {str(e)}")
+        return f"Failed to send email: {str(e)}"
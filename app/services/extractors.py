@@ -0,0 +1,202 @@
+"""
+Service for extracting text from uploaded documents.
+
+Extractors are registered per file extension and yield the document as a
+sequence of positioned chunks (pages, slides, sheet rows, paragraphs or
+decoded blocks of plain text) instead of one string, so a caller can stream
+them, group them for chunked analysis or stop as soon as it has enough text
+without the rest of the document being extracted.
+
+    for chunk in iter_chunks(stream, 'pdf'):
+        print(chunk.unit, chunk.index, len(chunk.text))
+
+``extract_text`` joins the chunks into the single string the analysis
+pipeline works on, optionally stopping after a number of characters.  New
+formats are added with the ``register_extractor`` decorator.
+"""
+import logging
+from collections import namedtuple
+from typing import Callable, Iterator, Optional
+
+import docx
+import pandas as pd
+from PyPDF2 import PdfReader
+
+from .ooxml_text import OOXMLError, docx_chunks, pptx_chunks
+from .text_ingest import open_text
+from ..config.config import EXTRACTION_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# unit: 'page', 'slide', 'notes', 'rows', 'paragraph', 'table_row' or 'text'
+# index: 1-based page, slide, paragraph or row number; character offset for 'text'
+# label: sheet name or table number where the unit needs one
+Chunk = namedtuple('Chunk', ['text', 'unit', 'index', 'label'], defaults=[None])
+
+# Sheet rows per chunk; one chunk per sheet would hold a large sheet at once
+ROWS_PER_CHUNK = 500
+
+_EXTRACTORS = {}
+
+
+def register_extractor(*extensions: str, separator: str = '\n'):
+    """Register a chunk generator for one or more file extensions.
+
+    Args:
+        extensions: Lowercase extensions without the dot
+        separator: Inserted between chunks by ``extract_text``
+    """
+    def decorator(func: Callable[[object], Iterator[Chunk]]):
+        for extension in extensions:
+            _EXTRACTORS[extension] = (func, separator)
+        return func
+    return decorator
+
+
+def supported_extensions() -> set:
+    """Return the extensions that have an extractor."""
+    return set(_EXTRACTORS)
+
+
+def iter_chunks(source, file_extension: str) -> Iterator[Chunk]:
+    """Yield the text of a document chunk by chunk.
+
+    Args:
+        source: Path of the file, or a seekable binary stream
+        file_extension: Lowercase extension without the dot
+
+    Raises:
+        ValueError: No extractor is registered for the extension
+    """
+    if file_extension not in _EXTRACTORS:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    return _EXTRACTORS[file_extension][0](source)
+
+
+def extract_text(source, file_extension: str, max_chars: Optional[int] = None) -> str:
+    """Extract the text of a document as one string.
+
+    Args:
+        source: Path of the file, or a seekable binary stream
+        file_extension: Lowercase extension without the dot
+        max_chars: Stop extracting once this many characters are collected
+
+    Raises:
+        ValueError: No extractor is registered for the extension
+    """
+    chunks = iter_chunks(source, file_extension)
+    separator = _EXTRACTORS[file_extension][1]
+    parts = []
+    total = 0
+    try:
+        for chunk in chunks:
+            parts.append(chunk.text)
+            total += len(chunk.text) + len(separator)
+            if max_chars is not None and total >= max_chars:
+                break
+    finally:
+        # Releases files and workbooks held by a generator stopped early
+        chunks.close()
+    text = separator.join(parts)
+    return text if max_chars is None else text[:max_chars]
+
+
+@register_extractor('txt', 'csv', 'md', 'rtf', separator='')
+def _text_chunks(source) -> Iterator[Chunk]:
+    offset = 0
+    for text in open_text(source):
+        yield Chunk(text, 'text', offset)
+        offset += len(text)
+
+
+@register_extractor('pdf', separator=' ')
+def _pdf_chunks(source) -> Iterator[Chunk]:
+    reader = PdfReader(source)
+    for number, page in enumerate(reader.pages, 1):
+        text = page.extract_text()
+        if text:
+            yield Chunk(text, 'page', number)
+
+
+def _ooxml_chunks(source, fast_path, library) -> Iterator[Chunk]:
+    """Yield chunks from the lxml fast path, or from the library if it cannot read the file.
+
+    If the fast path fails part way, the library reads the file again and
+    only the chunks the fast path had not yielded yet are passed on.
+    """
+    emitted = set()
+    if EXTRACTION_CONFIG['ooxml_fast_path']:
+        try:
+            for chunk in fast_path(source):
+                chunk = Chunk(*chunk)
+                emitted.add(chunk[1:])
+                yield chunk
+        except OOXMLError as e:
+            logger.info(f"Reading with the OOXML library instead of the fast path: {e}")
+            if hasattr(source, 'seek'):
+                source.seek(0)
+        else:
+            if emitted:
+                return
+    for chunk in library(source):
+        if chunk[1:] not in emitted:
+            yield chunk
+
+
+def _docx_library_chunks(source) -> Iterator[Chunk]:
+    document = docx.Document(source)
+    for number, paragraph in enumerate(document.paragraphs, 1):
+        yield Chunk(paragraph.text, 'paragraph', number)
+    for table_number, table in enumerate(document.tables, 1):
+        for number, row in enumerate(table.rows, 1):
+            yield Chunk('\t'.join(cell.text for cell in row.cells), 'table_row', number, f"table {table_number}")
+
+
+@register_extractor('xlsx')
+def _xlsx_chunks(source) -> Iterator[Chunk]:
+    from openpyxl import load_workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            lines = []
+            first_row = 1
+            for number, row in enumerate(sheet.iter_rows(values_only=True), 1):
+                lines.append('\t'.join('' if value is None else str(value) for value in row))
+                if len(lines) == ROWS_PER_CHUNK:
+                    yield Chunk('\n'.join(lines), 'rows', first_row, sheet.title)
+                    lines = []
+                    first_row = number + 1
+            if lines:
+                yield Chunk('\n'.join(lines), 'rows', first_row, sheet.title)
+    finally:
+        workbook.close()
+
+
+@register_extractor('xls')
+def _xls_chunks(source) -> Iterator[Chunk]:
+    # xlrd has no streaming mode; each sheet is read as a whole
+    for name, frame in pd.read_excel(source, sheet_name=None).items():
+        yield Chunk(frame.to_string(index=False), 'rows', 1, name)
+
+
+@register_extractor('doc', 'docx')
+def _docx_chunks(source) -> Iterator[Chunk]:
+    return _ooxml_chunks(source, docx_chunks, _docx_library_chunks)
+
+
+def _pptx_library_chunks(source) -> Iterator[Chunk]:
+    from pptx import Presentation
+    presentation = Presentation(source)
+    for number, slide in enumerate(presentation.slides, 1):
+        texts = [shape.text for shape in slide.shapes if hasattr(shape, 'text')]
+        if texts:
+            yield Chunk('\n'.join(texts), 'slide', number)
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame
+            if notes is not None and notes.text.strip():
+                yield Chunk(notes.text.strip(), 'notes', number)
+
+
+@register_extractor('ppt', 'pptx')
+def _pptx_chunks(source) -> Iterator[Chunk]:
+    return _ooxml_chunks(source, pptx_chunks, _pptx_library_chunks)
@@ -0,0 +1,385 @@
+"""
+Service for admission control of LLM calls.
+
+A single process-wide governor sits in front of every completion request:
+
+* identical in-flight prompts are coalesced into one upstream call
+  (singleflight) and every caller receives the same result;
+* the number of concurrent upstream calls is bounded by an adaptive limit
+  (AIMD): it grows slowly while calls succeed at normal latency and is cut
+  multiplicatively on 429 responses or when latency degrades;
+* callers over the limit wait in a FIFO queue, so requests are admitted in
+  arrival order instead of racing each other.
+
+Threads (the Flask routes) and coroutines (the ASGI analysis route) share
+the same limit, queue and throttle state; the ``*_async`` methods suspend
+the calling coroutine where the others block the calling thread.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..config.config import LLM_GOVERNOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class GovernorTimeout(Exception):
+    """Raised when a call waits longer than the queue timeout for admission."""
+
+
+class CallCancelled(Exception):
+    """Raised by an admitted call that is no longer needed; not counted as a failure."""
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Check whether an exception represents an upstream 429 response."""
+    return getattr(exc, 'status_code', None) == 429
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Extract a Retry-After delay (seconds) from an API error, if present."""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class _InFlight:
+    """A call shared by every caller that asked for the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class LLMGovernor:
+    """Adaptive concurrency limiter with fair queueing and request coalescing."""
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        backoff_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        queue_timeout: float = 300.0,
+        max_throttle_retries: int = 3,
+        throttle_base_delay: float = 1.0,
+    ):
+        """Initialize the governor."""
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+        self.max_throttle_retries = max_throttle_retries
+        self.throttle_base_delay = throttle_base_delay
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters = deque()
+        self._cond = threading.Condition()
+        # Queued coroutines by ticket: (event loop, asyncio.Event to wake them)
+        self._wakeups: Dict[object, tuple] = {}
+        self._min_latency: Optional[float] = None
+        self._avg_latency: Optional[float] = None
+
+        self._calls: Dict[str, _InFlight] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+        self._calls_lock = threading.Lock()
+
+        self._counters = {
+            'admitted': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'throttled': 0,
+            'coalesced': 0,
+            'queue_timeouts': 0,
+        }
+
+    @staticmethod
+    def request_key(*parts: str) -> str:
+        """Build a coalescing key from the parts that identify a request."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8', 'surrogatepass'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return max(int(self._limit), 1)
+
+    def has_capacity(self) -> bool:
+        """Check whether a new call would be admitted without queueing."""
+        with self._cond:
+            return not self._waiters and self._in_flight < self.limit
+
+    def _notify(self):
+        """Wake every queued thread and coroutine; called holding ``_cond``."""
+        self._cond.notify_all()
+        for loop, wakeup in self._wakeups.values():
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # Loop closed; its coroutines are gone
+                pass
+
+    def _try_acquire(self, ticket) -> bool:
+        """Take a slot if ``ticket`` is first in line and one is free; called holding ``_cond``."""
+        if not (self._waiters[0] is ticket and self._in_flight < self.limit):
+            return False
+        self._waiters.popleft()
+        self._in_flight += 1
+        self._counters['admitted'] += 1
+        # The next waiter may be admissible too if the limit has grown
+        self._notify()
+        return True
+
+    def _leave_queue(self, ticket, timed_out: bool = False) -> GovernorTimeout:
+        """Remove a waiter that gives up; called holding ``_cond``.
+
+        Returns:
+            GovernorTimeout: The error to raise for a timed-out waiter
+        """
+        self._waiters.remove(ticket)
+        self._notify()
+        if timed_out:
+            self._counters['queue_timeouts'] += 1
+        return GovernorTimeout(
+            f"LLM call not admitted within {self.queue_timeout:.0f}s "
+            f"({self._in_flight} in flight, {len(self._waiters)} queued)")
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._notify()
+
+    @contextmanager
+    def admit(self):
+        """Wait (FIFO) for a free slot and hold it for the duration of the block."""
+        ticket = object()
+        deadline = time.monotonic() + self.queue_timeout
+        with self._cond:
+            self._waiters.append(ticket)
+            while not self._try_acquire(ticket):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._leave_queue(ticket, timed_out=True)
+                self._cond.wait(remaining)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def admit_async(self):
+        """Like ``admit``, suspending the calling coroutine while it waits."""
+        ticket = object()
+        deadline = time.monotonic() + self.queue_timeout
+        wakeup = asyncio.Event()
+        with self._cond:
+            self._waiters.append(ticket)
+            self._wakeups[ticket] = (asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                with self._cond:
+                    if self._try_acquire(ticket):
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._leave_queue(ticket, timed_out=True)
+                    # Cleared under the lock, so a release after this point sets it again
+                    wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # The request went away while queued
+            with self._cond:
+                self._leave_queue(ticket)
+            raise
+        finally:
+            with self._cond:
+                del self._wakeups[ticket]
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _on_success(self, latency: float):
+        """Record a successful call and grow the limit if latency is healthy."""
+        with self._cond:
+            self._counters['succeeded'] += 1
+            if self._min_latency is None or latency < self._min_latency:
+                self._min_latency = latency
+            self._avg_latency = latency if self._avg_latency is None else (
+                0.8 * self._avg_latency + 0.2 * latency)
+            if self._avg_latency > self._min_latency * self.latency_tolerance:
+                self._limit = max(self.min_limit, self._limit * 0.9)
+                # Let the baseline drift up so one fast outlier does not pin
+                # the limit low forever.
+                self._min_latency *= 1.05
+            else:
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._notify()
+
+    def _on_throttle(self):
+        """Record a 429 and cut the limit multiplicatively."""
+        with self._cond:
+            self._counters['throttled'] += 1
+            self._limit = max(self.min_limit, self._limit * self.backoff_factor)
+            logger.warning(f"LLM throttled, concurrency limit now {self.limit}")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Record a failed call and return the delay before retrying it.
+
+        Returns:
+            float: Seconds to wait outside the slot, or None if ``error`` is
+                final (not a 429, or out of retries) and must be raised
+        """
+        if isinstance(error, CallCancelled):
+            return None
+        if is_throttle_error(error):
+            self._on_throttle()
+            if attempt < self.max_throttle_retries:
+                delay = _retry_after(error) or self.throttle_base_delay * (2 ** attempt)
+                return delay * random.uniform(0.5, 1.5)
+        with self._cond:
+            self._counters['failed'] += 1
+        return None
+
+    def execute(self, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` under admission control, retrying on throttling."""
+        attempt = 0
+        while True:
+            with self.admit():
+                started = time.monotonic()
+                try:
+                    result = fn()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self._on_success(time.monotonic() - started)
+                    return result
+            # Sleep outside the slot so other callers can use it
+            attempt += 1
+            time.sleep(delay)
+
+    async def execute_async(self, fn: Callable[[], Awaitable]) -> Any:
+        """Await ``fn()`` under admission control, retrying on throttling."""
+        attempt = 0
+        while True:
+            async with self.admit_async():
+                started = time.monotonic()
+                try:
+                    result = await fn()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                else:
+                    self._on_success(time.monotonic() - started)
+                    return result
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def coalesce(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once per in-flight ``key`` and share its outcome.
+
+        Args:
+            key: Coalescing key (see ``request_key``)
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            The result of ``fn``, shared with concurrent callers of the same key
+        """
+        with self._calls_lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlight()
+            else:
+                call.followers += 1
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._calls_lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def coalesce_async(self, key: str, fn: Callable[[], Awaitable]) -> Any:
+        """Await ``fn()`` once per in-flight ``key`` on this event loop and share its outcome.
+
+        The call runs as its own task, so a caller that goes away (e.g. a
+        client disconnecting) does not cancel it for the others.
+        """
+        task_key = (asyncio.get_running_loop(), key)
+        with self._calls_lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+            else:
+                self._counters['coalesced'] += 1
+
+        if leader:
+            def done(finished: asyncio.Task):
+                with self._calls_lock:
+                    if self._tasks.get(task_key) is finished:
+                        del self._tasks[task_key]
+                if not finished.cancelled():
+                    # Retrieved here so an outcome nobody awaited is not logged
+                    finished.exception()
+            task.add_done_callback(done)
+        return await asyncio.shield(task)
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Coalesce on ``key`` and run ``fn`` under admission control."""
+        return self.coalesce(key, lambda: self.execute(fn))
+
+    async def call_async(self, key: str, fn: Callable[[], Awaitable]) -> Any:
+        """Coalesce on ``key`` and await ``fn()`` under admission control."""
+        return await self.coalesce_async(key, lambda: self.execute_async(fn))
+
+    def stats(self) -> dict:
+        """Return a snapshot of the governor state and counters."""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'queued': len(self._waiters),
+                'avg_latency': round(self._avg_latency, 3) if self._avg_latency else None,
+                'min_latency': round(self._min_latency, 3) if self._min_latency else None,
+                **self._counters,
+            }
+
+
+llm_governor = LLMGovernor(**LLM_GOVERNOR_CONFIG)
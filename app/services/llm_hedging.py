@@ -0,0 +1,405 @@
+"""
+Service for bounding LLM tail latency with hedged requests and model fallback.
+
+Each logical LLM call starts with the primary model.  If no valid answer has
+arrived after a hedge delay (a percentile of recently observed latencies), a
+duplicate request is sent, optionally to the next model in an ordered
+fallback list.  A failed attempt triggers the next one immediately.  The
+first valid response wins; attempts that have not reached the upstream yet
+are cancelled and the results of the others are discarded.  The whole call
+is bounded by a total timeout.
+
+Attempts are admitted by the LLM governor.  A hedge adds load, so none is
+sent while the governor has no free slot, and the hedge delay is measured
+from admission so time spent queueing does not raise it.
+
+``call`` runs attempts on a thread pool for the Flask routes; ``call_async``
+runs them as tasks for the ASGI route, where a losing attempt is cancelled
+even while its request is in flight.  Both share the latency window and the
+counters.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from .llm_governor import CallCancelled, LLMGovernor, llm_governor
+from ..config.config import LLM_CONFIG, LLM_HEDGING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeTimeout(Exception):
+    """Raised when no attempt produced a valid response within the total timeout."""
+
+
+# Seconds between checks for a free governor slot while a hedge is due
+HEDGE_RECHECK_INTERVAL = 0.5
+
+
+class _AttemptGuard:
+    """Runs an attempt's upstream request once the attempt has been admitted.
+
+    Raises ``CallCancelled`` instead if the logical call was decided while
+    the attempt waited, so it never reaches the upstream.  A valid response
+    decides the call before the attempt releases its governor slot, so no
+    attempt queued behind it is admitted in between.  Latency is measured
+    from admission.
+    """
+
+    def __init__(self, call: '_HedgedCall'):
+        self._call = call
+        self.started = time.monotonic()
+
+    def _enter(self):
+        if self._call.finished.is_set():
+            raise CallCancelled('LLM call already answered by another attempt')
+        self.started = time.monotonic()
+
+    def _leave(self, result: Any) -> Any:
+        if self._call.validate(result):
+            self._call.finished.set()
+        return result
+
+    def __call__(self, request: Callable[[], Any]) -> Any:
+        self._enter()
+        return self._leave(request())
+
+    async def run_async(self, request: Callable[[], Awaitable]) -> Any:
+        self._enter()
+        return self._leave(await request())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+class _HedgedCall:
+    """State of one logical call, shared by the blocking and asyncio loops."""
+
+    def __init__(self, hedge_delay: float, total_timeout: float, validate: Callable[[Any], bool]):
+        self.started = time.monotonic()
+        self.deadline = self.started + total_timeout
+        self.delay = hedge_delay
+        self.next_hedge_at = self.started + hedge_delay
+        self.validate = validate
+        # Set once the call is decided; attempts still queued then give up
+        self.finished = threading.Event()
+        # future or task -> (attempt number, model, reason)
+        self.pending = {}
+        self.attempts = 0
+        self.last_error: Optional[BaseException] = None
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list (``pct`` in 0-100)."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class HedgedCaller:
+    """Runs LLM attempts with percentile-based hedging and ordered fallback."""
+
+    def __init__(
+        self,
+        models: List[str],
+        hedge_percentile: float = 90,
+        default_hedge_delay: float = 30.0,
+        min_hedge_delay: float = 5.0,
+        max_hedge_delay: float = 60.0,
+        min_samples: int = 20,
+        max_attempts: int = 3,
+        hedge_to_fallback: bool = True,
+        total_timeout: float = 180.0,
+        window: int = 200,
+        max_workers: Optional[int] = None,
+        governor: Optional[LLMGovernor] = None,
+    ):
+        """Initialize the caller.
+
+        Args:
+            models: Primary model followed by fallback models, in order
+            hedge_percentile: Latency percentile after which a hedge is sent
+            default_hedge_delay: Hedge delay used until enough samples exist
+            min_hedge_delay: Lower bound for the hedge delay (seconds)
+            max_hedge_delay: Upper bound for the hedge delay (seconds)
+            min_samples: Samples needed before the percentile is trusted
+            max_attempts: Maximum attempts (primary + hedges/fallbacks) per call
+            hedge_to_fallback: Send hedges to the next fallback model instead
+                of duplicating the request on the same model
+            total_timeout: Upper bound for the whole call (seconds)
+            window: Number of recent latencies kept for the percentile
+            max_workers: Size of the thread pool running attempts; by
+                default enough for every attempt the governor can admit
+                (``max_limit``) times ``max_attempts``, so attempts queued
+                for admission or abandoned while running cannot take the
+                threads new calls need
+            governor: Governor admitting the attempts; hedges wait while it
+                has no free slot
+        """
+        self.models = list(models)
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.max_attempts = max_attempts
+        self.hedge_to_fallback = hedge_to_fallback
+        self.total_timeout = total_timeout
+        self.governor = governor
+
+        self._latencies = deque(maxlen=window)
+        self._call_latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        if max_workers is None:
+            max_workers = int(governor.max_limit) * max_attempts if governor is not None else 32
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='llm-attempt')
+        self._counters = {
+            'calls': 0,
+            'hedged_calls': 0,
+            'hedge_wins': 0,
+            'fallback_wins': 0,
+            'failed_attempts': 0,
+            'timeouts': 0,
+            'cancelled_attempts': 0,
+        }
+
+    def hedge_delay(self) -> float:
+        """Current hedge delay derived from recently observed latencies."""
+        with self._lock:
+            samples = list(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_hedge_delay
+        delay = _percentile(samples, self.hedge_percentile)
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    def _model_for(self, attempt: int, reason: str) -> str:
+        """Pick the model for the given attempt number."""
+        if reason == 'hedge' and not self.hedge_to_fallback:
+            return self.models[0]
+        return self.models[min(attempt, len(self.models) - 1)]
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _begin(self, validate: Callable[[Any], bool]) -> _HedgedCall:
+        self._count('calls')
+        return _HedgedCall(self.hedge_delay(), self.total_timeout, validate)
+
+    def _next_attempt(self, call: _HedgedCall, reason: str) -> Tuple[tuple, _AttemptGuard]:
+        """Number the next attempt and pick its model.
+
+        Returns:
+            tuple: ((attempt number, model, reason), guard for the attempt)
+        """
+        model = self._model_for(call.attempts, reason)
+        attempt = (call.attempts, model, reason)
+        call.attempts += 1
+        if reason == 'hedge' and call.attempts == 2:
+            self._count('hedged_calls')
+        if reason != 'primary':
+            logger.info(f"LLM attempt {call.attempts} ({reason}) on {model}")
+        return attempt, _AttemptGuard(call)
+
+    def _wait_timeout(self, call: _HedgedCall) -> float:
+        """Seconds to wait for an attempt before the next hedge or the deadline.
+
+        Raises:
+            HedgeTimeout: The total timeout has passed
+        """
+        now = time.monotonic()
+        if now >= call.deadline:
+            self._count('timeouts')
+            raise HedgeTimeout(
+                f"No valid LLM response within {self.total_timeout:.0f}s "
+                f"after {call.attempts} attempt(s)")
+        wake_at = call.deadline
+        if call.attempts < self.max_attempts:
+            wake_at = min(wake_at, call.next_hedge_at)
+        return max(0.0, wake_at - now)
+
+    def _settle(self, call: _HedgedCall, attempt: tuple,
+                error: Optional[BaseException], outcome: Optional[tuple]) -> bool:
+        """Handle a finished attempt; return True if its response wins the call.
+
+        A failed or invalid attempt is recorded as the call's last error; the
+        caller then launches a fallback if ``_fallback_due``.
+        """
+        number, model, reason = attempt
+        if isinstance(error, CallCancelled):
+            # The winner finished in the same round and is settled next
+            self._count('cancelled_attempts')
+            return False
+        if error is None:
+            result, latency = outcome
+            if call.validate(result):
+                self._record_win(number, model, reason, latency, call.started)
+                return True
+            error = ValueError(f"Invalid LLM response from {model}")
+        call.last_error = error
+        self._count('failed_attempts')
+        logger.warning(f"LLM attempt on {model} failed: {error}")
+        return False
+
+    def _fallback_due(self, call: _HedgedCall) -> bool:
+        return not call.finished.is_set() and call.attempts < self.max_attempts
+
+    def _hedge_due(self, call: _HedgedCall) -> bool:
+        """Check whether a hedge should be sent now, scheduling the next check."""
+        if call.attempts >= self.max_attempts or time.monotonic() < call.next_hedge_at:
+            return False
+        if self.governor is not None and not self.governor.has_capacity():
+            # A hedge would only queue behind the attempts it is meant to race
+            call.next_hedge_at = time.monotonic() + HEDGE_RECHECK_INTERVAL
+            return False
+        call.next_hedge_at = time.monotonic() + call.delay
+        return True
+
+    def call(
+        self,
+        attempt_fn: Callable[[str, Callable], Any],
+        validate: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """Run ``attempt_fn(model, guarded)`` with hedging and fallback.
+
+        Args:
+            attempt_fn: Performs one upstream request for the given model.
+                Once admitted by the governor it must send the request as
+                ``guarded(request)``, which raises ``CallCancelled`` when
+                another attempt has already won.
+            validate: Returns True for a usable response
+
+        Returns:
+            The first valid response
+
+        Raises:
+            HedgeTimeout: If nothing valid arrived within the total timeout
+            Exception: The last attempt error if every attempt failed
+        """
+        call = self._begin(validate)
+
+        def launch(reason: str):
+            attempt, guard = self._next_attempt(call, reason)
+            future = self._executor.submit(self._timed_attempt, attempt_fn, attempt[1], guard)
+            call.pending[future] = attempt
+
+        launch('primary')
+        try:
+            while call.pending:
+                done, _ = wait(list(call.pending), timeout=self._wait_timeout(call),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    error = future.exception()
+                    outcome = None if error else future.result()
+                    if self._settle(call, call.pending.pop(future), error, outcome):
+                        return outcome[0]
+                    if self._fallback_due(call):
+                        launch('fallback')
+                if not done and self._hedge_due(call):
+                    launch('hedge')
+            raise call.last_error
+        finally:
+            # Attempts waiting for admission give up when they are admitted;
+            # running ones finish in the background (bounded by the client
+            # timeout) and are ignored.
+            call.finished.set()
+            for future in call.pending:
+                future.cancel()
+                future.add_done_callback(self._attempt_dropped)
+
+    async def call_async(
+        self,
+        attempt_fn: Callable[[str, Callable], Awaitable],
+        validate: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """Await ``attempt_fn(model, guarded)`` with hedging and fallback.
+
+        Like ``call``, with ``guarded(request)`` awaiting ``request()``.
+        Losing attempts are cancelled, including their requests in flight.
+        """
+        call = self._begin(validate)
+
+        def launch(reason: str):
+            attempt, guard = self._next_attempt(call, reason)
+            task = asyncio.ensure_future(self._timed_attempt_async(attempt_fn, attempt[1], guard))
+            call.pending[task] = attempt
+
+        launch('primary')
+        try:
+            while call.pending:
+                done, _ = await asyncio.wait(list(call.pending), timeout=self._wait_timeout(call),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    outcome = None if error else task.result()
+                    if self._settle(call, call.pending.pop(task), error, outcome):
+                        return outcome[0]
+                    if self._fallback_due(call):
+                        launch('fallback')
+                if not done and self._hedge_due(call):
+                    launch('hedge')
+            raise call.last_error
+        finally:
+            call.finished.set()
+            for task in call.pending:
+                task.cancel()
+                task.add_done_callback(self._attempt_dropped)
+
+    def _attempt_dropped(self, attempt):
+        """Count a losing attempt's future or task if it was stopped before completing."""
+        if attempt.cancelled() or isinstance(attempt.exception(), CallCancelled):
+            self._count('cancelled_attempts')
+
+    @staticmethod
+    def _timed_attempt(attempt_fn: Callable[[str, Callable], Any], model: str,
+                       guard: _AttemptGuard):
+        """Run one attempt and return ``(result, latency since admission)``."""
+        result = attempt_fn(model, guard)
+        return result, guard.elapsed()
+
+    @staticmethod
+    async def _timed_attempt_async(attempt_fn: Callable[[str, Callable], Awaitable], model: str,
+                                   guard: _AttemptGuard):
+        """Await one attempt and return ``(result, latency since admission)``."""
+        result = await attempt_fn(model, guard.run_async)
+        return result, guard.elapsed()
+
+    def _record_win(self, attempt: int, model: str, reason: str,
+                    latency: float, started: float):
+        """Record latency and which attempt produced the winning response."""
+        with self._lock:
+            self._latencies.append(latency)
+            self._call_latencies.append(time.monotonic() - started)
+            if reason == 'hedge':
+                self._counters['hedge_wins'] += 1
+            if model != self.models[0]:
+                self._counters['fallback_wins'] += 1
+
+    def stats(self) -> dict:
+        """Return hedge/fallback rates and call latency percentiles."""
+        with self._lock:
+            counters = dict(self._counters)
+            call_latencies = list(self._call_latencies)
+        calls = counters['calls'] or 1
+        stats = {
+            **counters,
+            'hedge_rate': round(counters['hedged_calls'] / calls, 4),
+            'fallback_rate': round(counters['fallback_wins'] / calls, 4),
+            'hedge_delay': round(self.hedge_delay(), 3),
+        }
+        if call_latencies:
+            stats['latency_p50'] = round(_percentile(call_latencies, 50), 3)
+            stats['latency_p99'] = round(_percentile(call_latencies, 99), 3)
+        return stats
+
+
+llm_hedger = HedgedCaller(
+    [LLM_CONFIG['model'], *LLM_CONFIG['fallback_models']],
+    governor=llm_governor,
+    **LLM_HEDGING_CONFIG
+)
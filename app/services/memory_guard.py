@@ -0,0 +1,375 @@
+"""
+Service for per-request memory accounting and the memory budget.
+
+Before an upload is extracted, its peak memory is estimated from the file
+size and type; for DOCX, PPTX and XLSX from the uncompressed size of the
+zip members holding the text, which the zip's central directory records.
+Uploads over the per-request budget are read only partially when the format
+can be streamed (plain text, PDF pages, XLSX rows, and DOCX and PPTX with
+the lxml fast path), so the extracted text fits the budget.  Other formats
+have no partial read and are read in full with a warning.
+
+While a request runs, each pipeline stage (extraction, classification,
+analysis, conversations, report) records the process RSS before and after
+it and the peak in between, sampled by one background thread.  Per-stage
+figures are logged per request and aggregated for ``/api/stats``.  With
+``tracemalloc`` enabled, the peak of Python allocations per stage is
+recorded as well.
+
+RSS is per process, so when a worker serves several requests at once they
+are attributed each other's allocations; the figures are exact with one
+request per worker.  Only then can a request whose RSS has grown past the
+budget be stopped at the next stage boundary, instead of running on until
+the OOM killer ends the worker.  That abort is therefore off unless the
+server enables ``abort_over_budget`` (``gunicorn.conf.py`` does for sync
+workers with one thread).
+"""
+import contextvars
+import io
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import zipfile
+from collections import namedtuple
+from typing import Optional
+
+from ..config.config import EXTRACTION_CONFIG, MEMORY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Formats whose extraction can stop after a number of characters
+STREAMABLE_EXTENSIONS = {'txt', 'csv', 'md', 'rtf', 'pdf', 'xlsx'}
+if EXTRACTION_CONFIG['ooxml_fast_path']:
+    STREAMABLE_EXTENSIONS |= {'docx', 'doc', 'pptx', 'ppt'}
+
+# Zip members (names or directory prefixes) holding the text of OOXML uploads
+OOXML_TEXT_PARTS = {
+    'docx': ('word/document.xml',),
+    'pptx': ('ppt/slides/', 'ppt/notesSlides/'),
+    'xlsx': ('xl/worksheets/', 'xl/sharedStrings.xml'),
+}
+OOXML_TEXT_PARTS['doc'] = OOXML_TEXT_PARTS['docx']
+OOXML_TEXT_PARTS['ppt'] = OOXML_TEXT_PARTS['pptx']
+
+ReadPlan = namedtuple('ReadPlan', ['estimate', 'max_chars'])
+
+_current_request = contextvars.ContextVar('trendlyzer_request_memory', default=None)
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a request would exceed, or has exceeded, its memory budget."""
+
+
+def current_rss() -> int:
+    """Return the resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS, in kilobytes on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+def ooxml_text_bytes(source, extension: str) -> Optional[int]:
+    """Return the uncompressed size of the zip members holding an OOXML upload's text.
+
+    Only the zip's central directory is read.
+
+    Args:
+        source: Upload bytes, a path, or a seekable binary stream (left at
+            the position it had)
+        extension: Lowercase extension without the dot
+
+    Returns:
+        int: Uncompressed bytes, or None if the format has no such parts
+            or the upload is not a zip
+    """
+    prefixes = OOXML_TEXT_PARTS.get(extension)
+    if prefixes is None or source is None:
+        return None
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    position = source.tell() if hasattr(source, 'tell') else None
+    try:
+        with zipfile.ZipFile(source) as package:
+            return sum(info.file_size for info in package.infolist()
+                       if info.filename.startswith(prefixes) and info.filename.endswith('.xml'))
+    except (zipfile.BadZipFile, OSError, ValueError):
+        return None
+    finally:
+        if position is not None:
+            source.seek(position)
+
+
+class _Stage:
+    __slots__ = ('name', 'rss_before', 'peak', 'rss_after', 'traced_peak')
+
+    def __init__(self, name: str, rss: int):
+        self.name = name
+        self.rss_before = rss
+        self.peak = rss
+        self.rss_after = None
+        self.traced_peak = None
+
+
+class RequestMemory:
+    """Memory record of one request; stages are opened with ``stage()``."""
+
+    def __init__(self, guard: 'MemoryGuard', label: str):
+        self.guard = guard
+        self.label = label
+        self.start_rss = current_rss()
+        self.peak = self.start_rss
+        self.stages = []
+        self._open = []
+
+    def sample(self, rss: int):
+        """Fold an RSS sample into the request and its open stages."""
+        self.peak = max(self.peak, rss)
+        for stage in self._open:
+            stage.peak = max(stage.peak, rss)
+
+    def stage(self, name: str):
+        """Return a context manager accounting one pipeline stage."""
+        return _StageContext(self, name)
+
+    def summary(self) -> dict:
+        return {
+            'label': self.label,
+            'start_rss_mb': round(self.start_rss / MB, 1),
+            'peak_growth_mb': round((self.peak - self.start_rss) / MB, 1),
+            'stages': [
+                {
+                    'stage': s.name,
+                    'peak_growth_mb': round((s.peak - s.rss_before) / MB, 1),
+                    'retained_mb': round(((s.rss_after or s.rss_before) - s.rss_before) / MB, 1),
+                    **({'traced_peak_mb': round(s.traced_peak / MB, 1)} if s.traced_peak is not None else {})
+                }
+                for s in self.stages
+            ]
+        }
+
+
+class _StageContext:
+    __slots__ = ('request', 'name', 'record')
+
+    def __init__(self, request: RequestMemory, name: str):
+        self.request = request
+        self.name = name
+        self.record = None
+
+    def __enter__(self):
+        request = self.request
+        rss = current_rss()
+        request.sample(rss)
+        growth = rss - request.start_rss
+        if growth > request.guard.budget_bytes and request.guard.abort_over_budget:
+            request.guard._count('aborted')
+            raise MemoryBudgetExceeded(
+                f"Request used {growth / MB:.0f} MB before the {self.name} stage, over the "
+                f"{request.guard.budget_bytes / MB:.0f} MB per-request memory budget")
+        if request.guard.use_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.record = _Stage(self.name, rss)
+        with request.guard._lock:
+            request._open.append(self.record)
+            request.stages.append(self.record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        request = self.request
+        record = self.record
+        if request.guard.use_tracemalloc and tracemalloc.is_tracing():
+            record.traced_peak = tracemalloc.get_traced_memory()[1]
+        record.rss_after = current_rss()
+        with request.guard._lock:
+            request._open.remove(record)
+        request.sample(record.rss_after)
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def memory_stage(name: str):
+    """Account a pipeline stage to the current request, if it is tracked."""
+    request = _current_request.get()
+    return request.stage(name) if request is not None else _NO_STAGE
+
+
+class MemoryGuard:
+    """Estimates, tracks and limits the memory used by each request."""
+
+    def __init__(self, budget_bytes: int, expansion: dict, text_part_expansion: dict,
+                 bytes_per_char: int, sample_interval: float = 0.05, tracemalloc: bool = False,
+                 abort_over_budget: bool = False):
+        """Initialize the guard.
+
+        Args:
+            budget_bytes: Memory one request may use on top of the worker baseline
+            expansion: Estimated peak bytes per upload byte, by file extension
+            text_part_expansion: Estimated peak bytes per uncompressed byte of
+                the text parts of OOXML uploads (see ``ooxml_text_bytes``)
+            bytes_per_char: Peak bytes per extracted character while analysing
+            sample_interval: Seconds between RSS samples while requests run
+            tracemalloc: Also record Python allocation peaks per stage
+            abort_over_budget: Stop a request whose RSS growth exceeds the
+                budget at the next stage; only sound if the process serves
+                one request at a time
+        """
+        self.budget_bytes = budget_bytes
+        self.expansion = expansion
+        self.text_part_expansion = text_part_expansion
+        self.bytes_per_char = bytes_per_char
+        self.sample_interval = sample_interval
+        self.use_tracemalloc = tracemalloc
+        self.abort_over_budget = abort_over_budget
+        self._lock = threading.Lock()
+        self._active = []
+        self._sampler = None
+        self._counters = {'requests': 0, 'sampled': 0, 'over_budget': 0, 'aborted': 0}
+        self._peak_rss = 0
+        # Stage name -> [requests, sum of peak growth, max peak growth] in bytes
+        self._stage_totals = {}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def plan(self, size: int, extension: str, source=None) -> ReadPlan:
+        """Decide how much of an upload to read.
+
+        Args:
+            size: Upload size in bytes
+            extension: Lowercase extension without the dot
+            source: The upload (see ``ooxml_text_bytes``); lets OOXML
+                estimates use the uncompressed size of the text parts
+
+        Returns:
+            ReadPlan: Estimated peak bytes and a character limit for
+                extraction (None to read everything)
+        """
+        text_bytes = ooxml_text_bytes(source, extension)
+        if text_bytes is not None:
+            estimate = text_bytes * self.text_part_expansion[extension]
+        else:
+            estimate = size * self.expansion.get(extension, max(self.expansion.values()))
+        if estimate <= self.budget_bytes:
+            return ReadPlan(estimate, None)
+        if extension in STREAMABLE_EXTENSIONS:
+            self._count('sampled')
+            max_chars = self.budget_bytes // self.bytes_per_char
+            logger.warning(
+                f"{extension.upper()} upload of {size / MB:.1f} MB needs an estimated {estimate / MB:.0f} MB; "
+                f"reading the first {max_chars:,} characters only")
+            return ReadPlan(estimate, max_chars)
+        # No partial read for this format; the upload size limit still bounds it
+        self._count('over_budget')
+        logger.warning(
+            f"{extension.upper()} upload of {size / MB:.1f} MB needs an estimated {estimate / MB:.0f} MB, "
+            f"over the {self.budget_bytes / MB:.0f} MB per-request memory budget; "
+            f"the format cannot be read partially, reading it in full")
+        return ReadPlan(estimate, None)
+
+    def track(self, label: str):
+        """Return a context manager tracking the memory of one request."""
+        return _TrackContext(self, label)
+
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample_loop, name='memory-sampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.sample_interval)
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                # Restarted by the next tracked request
+                with self._lock:
+                    if not self._active:
+                        self._sampler = None
+                        return
+                continue
+            rss = current_rss()
+            for request in active:
+                request.sample(rss)
+
+    def _finish(self, request: RequestMemory):
+        summary = request.summary()
+        with self._lock:
+            self._active.remove(request)
+            self._counters['requests'] += 1
+            self._peak_rss = max(self._peak_rss, request.peak)
+            for stage in request.stages:
+                growth = stage.peak - stage.rss_before
+                totals = self._stage_totals.setdefault(stage.name, [0, 0, 0])
+                totals[0] += 1
+                totals[1] += growth
+                totals[2] = max(totals[2], growth)
+        logger.info(
+            f"Memory for {request.label}: peak +{summary['peak_growth_mb']} MB over "
+            f"{summary['start_rss_mb']} MB RSS; "
+            + ', '.join(f"{s['stage']} +{s['peak_growth_mb']} MB" for s in summary['stages']))
+
+    def stats(self) -> dict:
+        """Return budget, RSS and per-stage peak growth for this process."""
+        with self._lock:
+            return {
+                'budget_mb': round(self.budget_bytes / MB, 1),
+                'rss_mb': round(current_rss() / MB, 1),
+                'peak_request_rss_mb': round(self._peak_rss / MB, 1),
+                **self._counters,
+                'stages': {
+                    name: {'avg_peak_growth_mb': round(total / count / MB, 2),
+                           'max_peak_growth_mb': round(peak / MB, 2)}
+                    for name, (count, total, peak) in self._stage_totals.items()
+                }
+            }
+
+
+class _TrackContext:
+    __slots__ = ('guard', 'label', 'request', 'token')
+
+    def __init__(self, guard: MemoryGuard, label: str):
+        self.guard = guard
+        self.label = label
+        self.request = None
+        self.token = None
+
+    def __enter__(self) -> RequestMemory:
+        self.request = RequestMemory(self.guard, self.label)
+        with self.guard._lock:
+            self.guard._active.append(self.request)
+            self.guard._ensure_sampler()
+        self.token = _current_request.set(self.request)
+        return self.request
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_request.reset(self.token)
+        self.request.sample(current_rss())
+        self.guard._finish(self.request)
+        return False
+
+
+memory_guard = MemoryGuard(**MEMORY_CONFIG)
+if memory_guard.use_tracemalloc and not tracemalloc.is_tracing():
+    tracemalloc.start()
@@ -0,0 +1,261 @@
+"""
+Service for extracting text from DOCX and PPTX files without an object model.
+
+python-docx and python-pptx parse the whole package into trees of wrapper
+objects before any text can be read.  Here the OOXML zip is opened directly
+and ``word/document.xml`` and each slide are parsed incrementally with lxml
+``iterparse``: paragraphs and table rows are emitted as soon as their end
+tag is seen, and the parsed elements are freed behind them, so memory stays
+flat however long the document is.
+
+    DOCX  body paragraphs and table rows, in document order
+    PPTX  text of every text frame and table cell per slide, then the
+          slide's speaker notes
+
+Package problems (not a zip, missing parts, unknown relationships) raise
+``OOXMLError`` before anything is yielded, so callers can fall back to the
+libraries.  Malformed XML in a document part or slide raises ``OOXMLError``
+when the parser reaches it, which may be after earlier chunks were yielded.
+"""
+import logging
+import posixpath
+import zipfile
+from typing import Iterator, List, Tuple
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+_PKG_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_R = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+
+_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+_SLIDE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide'
+_NOTES_SLIDE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide'
+
+_DOCX_TAGS = (_W + 'p', _W + 'tbl', _W + 'tr', _W + 'tc', _W + 't', _W + 'tab', _W + 'br', _W + 'cr')
+_DRAWING_TAGS = (_P + 'txBody', _A + 'txBody', _A + 'p', _A + 't', _A + 'br', _P + 'sp')
+
+
+class OOXMLError(Exception):
+    """Raised when a file is not an OOXML package this module can read."""
+
+
+def _rels_path(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, '_rels', name + '.rels')
+
+
+def _relationships(package: zipfile.ZipFile, part: str) -> dict:
+    """Return ``{id: (type, target part)}`` for a part ('' for the package)."""
+    try:
+        root = etree.fromstring(package.read(_rels_path(part)))
+    except KeyError:
+        return {}
+    relationships = {}
+    base = posixpath.dirname(part)
+    for rel in root.iter(_PKG_RELS + 'Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target', '')
+        target = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join(base, target))
+        relationships[rel.get('Id')] = (rel.get('Type'), target)
+    return relationships
+
+
+def _main_part(package: zipfile.ZipFile) -> str:
+    for rel_type, target in _relationships(package, '').values():
+        if rel_type == _OFFICE_DOCUMENT:
+            return target
+    raise OOXMLError('package has no main document part')
+
+
+def _open_package(source) -> Tuple[zipfile.ZipFile, str]:
+    try:
+        package = zipfile.ZipFile(source)
+        return package, _main_part(package)
+    except (zipfile.BadZipFile, etree.XMLSyntaxError, KeyError, ValueError) as e:
+        raise OOXMLError(str(e)) from e
+
+
+def _free(elem):
+    """Drop a handled element and the siblings parsed before it."""
+    elem.clear()
+    parent = elem.getparent()
+    if parent is not None:
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _iterparse(stream, tags):
+    return etree.iterparse(stream, events=('start', 'end'), tag=tags,
+                           resolve_entities=False, huge_tree=True)
+
+
+def docx_chunks(source) -> Iterator[Tuple[str, str, int, str]]:
+    """Yield ``(text, unit, index, label)`` for the paragraphs and table rows of a DOCX.
+
+    Paragraphs are numbered like python-docx's ``Document.paragraphs``;
+    table rows carry their row number and ``"table N"``.  Cells are joined
+    with tabs and a nested table is folded into its cell as lines.
+
+    Raises:
+        OOXMLError: The file is not a readable WordprocessingML package
+    """
+    package, part = _open_package(source)
+    try:
+        try:
+            stream = package.open(part)
+        except KeyError as e:
+            raise OOXMLError(str(e)) from e
+        with stream:
+            paragraph_depth = 0
+            pieces = []
+            paragraph_number = 0
+            table_depth = 0
+            table_number = 0
+            row_number = 0
+            rows: List[list] = []
+            cells: List[list] = []
+            for event, elem in _iterparse(stream, _DOCX_TAGS):
+                tag = elem.tag
+                if tag == _W + 't':
+                    if event == 'end' and paragraph_depth:
+                        pieces.append(elem.text or '')
+                elif tag in (_W + 'tab', _W + 'br', _W + 'cr'):
+                    # w:tab also defines tab stops in paragraph properties
+                    if event == 'end' and paragraph_depth and elem.getparent().tag == _W + 'r':
+                        pieces.append('\t' if tag == _W + 'tab' else '\n')
+                elif tag == _W + 'p':
+                    if event == 'start':
+                        paragraph_depth += 1
+                        continue
+                    paragraph_depth -= 1
+                    if paragraph_depth:
+                        # Text box inside a paragraph: its text stays part of the outer one
+                        continue
+                    text = ''.join(pieces)
+                    pieces = []
+                    if table_depth:
+                        cells[-1].append(text)
+                    else:
+                        paragraph_number += 1
+                        yield text, 'paragraph', paragraph_number, None
+                        _free(elem)
+                elif paragraph_depth:
+                    # Tables inside text boxes only contribute their text
+                    continue
+                elif tag == _W + 'tbl':
+                    if event == 'start':
+                        table_depth += 1
+                        if table_depth == 1:
+                            table_number += 1
+                            row_number = 0
+                    else:
+                        table_depth -= 1
+                        if not table_depth:
+                            _free(elem)
+                elif tag == _W + 'tr':
+                    if event == 'start':
+                        rows.append([])
+                        continue
+                    line = '\t'.join(rows.pop())
+                    if table_depth == 1:
+                        row_number += 1
+                        yield line, 'table_row', row_number, f"table {table_number}"
+                    else:
+                        cells[-1].append(line)
+                elif tag == _W + 'tc':
+                    if event == 'start':
+                        cells.append([])
+                    else:
+                        rows[-1].append('\n'.join(cells.pop()))
+    except (etree.XMLSyntaxError, zipfile.BadZipFile) as e:
+        raise OOXMLError(str(e)) from e
+    finally:
+        package.close()
+
+
+def _is_notes_body(shape) -> bool:
+    for placeholder in shape.iterfind(f'{_P}nvSpPr/{_P}nvPr/{_P}ph'):
+        return placeholder.get('type') == 'body'
+    return False
+
+
+def _drawing_text(stream, notes: bool = False) -> List[str]:
+    """Return the text of each text body in a slide or notes slide part.
+
+    With ``notes`` only the notes placeholder is read, not the slide image
+    or the slide number.
+    """
+    texts = []
+    paragraphs = []
+    pieces = []
+    wanted = not notes
+    for event, elem in _iterparse(stream, _DRAWING_TAGS):
+        tag = elem.tag
+        if tag == _P + 'sp':
+            if event == 'end':
+                _free(elem)
+        elif tag in (_P + 'txBody', _A + 'txBody'):
+            if event == 'start':
+                # The shape's properties precede its text body, so they are parsed
+                wanted = not notes or _is_notes_body(elem.getparent())
+            elif wanted:
+                texts.append('\n'.join(paragraphs))
+                paragraphs = []
+        elif event == 'start' or not wanted:
+            continue
+        elif tag == _A + 't':
+            pieces.append(elem.text or '')
+        elif tag == _A + 'br':
+            pieces.append('\n')
+        else:
+            paragraphs.append(''.join(pieces))
+            pieces = []
+    return texts
+
+
+def pptx_chunks(source) -> Iterator[Tuple[str, str, int, str]]:
+    """Yield ``(text, unit, index, label)`` for the slides and speaker notes of a PPTX.
+
+    Each slide gives one 'slide' chunk with the text of its text frames,
+    grouped shapes and table cells in document order, followed by a 'notes'
+    chunk when it has speaker notes.  Slides without text are skipped.
+
+    Raises:
+        OOXMLError: The file is not a readable PresentationML package
+    """
+    package, part = _open_package(source)
+    try:
+        try:
+            presentation = etree.fromstring(package.read(part))
+        except (KeyError, etree.XMLSyntaxError) as e:
+            raise OOXMLError(str(e)) from e
+        relationships = _relationships(package, part)
+        slides = []
+        for slide_id in presentation.iter(_P + 'sldId'):
+            rel_type, target = relationships.get(slide_id.get(_R + 'id'), (None, None))
+            if rel_type != _SLIDE:
+                raise OOXMLError(f"slide {slide_id.get('id')} has no slide part")
+            slides.append(target)
+        del presentation
+
+        for number, slide in enumerate(slides, 1):
+            with package.open(slide) as stream:
+                text = '\n'.join(text for text in _drawing_text(stream) if text)
+            if text:
+                yield text, 'slide', number, None
+            for rel_type, target in _relationships(package, slide).values():
+                if rel_type == _NOTES_SLIDE:
+                    with package.open(target) as stream:
+                        notes = '\n'.join(_drawing_text(stream, notes=True)).strip()
+                    if notes:
+                        yield notes, 'notes', number, None
+    except (KeyError, etree.XMLSyntaxError, zipfile.BadZipFile) as e:
+        raise OOXMLError(str(e)) from e
+    finally:
+        package.close()
@@ -0,0 +1,107 @@
+"""
+Service for shrinking the raster images embedded in a laid-out PDF.
+
+fpdf only serialises image objects when the document is written, so once a
+report has been laid out the embedded images can still be replaced.  Each
+image is re-encoded for the size it is actually displayed at:
+
+- images larger than the target DPI at their displayed size are downsampled;
+- opaque images lose their alpha channel, and flat graphics such as charts
+  are reduced to an indexed palette, which compresses far better than RGB;
+- JPEGs stay JPEG (re-encoded only when downsampled).
+
+A replacement is only kept when it is smaller than the original stream.
+Duplicate images are already embedded once: fpdf keys in-memory images by
+an MD5 of their bytes and reuses the same object for every placement.
+"""
+import io
+import logging
+from typing import Dict, Tuple, Union
+
+from PIL import Image
+from fpdf.image_parsing import get_img_info
+
+logger = logging.getLogger(__name__)
+
+MM_PER_INCH = 25.4
+JPEG_QUALITY = 85
+
+ImageSource = Union[bytes, str]
+
+
+def _stream_size(info: dict) -> int:
+    """Bytes written for an image: data, soft mask and palette streams."""
+    return sum(len(info.get(key) or b'') for key in ('data', 'smask', 'pal'))
+
+
+def _open(source: ImageSource) -> Image.Image:
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    img.load()
+    return img
+
+
+def _reencode(source: ImageSource, width_mm: float, height_mm: float,
+              dpi: int, palette_colors: int):
+    """Return an optimized image for the displayed size, or None to keep it."""
+    img = _open(source)
+    is_jpeg = img.format == 'JPEG'
+    target = (round(width_mm / MM_PER_INCH * dpi), round(height_mm / MM_PER_INCH * dpi))
+    resized = img.width > target[0] and img.height > target[1]
+    if resized:
+        img = img.resize(target, resample=Image.LANCZOS)
+
+    if is_jpeg:
+        if not resized:
+            return None
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+        return buffer.getvalue()
+
+    if img.mode in ('RGBA', 'LA') and img.getchannel('A').getextrema() == (255, 255):
+        img = img.convert('RGB')
+    if palette_colors and img.mode in ('RGB', 'L'):
+        img = img.convert('RGB').quantize(colors=palette_colors)
+    return img
+
+
+def optimize_images(pdf, placements: Dict[int, Tuple[ImageSource, float, float]],
+                    dpi: int = 150, palette_colors: int = 256) -> dict:
+    """Re-encode the images of a laid-out document in place.
+
+    Args:
+        pdf: FPDF document that has not been written yet
+        placements: Image object number -> (source bytes or path, largest
+            displayed width in mm, largest displayed height in mm)
+        dpi: Target resolution at the displayed size
+        palette_colors: Palette size for non-JPEG images, 0 to keep RGB
+
+    Returns:
+        dict: Image counts and stream bytes before and after
+    """
+    stats = {'images': 0, 'placements': 0, 'optimized': 0, 'bytes_before': 0, 'bytes_after': 0}
+    for name, info in pdf.image_cache.images.items():
+        if info.get('usages', 0) < 1:
+            continue
+        size = _stream_size(info)
+        stats['images'] += 1
+        stats['placements'] += info['usages']
+        stats['bytes_before'] += size
+        placement = placements.get(info['i'])
+        if placement is None:
+            stats['bytes_after'] += size
+            continue
+
+        source, width_mm, height_mm = placement
+        try:
+            candidate = _reencode(source, width_mm, height_mm, dpi, palette_colors)
+            if candidate is not None:
+                optimized = get_img_info(name, candidate, pdf.image_cache.image_filter)
+                if _stream_size(optimized) < size:
+                    optimized['i'], optimized['usages'] = info['i'], info['usages']
+                    info.clear()
+                    info.update(optimized)
+                    stats['optimized'] += 1
+        except Exception as e:
+            logger.warning(f"Could not optimize image {info['i']}: {str(e)}")
+        stats['bytes_after'] += _stream_size(info)
+    return stats
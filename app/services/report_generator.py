@@ -1,6 +1,7 @@
 """
 Service for generating PDF reports with charts.
 """
+import io
 import os
 import matplotlib
 matplotlib.use('Agg')  # Set the backend to non-interactive 'Agg'
@@ -8,22 +9,40 @@ import matplotlib.pyplot as plt
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 from wordcloud import WordCloud
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import logging
 from ..models.report_metrics import ReportMetrics
 from ..config.config import REPORT_CONFIG, REPORTS_FOLDER
-from flask import current_app
+from .chart_cache import chart_cache, chart_key
+from .pdf_optimizer import optimize_images
+from .vector_charts import VectorChartRenderer, normalize_chart_data
 
 logger = logging.getLogger(__name__)
 
+CHART_RENDERERS = ('matplotlib', 'vector')
+CHART_WIDTH = 110
+
 class ReportGenerator:
     """Class responsible for generating PDF reports with charts."""
 
-    def __init__(self, filename: str, company_name: str):
-        """Initialize the report generator."""
+    def __init__(self, filename: str, company_name: str, chart_renderer: Optional[str] = None):
+        """Initialize the report generator.
+
+        Args:
+            filename: Name of the uploaded file
+            company_name: Name of the company
+            chart_renderer: 'matplotlib' (PNG images) or 'vector' (native
+                fpdf drawing); defaults to REPORT_CONFIG['charts']['renderer']
+        """
         self.filename = filename
         self.company_name = company_name
+        self.chart_renderer = chart_renderer or REPORT_CONFIG['charts']['renderer']
+        if self.chart_renderer not in CHART_RENDERERS:
+            raise ValueError(f"Unknown chart renderer: {self.chart_renderer}")
         self.pdf = FPDF()
+        # Image object number -> (source, displayed width, displayed height)
+        self._image_placements = {}
+        self.vector_charts = VectorChartRenderer(self.pdf, width=CHART_WIDTH)
         self._setup_fonts()
 
     def _setup_fonts(self):
@@ -53,7 +72,7 @@ class ReportGenerator:
         logo_path = 'static/images/trendlyzer-report-logo.png'
 
         if os.path.exists(logo_path):
-            self.pdf.image(logo_path, x=80, y=10, w=50)
+            self._add_image(logo_path, x=80, y=10, w=50)
             self.pdf.ln(30)
         else:
             self.pdf.ln(20)
@@ -64,36 +83,74 @@ class ReportGenerator:
             new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C'
         )
 
-    def _create_chart(self, data: Dict[str, float], title: str, filename: str, chart_type: str = 'bar') -> str:
-        """Create a chart and save it (supports bar/line/pie/table)."""
-        plt.figure(figsize=REPORT_CONFIG['charts']['default_size'])
+    def _create_chart(self, data: Dict[str, float], title: str, chart_type: str = 'bar') -> bytes:
+        """Return a chart as PNG bytes (supports bar/line/pie/table).
 
-        if chart_type == 'pie':
-            plt.pie(list(data.values()), labels=list(data.keys()), autopct='%1.1f%%')
-            plt.title(title)
-        elif chart_type == 'line':
-            plt.plot(list(data.keys()), list(data.values()), marker='o')
-            plt.title(title)
-            plt.ylabel('Value')
-            plt.xticks(rotation=20, ha='right')
-        elif chart_type == 'table':
-            plt.axis('off')
-            cell_text = [[k, v] for k, v in data.items()]
-            col_labels = ['Label', 'Value']
-            plt.table(cellText=cell_text, colLabels=col_labels, loc='center')
-            plt.title(title)
+        Identical charts are served from the in-process chart cache.
+        """
+        key = chart_key(chart_type, title, data)
+        return chart_cache.get_or_render(key, lambda: self._render_chart(data, title, chart_type))
+
+    @staticmethod
+    def _render_chart(data: Dict[str, float], title: str, chart_type: str = 'bar') -> bytes:
+        """Render a chart with matplotlib and return it as PNG bytes."""
+        plt.figure(figsize=REPORT_CONFIG['charts']['default_size'])
+        try:
+            if chart_type == 'pie':
+                plt.pie(list(data.values()), labels=list(data.keys()), autopct='%1.1f%%')
+                plt.title(title)
+            elif chart_type == 'line':
+                plt.plot(list(data.keys()), list(data.values()), marker='o')
+                plt.title(title)
+                plt.ylabel('Value')
+                plt.xticks(rotation=20, ha='right')
+            elif chart_type == 'table':
+                plt.axis('off')
+                cell_text = [[k, v] for k, v in data.items()]
+                col_labels = ['Label', 'Value']
+                plt.table(cellText=cell_text, colLabels=col_labels, loc='center')
+                plt.title(title)
+            else:
+                plt.bar(data.keys(), data.values(), color=REPORT_CONFIG['charts']['bar_color'])
+                plt.title(title)
+                plt.ylabel('Value')
+                plt.xticks(rotation=20, ha='right')
+            plt.tight_layout()
+
+            buffer = io.BytesIO()
+            plt.savefig(buffer, format='png')
+            return buffer.getvalue()
+        finally:
+            plt.close()
+
+    def _add_chart(self, data: Dict[str, float], title: str, chart_type: str = 'bar'):
+        """Add a chart at the current position with the selected renderer."""
+        if self.chart_renderer == 'vector':
+            self.vector_charts.draw(data, title, chart_type)
         else:
-            plt.bar(data.keys(), data.values(), color=REPORT_CONFIG['charts']['bar_color'])
-            plt.title(title)
-            plt.ylabel('Value')
-            plt.xticks(rotation=20, ha='right')
-        plt.tight_layout()
-
-        chart_path = os.path.join(REPORTS_FOLDER, filename)
-        os.makedirs(os.path.dirname(chart_path), exist_ok=True)
-        plt.savefig(chart_path)
-        plt.close()
-        return chart_path
+            png = self._create_chart(data, title, chart_type)
+            self._add_image(png, w=CHART_WIDTH)
+
+    def _add_image(self, source, **kwargs):
+        """Embed a raster image and remember the largest size it is shown at."""
+        image_source = io.BytesIO(source) if isinstance(source, bytes) else source
+        info = self.pdf.image(image_source, **kwargs)
+        _, width, height = self._image_placements.get(info['i'], (None, 0.0, 0.0))
+        self._image_placements[info['i']] = (
+            source, max(width, info.rendered_width), max(height, info.rendered_height)
+        )
+
+    def _optimize_output(self):
+        """Post-layout stage: re-encode embedded images for their displayed size."""
+        options = REPORT_CONFIG['optimize']
+        if not options['enabled']:
+            return None
+        return optimize_images(
+            self.pdf,
+            self._image_placements,
+            dpi=options['image_dpi'],
+            palette_colors=options['palette_colors']
+        )
 
     def _add_section(self, title: str, content: str):
         """Add a section to the report."""
@@ -111,7 +168,7 @@ class ReportGenerator:
             REPORTS_FOLDER, f"{os.path.basename(self.filename).replace('.txt', '')}_wordcloud.png")
         wc = WordCloud(width=800, height=400, background_color='white').generate(text)
         wc.to_file(wc_path)
-        self.pdf.image(wc_path, w=110)
+        self._add_image(wc_path, w=CHART_WIDTH)
         self.pdf.ln(10)
 
     def _add_footer(self):
@@ -132,42 +189,65 @@ class ReportGenerator:
         """
         try:
             if isinstance(viz_analysis_json, list):
-                current_app.logger.info("Visualization data is a direct array")
+                logger.info("Visualization data is a direct array")
                 return viz_analysis_json
-            current_app.logger.info("Visualization data is nested under 'visualizations' key")
+            logger.info("Visualization data is nested under 'visualizations' key")
             return viz_analysis_json.get('visualizations', [])
         except Exception as e:
-            current_app.logger.error(f"Error extracting visualizations: {str(e)}")
+            logger.error(f"Error extracting visualizations: {str(e)}")
             return []
 
     def generate(
         self,
         mode: str,
         metrics: ReportMetrics,
+        output_path: Optional[str] = None,
     ) -> Tuple[str, str]:
-        """Generate the complete report."""
+        """Generate the complete report.
+
+        Args:
+            mode: Document mode ("Conversational Document" or "Normal Document")
+            metrics: Metrics and AI analysis to render
+            output_path: Where to write the PDF. Defaults to a file named after
+                the upload in REPORTS_FOLDER.
+
+        Returns:
+            tuple: (web path of the report, overview text)
+        """
         try:
-            current_app.logger.info(f"Starting report generation for {self.filename}")
+            logger.info(f"Starting report generation for {self.filename}")
             self._add_header()
             
             self._generate_report(metrics, mode)
 
             if not os.path.exists(REPORTS_FOLDER):
-                current_app.logger.info(f"Creating reports directory: {REPORTS_FOLDER}")
+                logger.info(f"Creating reports directory: {REPORTS_FOLDER}")
                 os.makedirs(REPORTS_FOLDER)
                 
             report_filename = f"{os.path.basename(self.filename).replace('.txt', '')}_report.pdf"
-            report_path = os.path.join(REPORTS_FOLDER, report_filename)
-            current_app.logger.info(f"Saving report to: {report_path}")
-            self.pdf.output(report_path)
+            report_path = output_path or os.path.join(REPORTS_FOLDER, report_filename)
+            image_stats = self._optimize_output()
+            logger.info(f"Saving report to: {report_path}")
+            pdf_bytes = self.pdf.output()
+            with open(report_path, 'wb') as f:
+                f.write(pdf_bytes)
+            if image_stats:
+                saved = image_stats['bytes_before'] - image_stats['bytes_after']
+                logger.info(
+                    f"Report size {(len(pdf_bytes) + saved) / 1024:.1f} KB -> {len(pdf_bytes) / 1024:.1f} KB "
+                    f"({image_stats['optimized']}/{image_stats['images']} images re-encoded, "
+                    f"{image_stats['placements']} placements, "
+                    f"image streams {image_stats['bytes_before'] / 1024:.1f} KB -> "
+                    f"{image_stats['bytes_after'] / 1024:.1f} KB)"
+                )
             web_report_path = f"/app/static/reports/{report_filename}"
             
             overview = self._generate_overview(metrics)
-            current_app.logger.info("Report generation completed successfully")
+            logger.info("Report generation completed successfully")
             return web_report_path, overview
             
         except Exception as e:
-            current_app.logger.error(f"Error generating report: {str(e)}")
+            logger.error(f"Error generating report: {str(e)}")
             raise
     
     def _get_chart_data_for_viz(self, viz, ai_analysis_json):
@@ -176,23 +256,23 @@ class ReportGenerator:
         matching data_points/labels to key_metrics entries using linked_metric and possible name patterns.
         """
         try:
-            current_app.logger.info(f"Building chart data for visualization: {viz.get('id', 'unknown')}")
+            logger.info(f"Building chart data for visualization: {viz.get('id', 'unknown')}")
             chart_data = {}
             key_metrics = ai_analysis_json.get("key_metrics", {})
-            current_app.logger.info(f"Available metric types: {list(key_metrics.keys())}")
+            logger.info(f"Available metric types: {list(key_metrics.keys())}")
 
             # Build a single list of all metrics (financial, performance, other_metrics)
             all_metrics = []
             for metric_type in ["financial", "performance", "other_metrics"]:
                 metrics = key_metrics.get(metric_type, [])
                 all_metrics.extend(metrics)
-                current_app.logger.info(f"Added {len(metrics)} metrics from {metric_type}")
+                logger.info(f"Added {len(metrics)} metrics from {metric_type}")
 
-            current_app.logger.info(f"Total metrics available for matching: {len(all_metrics)}")
+            logger.info(f"Total metrics available for matching: {len(all_metrics)}")
 
             # Try to match each label in data_points to a metric by name, label, or category
             for label in viz.get("data_points", []):
-                current_app.logger.info(f"Processing data point: {label}")
+                logger.info(f"Processing data point: {label}")
                 value = None
                 possible_names = [
                     f"{label} {viz['linked_metric']}".strip().lower(),
@@ -200,7 +280,7 @@ class ReportGenerator:
                     label.strip().lower(),
                     viz['linked_metric'].strip().lower()
                 ]
-                current_app.logger.info(f"Generated possible names for matching: {possible_names}")
+                logger.info(f"Generated possible names for matching: {possible_names}")
 
                 # Search through all available metrics for the first match
                 for metric in all_metrics:
@@ -208,27 +288,27 @@ class ReportGenerator:
                     # Try to match based on generated naming conventions
                     if metric_name in possible_names:
                         value = metric.get('value', 0)
-                        current_app.logger.info(f"Found exact match for '{label}' in metric: {metric_name}")
+                        logger.info(f"Found exact match for '{label}' in metric: {metric_name}")
                         break
                     # Also allow loose containment match as fallback (e.g., 'Advanced Plan' in metric_name)
                     if label.strip().lower() in metric_name and viz['linked_metric'].strip().lower() in metric_name:
                         value = metric.get('value', 0)
-                        current_app.logger.info(f"Found partial match for '{label}' in metric: {metric_name}")
+                        logger.info(f"Found partial match for '{label}' in metric: {metric_name}")
                         break
                     if label.strip().lower() == metric_name:
                         value = metric.get('value', 0)
-                        current_app.logger.info(f"Found direct match for '{label}' with metric: {metric_name}")
+                        logger.info(f"Found direct match for '{label}' with metric: {metric_name}")
                         break
 
                 if value is None:
-                    current_app.logger.warning(f"No match found for data point: {label}, using default value 0")
+                    logger.warning(f"No match found for data point: {label}, using default value 0")
                 chart_data[label] = value if value is not None else 0
 
-            current_app.logger.info(f"Completed chart data generation with {len(chart_data)} data points")
+            logger.info(f"Completed chart data generation with {len(chart_data)} data points")
             return chart_data
 
         except Exception as e:
-            current_app.logger.error(f"Error generating chart data: {str(e)}")
+            logger.error(f"Error generating chart data: {str(e)}")
             return {}
 
     def _generate_conversational_report(self, metrics: ReportMetrics):
@@ -247,12 +327,10 @@ class ReportGenerator:
             'Email Leads': metrics.email_conversion_rate,
             'Phone Numbers': metrics.phone_conversion_rate
         }
-        chart_path = self._create_chart(
+        self._add_chart(
             chart_data,
-            'Lead Capture Rates',
-            f"{os.path.basename(self.filename).replace('.txt', '')}_lead_capture.png"
+            'Lead Capture Rates'
         )
-        self.pdf.image(chart_path, w=110)
         self.pdf.ln(10)
 
         # Top 3 Lead Capture Metrics
@@ -269,12 +347,10 @@ class ReportGenerator:
             'Phone Provided': metrics.phone_conversion_rate,
             'Follow-Ups': metrics.follow_up_rate
         }
-        lead_chart_path = self._create_chart(
+        self._add_chart(
             lead_chart_data,
-            'Top Lead Capture Metrics',
-            f"{os.path.basename(self.filename).replace('.txt', '')}_top_lead_metrics.png"
+            'Top Lead Capture Metrics'
         )
-        self.pdf.image(lead_chart_path, w=110)
         self.pdf.ln(10)
 
 
@@ -284,12 +360,10 @@ class ReportGenerator:
             'Customer Readiness': metrics.readiness_rate,
             'Trust Concerns': metrics.trust_rate
         }
-        vis_chart_path = self._create_chart(
+        self._add_chart(
             vis_chart_data,
-            'Business Trends Observed',
-            f"{os.path.basename(self.filename).replace('.txt', '')}_trends_impact.png"
+            'Business Trends Observed'
         )
-        self.pdf.image(vis_chart_path, w=110)
         self.pdf.ln(10)
 
 
@@ -299,8 +373,8 @@ class ReportGenerator:
             # --- Header & Executive Summary ---
             ai_analysis_json = metrics.ai_analysis
             viz_analysis_json = ai_analysis_json.get("visualizations", [])
-            current_app.logger.info(f"AI Analysis available: {bool(ai_analysis_json)}")
-            current_app.logger.info(f"Visualization suggestions available: {bool(viz_analysis_json)}")
+            logger.info(f"AI Analysis available: {bool(ai_analysis_json)}")
+            logger.info(f"Visualization suggestions available: {bool(viz_analysis_json)}")
 
             doc_type = ai_analysis_json.get('document_type', 'Document') if ai_analysis_json else 'Document'
             exec_summary = ai_analysis_json.get('executive_summary', '') if ai_analysis_json else ''
@@ -308,11 +382,11 @@ class ReportGenerator:
             self._add_section(f"{doc_type} Executive Summary", exec_summary)
 
             if mode == "Conversational Document":
-                current_app.logger.info("Including conversation content")
+                logger.info("Including conversation content")
                 self._generate_conversational_report(metrics)
 
             if ai_analysis_json:
-                current_app.logger.info("Processing AI analysis sections")
+                logger.info("Processing AI analysis sections")
                 sentiment = ai_analysis_json.get('sentiment', {})
                 overall_sentiment = sentiment.get('overall', 'neutral')
                 sentiment_conf = sentiment.get('confidence', 0)
@@ -352,9 +426,9 @@ class ReportGenerator:
             
             # --- Visualizations ---
             if viz_analysis_json:
-                current_app.logger.info("Processing visualization suggestions")
+                logger.info("Processing visualization suggestions")
                 visualizations = self._get_visualizations(viz_analysis_json)
-                current_app.logger.info(f"Found {len(visualizations)} visualizations to process")
+                logger.info(f"Found {len(visualizations)} visualizations to process")
                 
                 for viz in visualizations:
                     try:
@@ -365,13 +439,13 @@ class ReportGenerator:
                         linked_metric = viz.get('linked_metric', '')
                         purpose = viz.get('purpose', '')
 
-                        current_app.logger.info(f"Creating chart: {chart_title} ({chart_type})")
+                        logger.info(f"Creating chart: {chart_title} ({chart_type})")
                         
                         if data_points and isinstance(data_points[0], dict) and 'label' in data_points[0] and 'value' in data_points[0]:
-                            current_app.logger.info("Using LLM generated datapoints")
+                            logger.info("Using LLM generated datapoints")
                             chart_data = {dp['label']: dp['value'] for dp in data_points}
                         else:
-                            current_app.logger.info("LLM generated datapoints not found!!")
+                            logger.info("LLM generated datapoints not found!!")
                             # Extract data for the suggested data_points/metrics from ai_analysis_json
                             value_map = {m['period']: m['value']
                                         for m in ai_analysis_json.get('key_metrics', {}).get('financial', [])
@@ -379,25 +453,37 @@ class ReportGenerator:
                             chart_data = {period: value_map.get(period, 0) for period in data_points}   
                         # chart_data = self._get_chart_data_for_viz(viz, ai_analysis_json)
 
-                        chart_path = self._create_chart(chart_data, chart_title, f"{viz['id']}_{self.filename}.png", chart_type=chart_type)
-                        self._add_section(f"{chart_title}", f"Purpose: {purpose}")
-                        self.pdf.image(chart_path, w=110)
+                        if self.chart_renderer == 'vector':
+                            # Validate before the section heading is written
+                            if chart_type != 'table':
+                                normalize_chart_data(chart_data)
+                            self._add_section(f"{chart_title}", f"Purpose: {purpose}")
+                            self.vector_charts.draw(chart_data, chart_title, chart_type)
+                        else:
+                            png = self._create_chart(chart_data, chart_title, chart_type=chart_type)
+                            self._add_section(f"{chart_title}", f"Purpose: {purpose}")
+                            self._add_image(png, w=CHART_WIDTH)
                     except Exception as e:
-                        current_app.logger.error(f"Error creating visualization {viz.get('id', 'unknown')}: {str(e)}")
+                        logger.error(f"Error creating visualization {viz.get('id', 'unknown')}: {str(e)}")
                         continue
             
             self._add_section("Conclusion", ai_analysis_json.get('conclusion', '')) if ai_analysis_json else ""
 
             self._add_footer()
-            current_app.logger.info("Normal report generation completed")
+            logger.info("Normal report generation completed")
         except Exception as e:
-            current_app.logger.error(f"Error in normal report generation: {str(e)}")
+            logger.error(f"Error in normal report generation: {str(e)}")
             raise
 
     def _generate_overview(self, metrics):
         """Generate overview text for the report."""
-        return (
-            f"This report was created for {self.company_name} as a {metrics.mode.lower()} containing approximately "
-            f"{metrics.word_count:,} words and {metrics.line_count:,} lines. "
-            f"{metrics.ai_analysis.get('executive_summary', '') if metrics.ai_analysis else ''}"
-        ) 
\ No newline at end of file
+        return build_overview(self.company_name, metrics)
+
+
+def build_overview(company_name: str, metrics: ReportMetrics) -> str:
+    """Build the overview text shown with the analysis results."""
+    return (
+        f"This report was created for {company_name} as a {metrics.mode.lower()} containing approximately "
+        f"{metrics.word_count:,} words and {metrics.line_count:,} lines. "
+        f"{metrics.ai_analysis.get('executive_summary', '') if metrics.ai_analysis else ''}"
+    ) 
\ No newline at end of file
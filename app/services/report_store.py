@@ -0,0 +1,183 @@
+"""
+Service for lazily rendering PDF reports on first download.
+
+Instead of rendering the PDF while the upload is being analysed, the
+analysis (``ReportMetrics`` plus report options) is saved as a small JSON
+spec under an opaque report id.  The first request for the report renders
+the PDF with ``ReportGenerator`` and caches it on disk; later requests serve
+the cached file.  Reports that nobody opens are never rendered.
+
+Rendering is serialised per report id with a thread lock and, where
+available, an ``fcntl`` file lock, so concurrent first requests - from the
+same worker or from different gunicorn workers - render only once.
+"""
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from dataclasses import asdict
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .memory_guard import memory_stage
+from ..models.report_metrics import ReportMetrics
+from ..config.config import REPORT_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_REPORT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+class ReportStore:
+    """Stores report specs and renders each report at most once."""
+
+    def __init__(self, folder: str, ttl_seconds: int, purge_interval: int = 300):
+        """Initialize the store.
+
+        Args:
+            folder: Directory holding report specs, locks and cached PDFs
+            ttl_seconds: Lifetime of a report spec and its cached PDF
+            purge_interval: Minimum seconds between purges of expired files
+        """
+        self.folder = os.path.abspath(folder)
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._last_purge = 0.0
+
+    def _path(self, report_id: str, suffix: str) -> str:
+        return os.path.join(self.folder, f"{report_id}{suffix}")
+
+    def pdf_path(self, report_id: str) -> str:
+        """Path of the cached PDF for a report."""
+        return self._path(report_id, '.pdf')
+
+    def save_spec(self, filename: str, company_name: str, mode: str,
+                  metrics: ReportMetrics, **options) -> str:
+        """Save everything needed to render a report later and return its id.
+
+        Args:
+            filename: Name of the uploaded file
+            company_name: Name of the company
+            mode: Document mode
+            metrics: Metrics and AI analysis for the report
+            **options: Extra keyword arguments for ``ReportGenerator``
+
+        Returns:
+            str: Opaque report id
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        report_id = secrets.token_urlsafe(16)
+        spec = {
+            'filename': filename,
+            'company_name': company_name,
+            'mode': mode,
+            'metrics': asdict(metrics),
+            'options': options,
+            'created_at': time.time()
+        }
+        tmp_path = self._path(report_id, '.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(spec, f)
+        os.replace(tmp_path, self._path(report_id, '.json'))
+
+        if time.time() - self._last_purge > self.purge_interval:
+            self.purge_expired()
+        return report_id
+
+    def load_spec(self, report_id: str) -> Optional[dict]:
+        """Load a report spec, or None if the id is unknown or invalid."""
+        if not _REPORT_ID_RE.match(report_id):
+            return None
+        try:
+            with open(self._path(report_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _thread_lock(self, report_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(report_id, threading.Lock())
+
+    def render(self, report_id: str) -> Optional[str]:
+        """Return the path of the rendered PDF, rendering it on first use.
+
+        Args:
+            report_id: Id returned by ``save_spec``
+
+        Returns:
+            str: Path of the cached PDF, or None if the report does not exist
+        """
+        if not _REPORT_ID_RE.match(report_id):
+            return None
+        pdf_path = self.pdf_path(report_id)
+        if os.path.exists(pdf_path):
+            return pdf_path
+        if not os.path.exists(self._path(report_id, '.json')):
+            return None
+
+        with self._thread_lock(report_id):
+            lock_file = open(self._path(report_id, '.lock'), 'w')
+            try:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Another thread or worker may have finished while we waited
+                if os.path.exists(pdf_path):
+                    return pdf_path
+                spec = self.load_spec(report_id)
+                if spec is None:
+                    return None
+                self._render_spec(spec, pdf_path)
+                return pdf_path
+            finally:
+                lock_file.close()
+                with self._locks_guard:
+                    self._locks.pop(report_id, None)
+
+    @staticmethod
+    def _render_spec(spec: dict, pdf_path: str):
+        """Render a spec with ReportGenerator and atomically publish the PDF."""
+        from .report_generator import ReportGenerator
+
+        started = time.perf_counter()
+        tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+        with memory_stage('report'):
+            generator = ReportGenerator(spec['filename'], spec['company_name'], **spec['options'])
+            generator.generate(
+                mode=spec['mode'],
+                metrics=ReportMetrics(**spec['metrics']),
+                output_path=tmp_path
+            )
+        os.replace(tmp_path, pdf_path)
+        logger.info(f"Rendered {os.path.basename(pdf_path)} in {time.perf_counter() - started:.2f}s")
+
+    def purge_expired(self) -> int:
+        """Delete specs, locks and PDFs older than the TTL."""
+        self._last_purge = time.time()
+        cutoff = self._last_purge - self.ttl_seconds
+        deleted = 0
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        if deleted:
+            logger.info(f"Purged {deleted} expired report files")
+        return deleted
+
+
+report_store = ReportStore(**REPORT_STORE_CONFIG)
@@ -0,0 +1,285 @@
+"""
+Service for opt-in profiling of individual requests.
+
+A request is profiled when it carries the profiling header (if enabled, and
+with the configured token if there is one) or is picked by the configured
+sampling rate.  The pipeline then runs under
+``cProfile`` while a background thread samples the request thread's stack,
+and three files are saved under an opaque profile id:
+
+    <id>.prof    cProfile call tree (``python -m pstats``, snakeviz)
+    <id>.folded  folded stacks for flamegraph.pl or speedscope
+    <id>.json    wall time, time per pipeline stage and the top functions
+
+Both profilers only see the request thread: LLM calls run on the hedging
+thread pool and show up as the time the request spent waiting for them.
+When a request is not profiled nothing is installed, so the cost is one
+header lookup.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from ..config.config import PROFILING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_PROFILE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+PROFILE_FORMATS = {
+    'summary': ('.json', 'application/json'),
+    'pstats': ('.prof', 'application/octet-stream'),
+    'folded': ('.folded', 'text/plain'),
+}
+
+# (stage, file path suffix, function name) reported in every summary.  With
+# lazy reports the report stages are in the profile of the first report
+# download rather than the analysis.
+STAGES = (
+    ('process_file', 'file_processor.py', 'process_file'),
+    ('classify_document', 'document_classifier.py', 'classify_document'),
+    ('call_openai', 'content_processor.py', 'call_openai'),
+    ('parse_openai_response', 'content_processor.py', 'parse_openai_response'),
+    ('process_conversations', 'content_processor.py', 'process_conversations'),
+    ('report_generate', 'report_generator.py', 'generate'),
+    ('_create_chart', 'report_generator.py', '_create_chart'),
+    ('optimize_images', 'pdf_optimizer.py', 'optimize_images'),
+    ('pdf.output', os.path.join('fpdf', 'fpdf.py'), 'output'),
+    ('send_email', 'email_service.py', 'send_report_email'),
+    ('send_email', 'email_service.py', 'send_report_link_email'),
+)
+TOP_FUNCTIONS = 25
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, root_frame, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                # Frames above the profiled block (Flask, werkzeug) are noise
+                if frame is self.root_frame:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileCapture:
+    """Context manager profiling the block it wraps in the current thread."""
+
+    def __init__(self, profiler: 'RequestProfiler', label: str):
+        self.profiler = profiler
+        self.label = label
+        self.id = secrets.token_urlsafe(16)
+        self._profile = cProfile.Profile()
+        self._sampler = None
+        self._started = None
+
+    def __enter__(self):
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active profiler per process
+            logger.warning(f"Not profiling {self.label}: {str(e)}")
+            self.id = None
+            return self
+        self._sampler = _StackSampler(
+            threading.get_ident(), sys._getframe(1), self.profiler.stack_interval)
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.id is None:
+            return False
+        self._profile.disable()
+        self._sampler.stop()
+        wall = time.perf_counter() - self._started
+        try:
+            self.profiler.save(self, wall, failed=exc_type is not None)
+        except Exception as e:
+            logger.error(f"Failed to save profile {self.id}: {str(e)}")
+        return False
+
+
+class _NoCapture:
+    """Stand-in used when a request is not profiled."""
+
+    id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_CAPTURE = _NoCapture()
+
+
+def stage_times(stats: pstats.Stats) -> dict:
+    """Return cumulative seconds and calls of each pipeline stage."""
+    stages = {}
+    for (filename, _, function), (_, calls, _, cumulative, _) in stats.stats.items():
+        for stage, suffix, name in STAGES:
+            if function == name and filename.endswith(suffix):
+                entry = stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+                entry['seconds'] += cumulative
+                entry['calls'] += calls
+    return {
+        stage: {'seconds': round(stages[stage]['seconds'], 4), 'calls': stages[stage]['calls']}
+        for stage, _, _ in STAGES if stage in stages
+    }
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> list:
+    """Return the functions with the highest cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f"{function} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'own_seconds': round(own, 4),
+            'cumulative_seconds': round(cumulative, 4)
+        }
+        for (filename, line, function), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+class RequestProfiler:
+    """Decides which requests to profile and stores their profiles."""
+
+    def __init__(self, folder: str, ttl_seconds: int, sample_rate: float = 0.0,
+                 header: str = 'X-Trendlyzer-Profile', allow_header: bool = False,
+                 header_token: Optional[str] = None,
+                 stack_interval: float = 0.005, purge_interval: int = 300):
+        """Initialize the profiler.
+
+        Args:
+            folder: Directory holding saved profiles
+            ttl_seconds: Lifetime of a saved profile
+            sample_rate: Fraction of requests profiled without the header
+            header: Request header that asks for a profile ("1")
+            allow_header: Whether clients may request profiles with the header
+            header_token: Secret the header must carry instead of "1"; setting
+                it enables the header
+            stack_interval: Seconds between stack samples for the flame graph
+            purge_interval: Minimum seconds between purges of expired profiles
+        """
+        self.folder = os.path.abspath(folder)
+        self.ttl_seconds = ttl_seconds
+        self.sample_rate = sample_rate
+        self.header = header
+        self.allow_header = allow_header or header_token is not None
+        self.header_token = header_token
+        self.stack_interval = stack_interval
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    def wanted(self, headers) -> bool:
+        """Return True if a request with these headers should be profiled."""
+        if self.allow_header:
+            value = headers.get(self.header)
+            expected = self.header_token or '1'
+            if value is not None and hmac.compare_digest(value.encode(), expected.encode()):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def capture(self, headers, label: str):
+        """Return a context manager that profiles the block if the request is wanted.
+
+        The returned object's ``id`` is the profile id, or None when the
+        request is not profiled.
+        """
+        if not self.wanted(headers):
+            return _NO_CAPTURE
+        return ProfileCapture(self, label)
+
+    def path(self, profile_id: str, profile_format: str) -> Optional[str]:
+        """Return the file of a saved profile, or None if it does not exist."""
+        if not _PROFILE_ID_RE.match(profile_id) or profile_format not in PROFILE_FORMATS:
+            return None
+        path = os.path.join(self.folder, profile_id + PROFILE_FORMATS[profile_format][0])
+        return path if os.path.exists(path) else None
+
+    def save(self, capture: ProfileCapture, wall_seconds: float, failed: bool = False):
+        """Write the pstats, folded stacks and summary of a finished capture."""
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, capture.id)
+        capture._profile.dump_stats(base + '.prof')
+        stats = pstats.Stats(capture._profile)
+
+        stacks = capture._sampler.stacks
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary = {
+            'id': capture.id,
+            'label': capture.label,
+            'profiled_at': time.time(),
+            'failed': failed,
+            'wall_seconds': round(wall_seconds, 4),
+            'stages': stage_times(stats),
+            'top_functions': top_functions(stats),
+            'stack_samples': sum(stacks.values()),
+            'stack_interval': self.stack_interval
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Saved profile {capture.id} for {capture.label} ({wall_seconds:.2f}s): "
+                    + ', '.join(f"{stage} {entry['seconds']:.3f}s" for stage, entry in summary['stages'].items()))
+
+        if time.time() - self._last_purge > self.purge_interval:
+            self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """Delete profiles older than the TTL."""
+        self._last_purge = time.time()
+        cutoff = self._last_purge - self.ttl_seconds
+        deleted = 0
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        if deleted:
+            logger.info(f"Purged {deleted} expired profile files")
+        return deleted
+
+
+request_profiler = RequestProfiler(**PROFILING_CONFIG)
@@ -0,0 +1,91 @@
+"""
+Service for storing analysis results server-side.
+
+Results are kept in a local SQLite database keyed by an opaque id, so the
+session cookie only has to carry that id instead of the whole analysis.
+Entries expire after a TTL and are purged periodically.
+"""
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from ..config.config import RESULT_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """SQLite-backed key/value store for analysis results with TTL eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, purge_interval: int = 300):
+        """Initialize the store.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Lifetime of a stored result
+            purge_interval: Minimum seconds between purges of expired rows
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not be shared across a fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' id TEXT PRIMARY KEY,'
+            ' data TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS results_expires ON results (expires_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def put(self, results: dict) -> str:
+        """Store results and return their opaque id."""
+        result_id = secrets.token_urlsafe(16)
+        now = time.time()
+        self._connect().execute(
+            'INSERT INTO results (id, data, expires_at) VALUES (?, ?, ?)',
+            (result_id, json.dumps(results), now + self.ttl_seconds)
+        )
+        if now - self._last_purge > self.purge_interval:
+            self.purge_expired()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[dict]:
+        """Load results by id, or None if unknown or expired."""
+        row = self._connect().execute(
+            'SELECT data FROM results WHERE id = ? AND expires_at > ?',
+            (result_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge_expired(self) -> int:
+        """Delete expired results and return how many were removed."""
+        self._last_purge = time.time()
+        deleted = self._connect().execute(
+            'DELETE FROM results WHERE expires_at <= ?', (self._last_purge,)
+        ).rowcount
+        if deleted:
+            logger.info(f"Purged {deleted} expired results")
+        return deleted
+
+
+result_store = ResultStore(**RESULT_STORE_CONFIG)
@@ -0,0 +1,287 @@
+"""
+Service for full-text search over analyzed documents.
+
+Extracted text and the AI summary fields of every analysis are indexed in a
+local SQLite FTS5 table, so earlier uploads can be found without re-uploading
+or re-analysing them.  Results are ranked with BM25 (summary, topic and
+filename matches weigh more than body text) and come with a highlighted
+snippet.
+
+Searches are always scoped to one company.  A document is identified by
+the SHA-256 of its extracted text per company, so re-uploading it replaces
+the earlier entry instead of adding a duplicate.
+
+Writes are batched: documents are queued in memory and inserted in a single
+transaction once ``batch_size`` documents are pending or ``flush_interval``
+seconds after the first one was queued.  A batch that fails to write is
+queued again for the next flush.  Queued documents are lost if the process
+dies before a flush; the index is derived data and can be rebuilt by
+re-analysing.  Entries expire with the upload retention policy.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List
+
+from .trend_store import company_key
+from ..config.config import SEARCH_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# bm25() weights for filename, topics, summary and content
+_BM25_WEIGHTS = (2.0, 3.0, 3.0, 1.0)
+_TERM_RE = re.compile(r'\w+\*?')
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching all of its terms.
+
+    Each word is quoted so punctuation and FTS5 operators in user input
+    cannot cause syntax errors; a trailing ``*`` keeps prefix matching.
+    """
+    terms = []
+    for term in _TERM_RE.findall(query):
+        prefix = term.endswith('*')
+        word = term.rstrip('*')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def _join_text(parts) -> str:
+    return '\n'.join(str(part) for part in parts if part)
+
+
+def summary_fields(ai_analysis: dict) -> tuple:
+    """Return the (topics, summary) text indexed from an AI analysis."""
+    ai_analysis = ai_analysis or {}
+    topics = [ai_analysis.get('document_type', '')]
+    topics += [t.get('topic', '') for t in ai_analysis.get('key_topics', []) if isinstance(t, dict)]
+    topics += [t.get('phrase', '') for t in ai_analysis.get('themes', []) if isinstance(t, dict)]
+    summary = [ai_analysis.get('executive_summary', '')]
+    for section in ai_analysis.get('detailed_analysis', []):
+        if isinstance(section, dict):
+            summary += [section.get('heading', ''), section.get('summary', '')]
+    summary += [r.get('text', '') for r in ai_analysis.get('recommendations', []) if isinstance(r, dict)]
+    summary.append(ai_analysis.get('conclusion', ''))
+    return _join_text(topics), _join_text(summary)
+
+
+class SearchIndex:
+    """SQLite FTS5 index of analyzed documents with batched writes and TTL."""
+
+    def __init__(self, path: str, ttl_seconds: int, batch_size: int = 20,
+                 flush_interval: float = 2.0, max_content_chars: int = 1_000_000,
+                 purge_interval: int = 300):
+        """Initialize the index.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Lifetime of an indexed document
+            batch_size: Pending documents that trigger an immediate flush
+            flush_interval: Maximum seconds a document waits to be indexed
+            max_content_chars: Characters of extracted text indexed per document
+            purge_interval: Minimum seconds between purges of expired documents
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_content_chars = max_content_chars
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._timer = None
+        self._last_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not be shared across a fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' id INTEGER PRIMARY KEY,'
+            ' company TEXT NOT NULL,'
+            ' company_name TEXT NOT NULL,'
+            ' filename TEXT NOT NULL,'
+            ' content_sha256 TEXT,'
+            ' indexed_at REAL NOT NULL,'
+            ' expires_at REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS documents_expires ON documents (expires_at);'
+            'CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5('
+            ' filename, topics, summary, content,'
+            " tokenize = 'porter unicode61 remove_diacritics 2');"
+        )
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(documents)')}
+        if 'content_sha256' not in columns:
+            # Index created before documents were deduplicated
+            conn.execute('ALTER TABLE documents ADD COLUMN content_sha256 TEXT')
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS documents_content ON documents (company, content_sha256)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def add(self, company_name: str, filename: str, content: str, ai_analysis: dict):
+        """Queue a document for indexing.
+
+        Args:
+            company_name: Company the document belongs to
+            filename: Name of the uploaded file
+            content: Extracted text
+            ai_analysis: Parsed AI analysis of the document
+        """
+        topics, summary = summary_fields(ai_analysis)
+        digest = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        entry = (company_name, filename, digest, topics, summary,
+                 content[:self.max_content_chars], time.time())
+        with self._pending_lock:
+            self._pending.append(entry)
+            flush_now = len(self._pending) >= self.batch_size
+            if not flush_now:
+                self._schedule_flush()
+        if flush_now:
+            self.flush()
+
+    def _schedule_flush(self):
+        """Start the flush timer unless it is running; called holding ``_pending_lock``."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush search index: {str(e)}")
+
+    def flush(self) -> int:
+        """Write all pending documents in one transaction and return how many.
+
+        A document already indexed for the same company with the same text
+        is replaced.  If the write fails, the batch is queued again.
+        """
+        with self._pending_lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+
+        try:
+            self._write(batch)
+        except Exception:
+            with self._pending_lock:
+                self._pending[:0] = batch
+                self._schedule_flush()
+            raise
+        logger.info(f"Indexed {len(batch)} documents")
+
+        if time.time() - self._last_purge > self.purge_interval:
+            self.purge_expired()
+        return len(batch)
+
+    def _write(self, batch: list):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for company_name, filename, digest, topics, summary, content, indexed_at in batch:
+                company = company_key(company_name)
+                replaced = [row[0] for row in conn.execute(
+                    'SELECT id FROM documents WHERE company = ? AND content_sha256 = ?',
+                    (company, digest))]
+                if replaced:
+                    marks = ', '.join('?' * len(replaced))
+                    conn.execute(f'DELETE FROM documents_fts WHERE rowid IN ({marks})', replaced)
+                    conn.execute(f'DELETE FROM documents WHERE id IN ({marks})', replaced)
+                doc_id = conn.execute(
+                    'INSERT INTO documents'
+                    ' (company, company_name, filename, content_sha256, indexed_at, expires_at)'
+                    ' VALUES (?, ?, ?, ?, ?, ?)',
+                    (company, company_name, filename, digest,
+                     indexed_at, indexed_at + self.ttl_seconds)
+                ).lastrowid
+                conn.execute(
+                    'INSERT INTO documents_fts (rowid, filename, topics, summary, content)'
+                    ' VALUES (?, ?, ?, ?, ?)',
+                    (doc_id, filename, topics, summary, content)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def search(self, query: str, company_name: str, limit: int = 20) -> List[dict]:
+        """Return a company's documents matching all terms of a query, best match first.
+
+        Args:
+            query: Free-text query; ``term*`` matches a prefix
+            company_name: Company whose documents are searched
+            limit: Maximum number of results
+        """
+        match = to_match_query(query)
+        if not match:
+            return []
+        self.flush()
+
+        sql = (
+            'SELECT d.id, d.company_name, d.filename, d.indexed_at,'
+            f' bm25(documents_fts, {", ".join(map(str, _BM25_WEIGHTS))}) AS score,'
+            " snippet(documents_fts, -1, '[', ']', '…', 16)"
+            ' FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid'
+            ' WHERE documents_fts MATCH ? AND d.company = ? AND d.expires_at > ?'
+            ' ORDER BY score LIMIT ?'
+        )
+        rows = self._connect().execute(
+            sql, (match, company_key(company_name), time.time(), limit)).fetchall()
+        return [
+            {
+                'id': doc_id,
+                'company_name': company,
+                'filename': filename,
+                'indexed_at': indexed_at,
+                'score': round(-score, 4),
+                'snippet': snippet
+            }
+            for doc_id, company, filename, indexed_at, score, snippet in rows
+        ]
+
+    def purge_expired(self) -> int:
+        """Delete expired documents and return how many were removed."""
+        self._last_purge = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM documents_fts WHERE rowid IN'
+                ' (SELECT id FROM documents WHERE expires_at <= ?)',
+                (self._last_purge,)
+            )
+            deleted = conn.execute(
+                'DELETE FROM documents WHERE expires_at <= ?', (self._last_purge,)
+            ).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if deleted:
+            logger.info(f"Purged {deleted} expired documents from the search index")
+        return deleted
+
+
+search_index = SearchIndex(**SEARCH_INDEX_CONFIG)
+atexit.register(search_index.flush)
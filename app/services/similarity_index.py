@@ -0,0 +1,266 @@
+"""
+Service for finding earlier analyses of near-duplicate documents.
+
+Customers often re-upload the same transcript re-exported with a few new
+lines or different whitespace, which an exact content hash misses.  Each
+analysed document is summarised by a 128-value MinHash signature of its
+word 5-gram shingles and filed under 16 locality-sensitive-hashing bands of
+8 values, all in a local SQLite database.  A lookup only compares the
+signatures that share at least one band with the new document, and accepts
+the most similar one whose estimated Jaccard similarity reaches the
+configured threshold.
+
+Documents (the text sent to the model) and their analyses are stored for
+the upload retention period so changed lines can be diffed later.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Optional
+
+import numpy as np
+
+from .trend_store import company_key
+from ..config.config import SIMILARITY_INDEX_CONFIG
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures must be comparable across processes and restarts
+_rng = np.random.RandomState(1729)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_WORD_RE = re.compile(r'\w+')
+
+SimilarMatch = namedtuple('SimilarMatch', ['analysis', 'similarity', 'text'])
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.split()).lower()
+
+
+def content_hash(text: str) -> str:
+    """Hash text with case and whitespace differences removed."""
+    return hashlib.sha256(_normalize(text).encode('utf-8')).hexdigest()
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """Return the MinHash signature of a text's word shingles, or None if empty."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    count = max(1, len(words) - SHINGLE_WORDS + 1)
+    shingles = {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_WORDS]).encode('utf-8'))
+        for i in range(count)
+    }
+    hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod p fits in 64 bits because a, b and x are all < 2**32
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimated_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+
+def added_lines(previous: str, current: str) -> str:
+    """Return the non-empty lines of ``current`` that are not in ``previous``.
+
+    Lines are compared with whitespace collapsed, so re-wrapped or
+    re-indented exports do not count as changes.
+    """
+    seen = {' '.join(line.split()) for line in previous.splitlines()}
+    return '\n'.join(
+        line for line in current.splitlines()
+        if line.strip() and ' '.join(line.split()) not in seen
+    )
+
+
+class SimilarityIndex:
+    """SQLite-backed MinHash/LSH index of analysed documents."""
+
+    def __init__(self, path: str, ttl_seconds: int, threshold: float = 0.85,
+                 purge_interval: int = 300):
+        """Initialize the index.
+
+        Args:
+            path: SQLite database file
+            ttl_seconds: Lifetime of a stored document and its analysis
+            threshold: Minimum estimated Jaccard similarity for a match
+            purge_interval: Minimum seconds between purges of expired rows
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._lookups = 0
+        self._exact_hits = 0
+        self._similar_hits = 0
+        self._stats_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not be shared across a fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' id INTEGER PRIMARY KEY,'
+            ' company TEXT NOT NULL,'
+            ' content_hash TEXT NOT NULL,'
+            ' signature BLOB NOT NULL,'
+            ' text TEXT NOT NULL,'
+            ' analysis TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS documents_hash ON documents (company, content_hash);'
+            'CREATE INDEX IF NOT EXISTS documents_expires ON documents (expires_at);'
+            'CREATE TABLE IF NOT EXISTS lsh_bands ('
+            ' band INTEGER NOT NULL,'
+            ' bucket BLOB NOT NULL,'
+            ' document_id INTEGER NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS lsh_bands_bucket ON lsh_bands (band, bucket);'
+            'CREATE INDEX IF NOT EXISTS lsh_bands_document ON lsh_bands (document_id);'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _bands(signature: np.ndarray) -> list:
+        return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+    def find(self, company_name: str, text: str) -> Optional[SimilarMatch]:
+        """Return the most similar earlier analysis for a company, if any.
+
+        Args:
+            company_name: Only documents of this company are considered
+            text: Document text that would be sent to the model
+
+        Returns:
+            SimilarMatch: (analysis, similarity, stored text), or None
+        """
+        with self._stats_lock:
+            self._lookups += 1
+        conn = self._connect()
+        company = company_key(company_name)
+        now = time.time()
+
+        row = conn.execute(
+            'SELECT analysis, text FROM documents'
+            ' WHERE company = ? AND content_hash = ? AND expires_at > ?'
+            ' ORDER BY id DESC LIMIT 1',
+            (company, content_hash(text), now)
+        ).fetchone()
+        if row:
+            with self._stats_lock:
+                self._exact_hits += 1
+            return SimilarMatch(json.loads(row[0]), 1.0, row[1])
+
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+        bands = self._bands(signature)
+        candidates = conn.execute(
+            'SELECT d.id, d.signature, d.analysis, d.text FROM documents d'
+            ' WHERE d.company = ? AND d.expires_at > ? AND d.id IN ('
+            '  SELECT document_id FROM lsh_bands WHERE '
+            + ' OR '.join(['(band = ? AND bucket = ?)'] * len(bands)) + ')',
+            [company, now] + [value for pair in bands for value in pair]
+        ).fetchall()
+
+        best = None
+        for _, stored, analysis, stored_text in candidates:
+            similarity = estimated_similarity(signature, np.frombuffer(stored, dtype=np.uint32))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = SimilarMatch(analysis, similarity, stored_text)
+        if best is None:
+            return None
+        with self._stats_lock:
+            self._similar_hits += 1
+        return best._replace(analysis=json.loads(best.analysis))
+
+    def add(self, company_name: str, text: str, analysis: dict) -> Optional[int]:
+        """Store a document's analysis so near-duplicates can reuse it."""
+        signature = minhash_signature(text)
+        if signature is None:
+            return None
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            document_id = conn.execute(
+                'INSERT INTO documents (company, content_hash, signature, text, analysis, expires_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (company_key(company_name), content_hash(text), signature.tobytes(), text,
+                 json.dumps(analysis), now + self.ttl_seconds)
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO lsh_bands (band, bucket, document_id) VALUES (?, ?, ?)',
+                [(band, bucket, document_id) for band, bucket in self._bands(signature)]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if now - self._last_purge > self.purge_interval:
+            self.purge_expired()
+        return document_id
+
+    def purge_expired(self) -> int:
+        """Delete expired documents and their bands."""
+        self._last_purge = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM lsh_bands WHERE document_id IN'
+                ' (SELECT id FROM documents WHERE expires_at <= ?)',
+                (self._last_purge,)
+            )
+            deleted = conn.execute(
+                'DELETE FROM documents WHERE expires_at <= ?', (self._last_purge,)
+            ).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if deleted:
+            logger.info(f"Purged {deleted} expired documents from the similarity index")
+        return deleted
+
+    def stats(self) -> dict:
+        """Return lookup and hit counters for this process."""
+        with self._stats_lock:
+            hits = self._exact_hits + self._similar_hits
+            return {
+                'lookups': self._lookups,
+                'exact_hits': self._exact_hits,
+                'similar_hits': self._similar_hits,
+                'hit_rate': round(hits / self._lookups, 3) if self._lookups else 0.0
+            }
+
+
+similarity_index = SimilarityIndex(**SIMILARITY_INDEX_CONFIG)
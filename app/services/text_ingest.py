@@ -0,0 +1,174 @@
+"""
+Service for ingesting plain-text uploads (txt, csv, md, rtf).
+
+The file is memory-mapped and decoded incrementally in fixed-size chunks, so
+it is read exactly once and never held twice in memory.  The encoding is
+detected from a sample at the start of the file; if a later chunk turns out
+not to be valid UTF-8, decoding switches to the fallback encoding from the
+first invalid byte onwards instead of starting over.
+"""
+import codecs
+import io
+import mmap
+import os
+import logging
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+FALLBACK_ENCODING = 'latin-1'
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Detect the encoding of a text file from a sample of its first bytes.
+
+    Args:
+        sample: Leading bytes of the file
+
+    Returns:
+        str: A codec name usable with ``codecs.getincrementaldecoder``
+    """
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        # final=False tolerates a multi-byte sequence cut off by the sample end
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+class TextDocument:
+    """Lazy view over a text file that decodes it on demand in one pass.
+
+    Iterating over the document yields decoded text chunks; nothing is read
+    until iteration starts.  ``read()`` materialises the whole text once for
+    callers that need a single string.
+    """
+
+    def __init__(self, source, chunk_size: int = CHUNK_SIZE):
+        """Initialize the document from a file path or binary stream."""
+        self.source = source
+        self.chunk_size = chunk_size
+        self.encoding: Optional[str] = None
+        self.fallback_offset: Optional[int] = None
+
+    def _open_buffer(self) -> Tuple[object, object]:
+        """Return ``(buffer, closer)`` for the source, memory-mapping if possible."""
+        if isinstance(self.source, (str, os.PathLike)):
+            f = open(self.source, 'rb')
+            owns_file = True
+        else:
+            f = self.source
+            owns_file = False
+        try:
+            size = os.fstat(f.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # In-memory streams (e.g. a small spooled upload) cannot be mapped
+            return f, (f.close if owns_file else None)
+        if size == 0:
+            return io.BytesIO(b''), (f.close if owns_file else None)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def close():
+            mapped.close()
+            if owns_file:
+                f.close()
+        return mapped, close
+
+    def _iter_raw(self, buffer) -> Iterator[bytes]:
+        """Yield raw byte chunks from a mapped or streamed buffer."""
+        if isinstance(buffer, mmap.mmap):
+            for start in range(0, len(buffer), self.chunk_size):
+                yield buffer[start:start + self.chunk_size]
+        else:
+            while True:
+                chunk = buffer.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def __iter__(self) -> Iterator[str]:
+        """Decode the source chunk by chunk."""
+        buffer, close = self._open_buffer()
+        try:
+            chunks = self._iter_raw(buffer)
+            first = next(chunks, b'')
+            self.encoding = detect_encoding(first[:SAMPLE_SIZE])
+            decoder = codecs.getincrementaldecoder(self.encoding)()
+            offset = 0
+            for chunk in _prepend(first, chunks):
+                try:
+                    text = decoder.decode(chunk)
+                except UnicodeDecodeError as e:
+                    # Keep everything decoded so far and switch to the
+                    # fallback encoding only from the first invalid byte.
+                    data = decoder.getstate()[0] + chunk
+                    valid = data[:e.start].decode(self.encoding)
+                    self.fallback_offset = offset - len(data) + len(chunk) + e.start
+                    logger.info(
+                        f"Invalid {self.encoding} at byte {self.fallback_offset}, "
+                        f"continuing as {FALLBACK_ENCODING}")
+                    self.encoding = FALLBACK_ENCODING
+                    decoder = codecs.getincrementaldecoder(FALLBACK_ENCODING)()
+                    text = valid + decoder.decode(data[e.start:])
+                offset += len(chunk)
+                if text:
+                    yield text
+            try:
+                tail = decoder.decode(b'', final=True)
+            except UnicodeDecodeError:
+                # Truncated multi-byte sequence at end of file
+                self.fallback_offset = offset - len(decoder.getstate()[0])
+                self.encoding = FALLBACK_ENCODING
+                tail = decoder.getstate()[0].decode(FALLBACK_ENCODING)
+            if tail:
+                yield tail
+        finally:
+            if close:
+                close()
+
+    def read(self) -> str:
+        """Decode and return the whole document as a single string."""
+        return ''.join(self)
+
+
+def _prepend(first, rest: Iterator) -> Iterator:
+    """Yield ``first`` (if non-empty) followed by the rest of an iterator."""
+    if first:
+        yield first
+    yield from rest
+
+
+def open_text(source, chunk_size: int = CHUNK_SIZE) -> TextDocument:
+    """Open a text file (path or binary stream) as a lazily decoded document."""
+    return TextDocument(source, chunk_size=chunk_size)
+
+
+def read_text(source, max_chars: Optional[int] = None) -> str:
+    """Read a text file in a single pass with encoding detection.
+
+    With ``max_chars`` only the start of the file is decoded, up to that
+    many characters.
+    """
+    if max_chars is None:
+        return open_text(source).read()
+    chunks = []
+    remaining = max_chars
+    for chunk in open_text(source):
+        chunks.append(chunk[:remaining])
+        remaining -= len(chunks[-1])
+        if remaining <= 0:
+            break
+    return ''.join(chunks)
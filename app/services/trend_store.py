@@ -0,0 +1,215 @@
+"""
+Service for storing per-company metrics across analyses.
+
+Every analysis appends its rates, topic coverage and theme weights to a local
+SQLite database, and in the same transaction updates pre-aggregated daily,
+weekly and monthly rollups (count, sum, min, max) per company and metric.
+Trend queries read only the rollup rows for the requested range, so they
+never touch the raw observations or reprocess documents.
+
+Metric names are the ``ReportMetrics`` rate fields (conversational documents
+only), ``topic:<topic>`` for key topic coverage and ``theme:<phrase>`` for
+theme weights.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from ..models.report_metrics import ReportMetrics
+from ..config.config import TREND_STORE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('day', 'week', 'month')
+
+RATE_METRICS = (
+    'email_conversion_rate', 'phone_conversion_rate', 'follow_up_rate',
+    'readiness_rate', 'trust_rate', 'lead_success_rate'
+)
+
+
+def company_key(company_name: str) -> str:
+    """Normalise a company name so 'Acme ' and 'acme' share one trend."""
+    return ' '.join(company_name.split()).lower()
+
+
+def bucket_for(timestamp: float, granularity: str) -> str:
+    """Return the sortable bucket label of a UTC timestamp.
+
+    Days are ``YYYY-MM-DD``, weeks are labelled by their Monday
+    (``YYYY-MM-DD``) and months are ``YYYY-MM``.
+    """
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    if granularity == 'day':
+        return moment.strftime('%Y-%m-%d')
+    if granularity == 'week':
+        return (moment - timedelta(days=moment.weekday())).strftime('%Y-%m-%d')
+    if granularity == 'month':
+        return moment.strftime('%Y-%m')
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def first_bucket(granularity: str, periods: int, now: Optional[float] = None) -> str:
+    """Return the bucket label ``periods - 1`` buckets before the current one."""
+    moment = datetime.fromtimestamp(now or time.time(), tz=timezone.utc)
+    if granularity == 'month':
+        months = moment.year * 12 + moment.month - 1 - (periods - 1)
+        return f"{months // 12:04d}-{months % 12 + 1:02d}"
+    days = periods - 1 if granularity == 'day' else 7 * (periods - 1)
+    return bucket_for((moment - timedelta(days=days)).timestamp(), granularity)
+
+
+def metric_values(metrics: ReportMetrics) -> Dict[str, float]:
+    """Flatten a report's metrics into ``{metric name: value}``."""
+    values = {}
+    if metrics.mode == "Conversational Document":
+        for name in RATE_METRICS:
+            values[name] = float(getattr(metrics, name))
+    analysis = metrics.ai_analysis or {}
+    for topic in analysis.get('key_topics', []):
+        try:
+            values[f"topic:{topic['topic'].strip().lower()}"] = float(topic['coverage_pct'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    for theme in analysis.get('themes', []):
+        try:
+            values[f"theme:{theme['phrase'].strip().lower()}"] = float(theme['weight'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+    return values
+
+
+class TrendStore:
+    """SQLite-backed time series of analysis metrics with incremental rollups."""
+
+    def __init__(self, path: str):
+        """Initialize the store.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, 'conn', None)
+        # Connections must not be shared across a fork
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(
+            'CREATE TABLE IF NOT EXISTS analyses ('
+            ' id INTEGER PRIMARY KEY,'
+            ' company TEXT NOT NULL,'
+            ' company_name TEXT NOT NULL,'
+            ' filename TEXT,'
+            ' mode TEXT,'
+            ' recorded_at REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS analyses_company ON analyses (company, recorded_at);'
+            'CREATE TABLE IF NOT EXISTS observations ('
+            ' analysis_id INTEGER NOT NULL REFERENCES analyses (id),'
+            ' metric TEXT NOT NULL,'
+            ' value REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS rollups ('
+            ' company TEXT NOT NULL,'
+            ' metric TEXT NOT NULL,'
+            ' granularity TEXT NOT NULL,'
+            ' bucket TEXT NOT NULL,'
+            ' count INTEGER NOT NULL,'
+            ' total REAL NOT NULL,'
+            ' min REAL NOT NULL,'
+            ' max REAL NOT NULL,'
+            ' PRIMARY KEY (company, metric, granularity, bucket)) WITHOUT ROWID;'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def record(self, company_name: str, metrics: ReportMetrics, filename: str = None,
+               recorded_at: Optional[float] = None) -> int:
+        """Append one analysis and fold its values into the rollups.
+
+        Args:
+            company_name: Company the document belongs to
+            metrics: Metrics of the analysis
+            filename: Name of the analysed file
+            recorded_at: UTC timestamp, defaults to now
+
+        Returns:
+            int: Number of metric values recorded
+        """
+        recorded_at = recorded_at or time.time()
+        values = metric_values(metrics)
+        company = company_key(company_name)
+        rollup_rows = [
+            (company, metric, granularity, bucket_for(recorded_at, granularity), value)
+            for granularity in GRANULARITIES
+            for metric, value in values.items()
+        ]
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            analysis_id = conn.execute(
+                'INSERT INTO analyses (company, company_name, filename, mode, recorded_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (company, company_name, filename, metrics.mode, recorded_at)
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO observations (analysis_id, metric, value) VALUES (?, ?, ?)',
+                [(analysis_id, metric, value) for metric, value in values.items()]
+            )
+            conn.executemany(
+                'INSERT INTO rollups (company, metric, granularity, bucket, count, total, min, max)'
+                ' VALUES (?1, ?2, ?3, ?4, 1, ?5, ?5, ?5)'
+                ' ON CONFLICT (company, metric, granularity, bucket) DO UPDATE SET'
+                '  count = count + 1,'
+                '  total = total + excluded.total,'
+                '  min = MIN(min, excluded.min),'
+                '  max = MAX(max, excluded.max)',
+                rollup_rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(values)
+
+    def series(self, company_name: str, metric: str, granularity: str = 'month',
+               periods: int = 12) -> List[dict]:
+        """Return the rollups of one metric for the last ``periods`` buckets.
+
+        Buckets without analyses are omitted.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        rows = self._connect().execute(
+            'SELECT bucket, count, total, min, max FROM rollups'
+            ' WHERE company = ? AND metric = ? AND granularity = ? AND bucket >= ?'
+            ' ORDER BY bucket',
+            (company_key(company_name), metric, granularity, first_bucket(granularity, periods))
+        ).fetchall()
+        return [
+            {'bucket': bucket, 'count': count, 'avg': round(total / count, 4), 'min': low, 'max': high}
+            for bucket, count, total, low, high in rows
+        ]
+
+    def metrics(self, company_name: str) -> List[str]:
+        """Return the metric names recorded for a company."""
+        rows = self._connect().execute(
+            "SELECT DISTINCT metric FROM rollups WHERE company = ? AND granularity = 'month'"
+            ' ORDER BY metric',
+            (company_key(company_name),)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+trend_store = TrendStore(**TREND_STORE_CONFIG)
@@ -0,0 +1,192 @@
+"""
+Service for receiving uploads as streams.
+
+Werkzeug hands each uploaded file to a stream from ``_get_file_stream`` and
+writes it there chunk by chunk as the request body is parsed.  The stream
+used here is a spooled temporary file: small uploads stay in memory, larger
+ones roll over to an unlinked temporary file in the upload folder, so
+nothing is buffered without bound and nothing is written to disk twice.
+While the chunks arrive the file is hashed and measured, and a file over
+the per-file limit aborts the request with 413 without reading the rest of
+it.  The whole request body is limited by ``MAX_CONTENT_LENGTH``.
+
+Extractors read the stream directly (see ``file_processor.process_file``);
+it is closed with the request.  The ASGI path parses multipart bodies itself
+and receives files into an ``UploadBuffer`` instead, which applies the same
+limits but spills to a named file that worker processes can open.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from ..config.config import UPLOAD_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {'uploads': 0, 'spooled_to_disk': 0, 'rejected': 0, 'bytes': 0}
+
+
+class HashingSpooledFile(SpooledTemporaryFile):
+    """Spooled temporary file that hashes and measures what is written to it."""
+
+    def __init__(self, max_size: int, max_file_bytes: int = None, dir: str = None):
+        super().__init__(max_size=max_size, mode='w+b', dir=dir)
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.max_file_bytes is not None and self.size > self.max_file_bytes:
+            with _stats_lock:
+                _stats['rejected'] += 1
+            raise RequestEntityTooLarge(
+                f"Uploaded file is larger than {self.max_file_bytes // (1024 * 1024)} MB")
+        self._digest.update(data)
+        return super().write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def fileno(self) -> int:
+        # SpooledTemporaryFile rolls over to disk when asked for a descriptor;
+        # an in-memory upload should be read as the BytesIO it is instead.
+        if not self._rolled:
+            raise io.UnsupportedOperation('in-memory upload has no file descriptor')
+        return super().fileno()
+
+    @property
+    def in_memory(self) -> bool:
+        return not self._rolled
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of the bytes written so far (the whole file once parsed)."""
+        return self._digest.hexdigest()
+
+
+class UploadRequest(Request):
+    """Flask request whose uploaded files are spooled, hashed and size-limited."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        os.makedirs(UPLOAD_CONFIG['spool_dir'], exist_ok=True)
+        return HashingSpooledFile(
+            max_size=UPLOAD_CONFIG['spool_bytes'],
+            max_file_bytes=UPLOAD_CONFIG['max_file_bytes'],
+            dir=UPLOAD_CONFIG['spool_dir']
+        )
+
+
+class UploadBuffer:
+    """Hashed, size-limited buffer for one file uploaded through the ASGI path.
+
+    Small files stay in memory and are handed over as bytes; a file growing
+    past ``spool_bytes`` moves to a named temporary file in the upload folder
+    and is handed over as its path, removed again by ``close``.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.path = None
+        self._digest = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > UPLOAD_CONFIG['max_file_bytes']:
+            with _stats_lock:
+                _stats['rejected'] += 1
+            raise RequestEntityTooLarge(
+                f"Uploaded file is larger than {UPLOAD_CONFIG['max_file_bytes'] // (1024 * 1024)} MB")
+        self._digest.update(data)
+        if self._file is None and self._buffer.tell() + len(data) > UPLOAD_CONFIG['spool_bytes']:
+            os.makedirs(UPLOAD_CONFIG['spool_dir'], exist_ok=True)
+            self._file = NamedTemporaryFile(dir=UPLOAD_CONFIG['spool_dir'], prefix='upload-', delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        (self._file or self._buffer).write(data)
+
+    @property
+    def in_memory(self) -> bool:
+        return self._file is None
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def source(self):
+        """Return the bytes of an in-memory upload or the path of a spilled one."""
+        if self._file is not None:
+            self._file.close()
+            return self.path
+        return self._buffer.getvalue()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def _record_upload(filename: str, info: dict):
+    with _stats_lock:
+        _stats['uploads'] += 1
+        _stats['bytes'] += info['size']
+        if not info['in_memory']:
+            _stats['spooled_to_disk'] += 1
+    logger.info(f"Received {filename}: {info['size']:,} bytes, sha256 {info['sha256'][:12]}, "
+                f"{'in memory' if info['in_memory'] else 'spooled to disk'}")
+
+
+def buffer_info(filename: str, upload: UploadBuffer) -> dict:
+    """Return size and SHA-256 of a received ``UploadBuffer`` and count it in the stats."""
+    info = {'size': upload.size, 'sha256': upload.sha256, 'in_memory': upload.in_memory}
+    _record_upload(filename, info)
+    return info
+
+
+def upload_info(file) -> dict:
+    """Return size and SHA-256 of a parsed upload and count it in the stats.
+
+    Args:
+        file: ``FileStorage`` from ``request.files``
+
+    Returns:
+        dict: size (bytes), sha256 (hex) and in_memory (not spooled to disk)
+    """
+    stream = file.stream
+    if isinstance(stream, HashingSpooledFile):
+        info = {'size': stream.size, 'sha256': stream.sha256, 'in_memory': stream.in_memory}
+    else:
+        # Apps not built by create_app parse uploads into werkzeug's default stream
+        position = stream.tell()
+        digest = hashlib.sha256()
+        size = 0
+        stream.seek(0)
+        for chunk in iter(lambda: stream.read(1024 * 1024), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        stream.seek(position)
+        info = {'size': size, 'sha256': digest.hexdigest(), 'in_memory': False}
+    _record_upload(file.filename, info)
+    return info
+
+
+def upload_stats() -> dict:
+    """Return upload counters of this worker process."""
+    with _stats_lock:
+        return dict(_stats,
+                    spool_mb=round(UPLOAD_CONFIG['spool_bytes'] / (1024 * 1024), 2),
+                    max_file_mb=round(UPLOAD_CONFIG['max_file_bytes'] / (1024 * 1024), 1))
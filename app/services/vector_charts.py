@@ -0,0 +1,229 @@
+"""
+Service for drawing report charts as native PDF vector graphics.
+
+This is a lightweight alternative to the matplotlib path in
+``ReportGenerator._create_chart``: bar, line, pie and table charts are drawn
+directly with fpdf drawing primitives, so there is no figure, no Agg
+rasterisation, no PNG encoding and no temporary file.  The charts occupy the
+same box as the embedded matplotlib images (110 mm wide, 4:3) and stay sharp
+at any zoom level.
+"""
+import math
+from typing import Dict, List, Tuple
+
+from ..config.config import REPORT_CONFIG
+
+# matplotlib's default "tab10" cycle, so pies look the same in both renderers
+PALETTE = [
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207),
+]
+
+AXIS_COLOR = (60, 60, 60)
+GRID_COLOR = (225, 225, 225)
+
+
+def hex_to_rgb(color: str) -> Tuple[int, int, int]:
+    """Convert a ``#rrggbb`` color to an RGB tuple."""
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def normalize_chart_data(data: Dict) -> List[Tuple[str, float]]:
+    """Convert chart data to ``(label, value)`` pairs with float values.
+
+    Raises:
+        ValueError: If a value is not numeric (matching matplotlib's behaviour)
+    """
+    return [(str(label), float(value)) for label, value in data.items()]
+
+
+def _nice_step(span: float, ticks: int = 5) -> float:
+    """Pick a round tick step (1, 2, 2.5 or 5 x 10^n) covering ``span``."""
+    if span <= 0:
+        return 1.0
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def _format_tick(value: float) -> str:
+    if abs(value) >= 1000:
+        return f"{value:,.0f}"
+    return f"{value:g}"
+
+
+class VectorChartRenderer:
+    """Draws charts into an FPDF document at the current position."""
+
+    def __init__(self, pdf, width: float = 110, height: float = None):
+        """Initialize the renderer.
+
+        Args:
+            pdf: The FPDF document to draw into
+            width: Chart width in mm (matches the embedded image width)
+            height: Chart height in mm, defaults to the configured aspect ratio
+        """
+        self.pdf = pdf
+        self.width = width
+        fig_w, fig_h = REPORT_CONFIG['charts']['default_size']
+        self.height = height or width * fig_h / fig_w
+        self.font = REPORT_CONFIG['font']['name']
+        self.bar_color = hex_to_rgb(REPORT_CONFIG['charts']['bar_color'])
+
+    def draw(self, data: Dict, title: str, chart_type: str = 'bar'):
+        """Draw a chart and move the cursor below it, like ``FPDF.image``."""
+        if chart_type == 'table':
+            points = [(str(label), value) for label, value in data.items()]
+        else:
+            points = normalize_chart_data(data)
+        pdf = self.pdf
+        if pdf.get_y() + self.height > pdf.page_break_trigger:
+            pdf.add_page()
+        x, y = pdf.get_x(), pdf.get_y()
+
+        with pdf.local_context():
+            pdf.set_font(self.font, '', 9)
+            pdf.set_text_color(0, 0, 0)
+            pdf.text(x + (self.width - pdf.get_string_width(title)) / 2, y + 5, title)
+
+            if chart_type == 'pie':
+                self._draw_pie(points, x, y + 8, self.width, self.height - 8)
+            elif chart_type == 'table':
+                self._draw_table(points, x, y + 8, self.width, self.height - 8)
+            else:
+                self._draw_xy(points, x, y + 8, self.width, self.height - 8,
+                              line=chart_type == 'line')
+
+        pdf.set_xy(x, y + self.height)
+
+    def _draw_xy(self, points, x, y, w, h, line=False):
+        """Draw a bar or line chart with a value axis and category labels."""
+        pdf = self.pdf
+        left, bottom = 14, 14
+        px, py, pw, ph = x + left, y + 2, w - left - 3, h - bottom - 2
+        values = [v for _, v in points] or [0.0]
+        lo = min(0.0, min(values))
+        hi = max(0.0, max(values))
+        step = _nice_step(hi - lo)
+        lo = math.floor(lo / step) * step
+        hi = math.ceil(hi / step) * step or step
+
+        def to_y(value):
+            return py + ph - (value - lo) / (hi - lo) * ph
+
+        # Grid and value axis
+        pdf.set_font(self.font, '', 6)
+        pdf.set_line_width(0.1)
+        tick = lo
+        while tick <= hi + step / 2:
+            ty = to_y(tick)
+            pdf.set_draw_color(*GRID_COLOR)
+            pdf.line(px, ty, px + pw, ty)
+            label = _format_tick(tick)
+            pdf.text(px - 1.5 - pdf.get_string_width(label), ty + 0.8, label)
+            tick += step
+        pdf.set_draw_color(*AXIS_COLOR)
+        pdf.set_line_width(0.2)
+        pdf.line(px, py, px, py + ph)
+        pdf.line(px, to_y(0.0), px + pw, to_y(0.0))
+        with pdf.rotation(90, x + 3, py + ph / 2):
+            pdf.text(x + 3 - pdf.get_string_width('Value') / 2, py + ph / 2, 'Value')
+
+        if not points:
+            return
+        slot = pw / len(points)
+        centers = [px + slot * (i + 0.5) for i in range(len(points))]
+
+        if line:
+            coords = [(cx, to_y(v)) for cx, (_, v) in zip(centers, points)]
+            pdf.set_draw_color(*PALETTE[0])
+            pdf.set_line_width(0.4)
+            if len(coords) > 1:
+                pdf.polyline(coords)
+            pdf.set_fill_color(*PALETTE[0])
+            for cx, cy in coords:
+                pdf.rect(cx - 0.7, cy - 0.7, 1.4, 1.4, style='F')
+        else:
+            pdf.set_fill_color(*self.bar_color)
+            bar_w = slot * 0.8
+            zero = to_y(0.0)
+            for cx, (_, v) in zip(centers, points):
+                top = min(zero, to_y(v))
+                pdf.rect(cx - bar_w / 2, top, bar_w, abs(to_y(v) - zero), style='F')
+
+        # Category labels, rotated like the matplotlib charts
+        pdf.set_text_color(0, 0, 0)
+        for cx, (label, _) in zip(centers, points):
+            label = label if len(label) <= 24 else label[:23] + '…'
+            lx, ly = cx + 1, py + ph + 2.5
+            with pdf.rotation(20, lx, ly):
+                pdf.text(lx - pdf.get_string_width(label), ly, label)
+
+    def _draw_pie(self, points, x, y, w, h):
+        """Draw a pie chart with percentage labels and a legend."""
+        pdf = self.pdf
+        total = sum(v for _, v in points if v > 0)
+        radius = min(h, w * 0.55) / 2 - 2
+        cx, cy = x + radius + 6, y + h / 2
+        pdf.set_font(self.font, '', 6)
+        if total <= 0:
+            pdf.set_draw_color(*AXIS_COLOR)
+            pdf.polygon(self._arc(cx, cy, radius, 0, 360), style='D')
+            return
+
+        start = 90.0
+        for i, (label, value) in enumerate(points):
+            if value <= 0:
+                continue
+            sweep = value / total * 360
+            color = PALETTE[i % len(PALETTE)]
+            pdf.set_fill_color(*color)
+            pdf.polygon([(cx, cy)] + self._arc(cx, cy, radius, start, start - sweep), style='F')
+            mid = math.radians(start - sweep / 2)
+            pct = f"{value / total * 100:.1f}%"
+            tx = cx + math.cos(mid) * radius * 0.6
+            ty = cy - math.sin(mid) * radius * 0.6
+            pdf.set_text_color(255, 255, 255)
+            pdf.text(tx - pdf.get_string_width(pct) / 2, ty + 1, pct)
+            start -= sweep
+
+        # Legend
+        pdf.set_text_color(0, 0, 0)
+        lx, ly = cx + radius + 6, y + 4
+        for i, (label, value) in enumerate(points):
+            pdf.set_fill_color(*PALETTE[i % len(PALETTE)])
+            pdf.rect(lx, ly - 2, 2.5, 2.5, style='F')
+            pdf.text(lx + 4, ly, label if len(label) <= 32 else label[:31] + '…')
+            ly += 4.5
+
+    @staticmethod
+    def _arc(cx, cy, radius, start_deg, end_deg):
+        """Approximate an arc with line segments (PDF y axis points down)."""
+        segments = max(2, int(abs(end_deg - start_deg) / 4))
+        return [
+            (cx + math.cos(math.radians(a)) * radius, cy - math.sin(math.radians(a)) * radius)
+            for a in (start_deg + (end_deg - start_deg) * i / segments for i in range(segments + 1))
+        ]
+
+    def _draw_table(self, points, x, y, w, h):
+        """Draw a two-column Label/Value table that fits the chart box."""
+        pdf = self.pdf
+        col_w = w / 2
+        row_h = min(5, h / (len(points) + 1))
+        pdf.set_xy(x, y)
+        pdf.set_draw_color(*AXIS_COLOR)
+        pdf.set_line_width(0.1)
+        pdf.set_font(self.font, 'B', 7)
+        pdf.set_fill_color(240, 240, 240)
+        pdf.cell(col_w, row_h, 'Label', border=1, align='C', fill=True)
+        pdf.cell(col_w, row_h, 'Value', border=1, align='C', fill=True)
+        pdf.set_font(self.font, '', 7)
+        for label, value in points:
+            pdf.set_xy(x, pdf.get_y() + row_h)
+            pdf.cell(col_w, row_h, label, border=1, align='C')
+            text = f"{value:g}" if isinstance(value, (int, float)) else str(value)
+            pdf.cell(col_w, row_h, text, border=1, align='C')
@@ -0,0 +1,114 @@
+"""
+Service for warming up expensive process-wide state before serving requests.
+
+When gunicorn runs with ``preload_app`` the application factory executes once
+in the master process, so everything initialised here is inherited by the
+forked workers and shared copy-on-write instead of being rebuilt on the first
+request each worker handles.
+"""
+import gc
+import io
+import logging
+import time
+from typing import Callable, Dict, FrozenSet
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_matplotlib():
+    """Build the matplotlib font cache and exercise the Agg backend once."""
+    from matplotlib import font_manager
+    import matplotlib.pyplot as plt
+    from ..config.config import REPORT_CONFIG
+
+    font_manager.findfont(font_manager.FontProperties())
+    plt.figure(figsize=REPORT_CONFIG['charts']['default_size'])
+    plt.bar(['warmup'], [1], color=REPORT_CONFIG['charts']['bar_color'])
+    plt.title('warmup')
+    plt.tight_layout()
+    plt.savefig(io.BytesIO(), format='png')
+    plt.close()
+
+
+def _warm_stopwords():
+    """Load the NLTK English stopword list into the process cache."""
+    from ..utils.text_processing import get_stopwords
+    get_stopwords()
+
+
+def _warm_report_fonts():
+    """Parse the DejaVu fonts and run the fpdf subsetting/output path once."""
+    from .report_generator import ReportGenerator
+    from ..config.config import REPORT_CONFIG
+
+    generator = ReportGenerator('warmup.txt', 'warmup')
+    generator.pdf.add_page()
+    generator.pdf.set_font(REPORT_CONFIG['font']['name'], '', 12)
+    generator.pdf.cell(0, 7, 'warmup')
+    generator.pdf.output()
+
+
+def _warm_openai_client():
+    """Build the shared OpenAI client."""
+    from .content_processor import get_openai_client
+    get_openai_client()
+
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    'matplotlib': _warm_matplotlib,
+    'stopwords': _warm_stopwords,
+    'report_fonts': _warm_report_fonts,
+    'openai_client': _warm_openai_client,
+}
+
+# Every analysis needs these; the chart and PDF steps only affect report rendering
+REQUIRED_STEPS: FrozenSet[str] = frozenset({'stopwords', 'openai_client'})
+
+
+def warm_up(app) -> dict:
+    """Run every warmup step and mark the application as ready.
+
+    A failing step is logged and recorded but does not stop the others; the
+    request that needs it simply pays the initialisation cost itself.  The
+    application is only marked ready when no step in ``REQUIRED_STEPS``
+    failed; the failed required steps are listed under ``failed``.
+
+    Args:
+        app: The Flask application to warm up
+
+    Returns:
+        dict: Warmup state with per-step status and duration
+    """
+    state = app.warmup_state
+    started = time.perf_counter()
+    with app.app_context():
+        for name, step in WARMUP_STEPS.items():
+            step_started = time.perf_counter()
+            try:
+                step()
+                status = 'ok'
+            except Exception as e:
+                logger.warning(f"Warmup step '{name}' failed: {e}")
+                status = f"failed: {type(e).__name__}"
+            state['steps'][name] = {
+                'status': status,
+                'required': name in REQUIRED_STEPS,
+                'seconds': round(time.perf_counter() - step_started, 3)
+            }
+
+    # Move everything allocated so far into the permanent generation so the
+    # garbage collector does not touch (and un-share) those pages after fork.
+    gc.collect()
+    gc.freeze()
+
+    state['seconds'] = round(time.perf_counter() - started, 3)
+    state['failed'] = [
+        name for name, step in state['steps'].items()
+        if step['required'] and step['status'] != 'ok'
+    ]
+    state['ready'] = not state['failed']
+    if state['failed']:
+        logger.error(f"Warmup failed for required steps: {', '.join(state['failed'])}")
+    else:
+        logger.info(f"Warmup completed in {state['seconds']}s")
+    return state
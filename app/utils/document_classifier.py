@@ -0,0 +1,114 @@
+"""
+Utility functions for classifying documents from a sample of their lines.
+
+Documents are classified from a bounded, stratified sample: the text is
+split into equally spaced strata and a fixed number of characters is read
+from the start of each one, aligned to line boundaries.  Small documents are
+scanned completely, so their classification is exact; for large ones the
+cost does not grow with the document size.  Scanning stops as soon as the
+result can no longer change.
+"""
+import re
+from dataclasses import dataclass
+
+CONVERSATIONAL_MODE = "Conversational Document"
+NORMAL_MODE = "Normal Document"
+
+# Characters inspected in total; documents up to this size are scanned fully
+SAMPLE_CHARS = 256 * 1024
+STRATA = 16
+
+_AGENT_RE = re.compile(r"Agent:")
+_SPEAKER_RE = re.compile(r"[^:]{1,40}:")
+
+# Keyword heuristics in priority order (first match wins), matched as
+# substrings of the lowercased text
+DOCUMENT_TYPES = (
+    ("Invoice", ('invoice', 'payment', 'due', 'amount')),
+    ("Financial Report", ('quarterly', 'annual', 'revenue', 'profit')),
+    ("Presentation", ('slide', 'presentation', 'powerpoint')),
+    ("Chat Transcript", ('agent:', 'customer:', 'support:')),
+    ("Sales Report", ('sales', 'revenue', 'target', 'quota')),
+)
+DEFAULT_DOCUMENT_TYPE = "General Document"
+
+
+@dataclass
+class DocumentClassification:
+    """Result of classifying a document."""
+    mode: str
+    document_type: str
+    sampled_chars: int
+    exhaustive: bool
+
+
+def sample_chunks(text: str, sample_chars: int = SAMPLE_CHARS, strata: int = STRATA):
+    """Yield the stratified sample of a text as line-aligned chunks.
+
+    Text no longer than ``sample_chars`` is yielded whole.  Otherwise each
+    of ``strata`` equally spaced offsets contributes ``sample_chars // strata``
+    characters, starting at the next line boundary and ending at the last
+    complete line.
+    """
+    if len(text) <= sample_chars:
+        yield text
+        return
+    stratum_chars = sample_chars // strata
+    for i in range(strata):
+        start = len(text) * i // strata
+        if start:
+            newline = text.find("\n", start, start + stratum_chars)
+            if newline == -1:
+                continue
+            start = newline + 1
+        end = text.rfind("\n", start, start + stratum_chars)
+        if end == -1:
+            end = start + stratum_chars
+        yield text[start:end]
+
+
+def classify_document(text: str, sample_chars: int = SAMPLE_CHARS) -> DocumentClassification:
+    """Classify a document as conversational or not and guess its type.
+
+    A document is conversational when it has at least one line starting with
+    ``Agent:`` and one line starting with another speaker label.
+
+    Args:
+        text: Document text
+        sample_chars: Sample budget in characters
+
+    Returns:
+        DocumentClassification: Mode, document type and how much was read
+    """
+    has_agent = False
+    has_other_speaker = False
+    type_rank = len(DOCUMENT_TYPES)
+    sampled = 0
+
+    for chunk in sample_chunks(text, sample_chars):
+        sampled += len(chunk)
+        # Only document types ranked above the best one seen so far matter
+        chunk_lower = chunk.lower()
+        for rank, (_, keywords) in enumerate(DOCUMENT_TYPES[:type_rank]):
+            if any(word in chunk_lower for word in keywords):
+                type_rank = rank
+                break
+
+        if not (has_agent and has_other_speaker):
+            for line in chunk.splitlines():
+                if _AGENT_RE.match(line):
+                    has_agent = True
+                elif not has_other_speaker and _SPEAKER_RE.match(line):
+                    has_other_speaker = True
+                if has_agent and has_other_speaker:
+                    break
+
+        if has_agent and has_other_speaker and type_rank == 0:
+            break
+
+    return DocumentClassification(
+        mode=CONVERSATIONAL_MODE if has_agent and has_other_speaker else NORMAL_MODE,
+        document_type=DOCUMENT_TYPES[type_rank][0] if type_rank < len(DOCUMENT_TYPES) else DEFAULT_DOCUMENT_TYPE,
+        sampled_chars=sampled,
+        exhaustive=len(text) <= sample_chars
+    )
@@ -0,0 +1,81 @@
+"""
+Utility functions for parsing JSON returned by language models.
+
+Parsing is tiered from cheapest to most forgiving:
+
+1. ``strict``  - ``json.loads`` on the brace-delimited region of the output;
+2. ``lenient`` - the same with ``strict=False``, which accepts raw newlines
+   and other control characters inside string literals;
+3. ``repair``  - markdown fences stripped, string literals escaped and the
+   result handed to ``json_repair`` (slow, but recovers truncated output,
+   trailing commas, single quotes and the like).
+
+Most well-behaved responses are minified JSON and never reach ``json_repair``.
+"""
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Tuple
+
+import json_repair
+
+PARSE_TIERS = ('strict', 'lenient', 'repair')
+
+_FENCE_RE = re.compile(r"```(?:json)?|```")
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+_tier_counts = Counter()
+_tier_lock = threading.Lock()
+
+
+def _brace_region(text: str) -> str:
+    """Return the substring from the first ``{`` to the last ``}``."""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("No JSON braces found after prefix")
+    return text[start:end + 1]
+
+
+def _repair(text: str) -> Any:
+    """Slow path: strip fences, escape newlines in strings and repair."""
+    candidate = _FENCE_RE.sub("", text).strip()
+    json_str = _brace_region(candidate)
+
+    def _escaper(match):
+        return match.group(0).replace("\n", "\\n")
+    json_str = _STRING_RE.sub(_escaper, json_str)
+
+    return json_repair.loads(json_str)
+
+
+def parse_model_json(text: str) -> Tuple[Any, str]:
+    """Parse the JSON object embedded in a model response.
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        tuple: (parsed value, name of the tier that succeeded)
+
+    Raises:
+        ValueError: If the output contains no brace-delimited region
+    """
+    region = _brace_region(text)
+    try:
+        result, tier = json.loads(region), 'strict'
+    except ValueError:
+        try:
+            result, tier = json.loads(region, strict=False), 'lenient'
+        except ValueError:
+            result, tier = _repair(text), 'repair'
+    with _tier_lock:
+        _tier_counts[tier] += 1
+    return result, tier
+
+
+def parse_stats() -> dict:
+    """Return how often each parsing tier has succeeded in this process."""
+    with _tier_lock:
+        return {tier: _tier_counts[tier] for tier in PARSE_TIERS}
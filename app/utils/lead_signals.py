@@ -0,0 +1,129 @@
+"""
+Utility functions for detecting contact details (lead signals) in messages.
+
+Emails and phone numbers are found by small hand-written scanners instead of
+backtracking regexes, so the cost is linear in the message length whatever
+the input looks like: pasted order numbers, tables of digits or long runs of
+punctuation cannot make a check blow up.  Callers scanning chat messages
+should also cap them at ``MAX_MESSAGE_CHARS``.
+"""
+import re
+import string
+from typing import List, Optional, Tuple
+
+# Characters of a chat message inspected for lead signals
+MAX_MESSAGE_CHARS = 4000
+
+MIN_PHONE_DIGITS = 7
+# E.164 allows at most 15 digits including the country code
+MAX_PHONE_DIGITS = 15
+# Longest separator between digit groups, e.g. ") " in "(555) 123-4567"
+_MAX_SEPARATOR = 2
+_SEPARATOR_CHARS = frozenset(' \t-.()')
+_MAX_LOCAL_PART = 64
+
+_DIGITS_RE = re.compile(r'\d+')
+_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + '._%+-')
+_DOMAIN_RE = re.compile(r'[A-Za-z0-9.-]+')
+# Fixed-width, so searching a domain is linear: a domain character, a dot
+# and the first two letters of the top-level domain
+_TLD_RE = re.compile(r'[A-Za-z0-9.-]\.[A-Za-z]{2}')
+
+
+def find_email(text: str) -> Optional[str]:
+    """Return the first email address in a text, or None.
+
+    Matches what ``[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}`` matches,
+    but visits every character a bounded number of times: each ``@`` is
+    checked once, and the domain run after it stops at the next ``@``.
+    """
+    previous_at = -1
+    at = text.find('@')
+    while at != -1:
+        if at > 0 and text[at - 1] in _LOCAL_CHARS:
+            domain = _DOMAIN_RE.match(text, at + 1)
+            if domain and _TLD_RE.search(text, at + 1, domain.end()):
+                start = at - 1
+                floor = max(previous_at + 1, at - _MAX_LOCAL_PART)
+                while start > floor and text[start - 1] in _LOCAL_CHARS:
+                    start -= 1
+                return text[start:domain.end()]
+        previous_at = at
+        at = text.find('@', at + 1)
+    return None
+
+
+def contains_email(text: str) -> bool:
+    """Detect if the text contains an email address."""
+    return find_email(text) is not None
+
+
+def _is_separator(text: str, start: int, end: int) -> bool:
+    """Return True if ``text[start:end]`` may sit between two digit groups."""
+    gap = text[start:end]
+    if not all(char in _SEPARATOR_CHARS for char in gap):
+        return False
+    # Two-character separators only around an area code: "(555) 123", "1 (555)"
+    return len(gap) == 1 or '(' in gap or ')' in gap
+
+
+def _phone_in_chain(text: str, groups: List[Tuple[int, int]]) -> Optional[str]:
+    """Return the first phone number in a chain of separated digit groups.
+
+    A phone number is a window of consecutive groups with 7-15 digits in
+    total that either contains a group of at least six digits or two
+    adjacent groups of at least three, so dates, version numbers and tables
+    of small numbers do not count.  Windows hold at most 15 groups, so the
+    scan is linear in the number of groups.
+    """
+    lengths = [end - start for start, end in groups]
+    # Chains without a long enough group (e.g. "1-2-3-4") are rejected at once
+    if max(lengths) < 3:
+        return None
+    for first in range(len(groups)):
+        digits = 0
+        shaped = False
+        for last in range(first, len(groups)):
+            digits += lengths[last]
+            if digits > MAX_PHONE_DIGITS:
+                break
+            if lengths[last] >= 6 or (last > first and lengths[last] >= 3 and lengths[last - 1] >= 3):
+                shaped = True
+            if shaped and digits >= MIN_PHONE_DIGITS:
+                # Take in trailing groups (an extension or subscriber number)
+                while last + 1 < len(groups) and digits + lengths[last + 1] <= MAX_PHONE_DIGITS:
+                    last += 1
+                    digits += lengths[last]
+                start = groups[first][0]
+                if start > 0 and text[start - 1] == '(':
+                    start -= 1
+                if start > 0 and text[start - 1] == '+':
+                    start -= 1
+                return text[start:groups[last][1]]
+    return None
+
+
+def find_phone(text: str) -> Optional[str]:
+    """Return the first phone number in a text, or None.
+
+    Digit groups are collected left to right and chained while they are
+    separated by a space, ``-``, ``.`` or parentheses; each chain is checked
+    once, when it ends.
+    """
+    groups = []
+    for match in _DIGITS_RE.finditer(text):
+        start, end = match.span()
+        if groups:
+            gap_start = groups[-1][1]
+            if start - gap_start > _MAX_SEPARATOR or not _is_separator(text, gap_start, start):
+                phone = _phone_in_chain(text, groups)
+                if phone:
+                    return phone
+                groups = []
+        groups.append((start, end))
+    return _phone_in_chain(text, groups) if groups else None
+
+
+def contains_phone(text: str) -> bool:
+    """Detect if the text contains a phone number."""
+    return find_phone(text) is not None
@@ -0,0 +1,8 @@
+"""
+ASGI entry point for the Trendlyzer application.
+
+Usage: uvicorn asgi:app --workers 2 --port 5000
+"""
+from app.routes.async_api import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,47 @@
+"""
+Batch entry point: analyse a directory of documents without the web app.
+
+Usage:
+    python batch.py INPUT_DIR OUTPUT_DIR [--company NAME | --company-from-dir]
+                    [--workers N] [--no-reports] [--chart-renderer vector] [--force]
+"""
+import argparse
+import logging
+import sys
+
+from app.services.batch_processor import run_batch
+from app.services.report_generator import CHART_RENDERERS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input_dir", help="directory searched recursively for documents")
+    parser.add_argument("output_dir", help="directory receiving results and reports")
+    company = parser.add_mutually_exclusive_group()
+    company.add_argument("--company", help="company name of every document")
+    company.add_argument("--company-from-dir", action="store_true",
+                         help="use each document's top-level directory as its company name")
+    parser.add_argument("--workers", type=int, help="worker processes (default: TRENDLYZER_BATCH_WORKERS or 4)")
+    parser.add_argument("--no-reports", action="store_true", help="write JSON results only")
+    parser.add_argument("--chart-renderer", choices=CHART_RENDERERS)
+    parser.add_argument("--force", action="store_true", help="re-process documents that already have a result")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    results = run_batch(
+        args.input_dir, args.output_dir,
+        company_name=args.company,
+        company_from_dir=args.company_from_dir,
+        workers=args.workers,
+        render_reports=not args.no_reports,
+        chart_renderer=args.chart_renderer,
+        force=args.force
+    )
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Micro-benchmark for parsing model output into the analysis JSON.
+
+Compares the legacy single-path parser (fence regex + string escaping +
+json_repair on every response) with the tiered parser in
+``app.utils.json_parsing`` over a corpus of well-formed and malformed model
+outputs.
+
+Usage:
+    python -m benchmarks.bench_json_parse [--corpus DIR] [--repeat N]
+
+``--corpus`` points at a directory of captured raw model outputs (one
+response per ``*.txt`` file); without it a built-in synthetic corpus shaped
+like real ``prompt1`` responses is used.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+import json_repair
+
+from app.utils.json_parsing import parse_model_json
+
+SAMPLE_ANALYSIS = {
+    "document_type": "Chat Transcript",
+    "executive_summary": "Customers mostly ask about pricing and delivery times. "
+                         "Roughly a third leave contact details.",
+    "sentiment": {
+        "overall": "positive",
+        "confidence": 0.82,
+        "highlights": [
+            {"text": "Thanks, that was really helpful!", "sentiment": "positive"},
+            {"text": "Is this a real person?", "sentiment": "neutral"},
+        ],
+    },
+    "themes": [{"phrase": f"theme {i}", "weight": round(0.9 - i * 0.1, 2)} for i in range(6)],
+    "key_topics": [{"topic": f"topic {i}", "coverage_pct": 20.0 - i} for i in range(8)],
+    "detailed_analysis": [
+        {"section_id": f"S{i}", "heading": f"Section {i}",
+         "summary": "A detailed paragraph about the section. " * 6, "source_pages": [i, i + 1]}
+        for i in range(1, 6)
+    ],
+    "key_metrics": {
+        "financial": [{"name": "Revenue", "value": 1200.5, "unit": "USD", "period": f"Q{q}-2025"}
+                      for q in range(1, 5)],
+        "performance": [{"name": "Response time", "value": 1.4, "unit": "min", "period": "2025"}],
+        "other_metrics": [],
+    },
+    "recommendations": [
+        {"id": f"R{i}", "text": "Do the recommended thing.", "impact": "high",
+         "effort": "low", "linked_section": f"S{i}"}
+        for i in range(1, 4)
+    ],
+    "visualizations": [
+        {"id": "V1", "linked_metric": "Revenue", "type": "bar", "title": "Quarterly Revenue",
+         "data_points": [{"label": f"Q{q}-2025", "value": 1000 + q * 100} for q in range(1, 5)],
+         "purpose": "Shows revenue growth across quarters."}
+    ],
+    "conclusion": "Overall the assistant performs well.",
+}
+
+
+def build_corpus() -> dict:
+    """Build named model outputs covering the shapes seen in production."""
+    minified = json.dumps(SAMPLE_ANALYSIS, separators=(",", ":"), ensure_ascii=False)
+    pretty = json.dumps(SAMPLE_ANALYSIS, indent=2, ensure_ascii=False)
+    raw_newlines = minified.replace("A detailed paragraph", "A detailed\nparagraph")
+    return {
+        "minified": minified,
+        "pretty": pretty,
+        "fenced": f"```json\n{pretty}\n```",
+        "preamble_and_trailer": f"Here is the analysis:\n{minified}\nLet me know if you need more.",
+        "raw_newlines_in_strings": raw_newlines,
+        "trailing_commas": pretty.replace("\n  ]", ",\n  ]").replace("\n}", ",\n}"),
+        "single_quotes": minified.replace('"conclusion"', "'conclusion'"),
+        "truncated": minified[:-200] + "}",
+    }
+
+
+def load_corpus(directory: str) -> dict:
+    """Load captured model outputs from ``*.txt`` files in a directory."""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+
+def legacy_parse(response_content: str):
+    """The parser used before tiering: always regex-rewrite and repair."""
+    candidate = re.sub(r"```(?:json)?|```", "", response_content).strip()
+    start = candidate.find("{")
+    end = candidate.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("No JSON braces found after prefix")
+    json_str = candidate[start:end + 1]
+
+    def _escaper(match):
+        return match.group(0).replace("\n", "\\n")
+    json_str = re.sub(r'"(?:[^"\\]|\\.)*"', _escaper, json_str, flags=re.DOTALL)
+    return json_repair.loads(json_str)
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    """Return the mean time per call in microseconds."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="directory of captured model outputs (*.txt)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus()
+    print(f"{'sample':<28} {'bytes':>7} {'tier':>8} {'legacy us':>10} {'tiered us':>10} {'speedup':>8} {'same':>5}")
+    total_legacy = total_tiered = 0.0
+    for name, text in corpus.items():
+        result, tier = parse_model_json(text)
+        try:
+            same = result == legacy_parse(text)
+        except Exception:
+            same = False
+        legacy_us = _time(legacy_parse, text, args.repeat)
+        tiered_us = _time(lambda t: parse_model_json(t), text, args.repeat)
+        total_legacy += legacy_us
+        total_tiered += tiered_us
+        print(f"{name:<28} {len(text):>7} {tier:>8} {legacy_us:>10.1f} {tiered_us:>10.1f} "
+              f"{legacy_us / tiered_us:>7.1f}x {str(same):>5}")
+    print(f"{'total':<28} {'':>7} {'':>8} {total_legacy:>10.1f} {total_tiered:>10.1f} "
+          f"{total_legacy / total_tiered:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Adversarial benchmark for lead-signal (email / phone) detection.
+
+Times the regexes ``process_conversations`` used before the linear-time
+scanners in ``app.utils.lead_signals`` on inputs built to make backtracking
+regexes work hard: long digit-and-punctuation runs, pasted order numbers and
+addresses that almost match.  Each input is timed at growing sizes; a linear
+scanner keeps its time per character flat while a quadratic regex
+quadruples it every time the size doubles twice.
+
+A correctness pass first checks the scanners (and notes the legacy result)
+on ordinary messages.
+
+Usage:
+    python -m benchmarks.bench_lead_signals [--sizes 1000,4000,16000] [--repeat N]
+"""
+import argparse
+import re
+import time
+
+from app.utils.lead_signals import MAX_MESSAGE_CHARS, contains_email, contains_phone
+
+LEGACY_EMAIL = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+LEGACY_PHONE = re.compile(
+    r"(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{2,4}\)?[-.\s]?)?\d{3}[-.\s]?\d{3,4}[-.\s]?\d{0,4}")
+
+# (message, has email, has phone)
+ORDINARY_MESSAGES = [
+    ("You can reach me at jane.doe+sales@example.co.uk", True, False),
+    ("my email is bob@x.com thanks", True, False),
+    ("Call me on +1 555 123 4567 after 5pm", False, True),
+    ("Phone: (555) 123-4567", False, True),
+    ("it's 555-1234", False, True),
+    ("+44 20 7946 0958 is the office", False, True),
+    ("0412 345 678", False, True),
+    ("I'd like to book a demo next week", False, False),
+    ("We met on 2024-05-17 at 10.30", False, False),
+    ("Is this secure? I heard about a scam", False, False),
+    ("bob at example dot com", False, False),
+]
+
+# name -> function building an adversarial message of about n characters
+ADVERSARIAL = {
+    "digit pairs '12 12 ...'": lambda n: "12 " * (n // 3),
+    "dashes '1-1-1-...'": lambda n: "1-" * (n // 2),
+    "digit then spaces": lambda n: "1" + " " * n + "x",
+    "order number digits": lambda n: "1" * n,
+    "local part, no '@'": lambda n: "a." * (n // 2),
+    "'@' then no dot": lambda n: "a@" + "b" * n,
+    "dotted domain, no TLD": lambda n: "a@" + "b." * (n // 2),
+    "many '@' signs": lambda n: "a@b" * (n // 3),
+}
+
+
+def legacy_contains_email(text: str) -> bool:
+    return bool(LEGACY_EMAIL.search(text))
+
+
+def legacy_contains_phone(text: str) -> bool:
+    match = LEGACY_PHONE.search(text)
+    return bool(match) and len(re.sub(r"\D", "", match.group())) >= 7
+
+
+def legacy(text: str):
+    return legacy_contains_email(text), legacy_contains_phone(text)
+
+
+def scanner(text: str):
+    return contains_email(text), contains_phone(text)
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    """Return the mean time per call in microseconds."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def check_ordinary() -> int:
+    """Print disagreements on ordinary messages and return how many."""
+    mismatches = 0
+    for message, has_email, has_phone in ORDINARY_MESSAGES:
+        expected = (has_email, has_phone)
+        got = scanner(message)
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH scanner {got} expected {expected}: {message!r}")
+        if legacy(message) != expected:
+            print(f"note: legacy regexes give {legacy(message)} for {message!r}")
+    print(f"{len(ORDINARY_MESSAGES) - mismatches}/{len(ORDINARY_MESSAGES)} ordinary messages classified correctly")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=f"1000,{MAX_MESSAGE_CHARS},16000",
+                        help="comma-separated message sizes in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    check_ordinary()
+    print()
+    print(f"{'input':<24} {'chars':>7} {'legacy us':>11} {'scanner us':>11} "
+          f"{'legacy ns/ch':>13} {'scanner ns/ch':>14} {'speedup':>8}")
+    for name, build in ADVERSARIAL.items():
+        for size in sizes:
+            text = build(size)
+            legacy_us = _time(legacy, text, args.repeat)
+            scanner_us = _time(scanner, text, args.repeat)
+            print(f"{name:<24} {len(text):>7} {legacy_us:>11.1f} {scanner_us:>11.1f} "
+                  f"{legacy_us * 1e3 / len(text):>13.1f} {scanner_us * 1e3 / len(text):>14.1f} "
+                  f"{legacy_us / scanner_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
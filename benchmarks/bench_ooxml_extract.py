@@ -0,0 +1,99 @@
+"""
+Benchmark for DOCX/PPTX text extraction: lxml fast path vs python-docx/pptx.
+
+Builds a long DOCX (paragraphs with a table every few pages) and a deck with
+speaker notes, then extracts each with ``app.services.ooxml_text`` and with
+the library fallback in ``app.services.extractors``.  Every run happens in a
+fresh process so its peak RSS (which includes lxml's C allocations, unlike
+tracemalloc) can be compared.
+
+Usage:
+    python -m benchmarks.bench_ooxml_extract [--pages 500] [--slides 300]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+PARAGRAPHS_PER_PAGE = 40
+SENTENCE = "Quarterly revenue grew in the northern region while support tickets about delivery fell. "
+
+
+def build_docx(path: str, pages: int):
+    import docx
+    document = docx.Document()
+    for page in range(pages):
+        document.add_heading(f"Section {page + 1}", level=2)
+        for paragraph in range(PARAGRAPHS_PER_PAGE):
+            document.add_paragraph(SENTENCE * (1 + paragraph % 3))
+        if page % 5 == 4:
+            table = document.add_table(rows=6, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = "4,120"
+    document.save(path)
+
+
+def build_pptx(path: str, slides: int):
+    from pptx import Presentation
+    presentation = Presentation()
+    for number in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {number + 1}"
+        slide.placeholders[1].text = "\n".join([SENTENCE] * 6)
+        slide.notes_slide.notes_text_frame.text = SENTENCE * 3
+    presentation.save(path)
+
+
+def _measure(path: str, extension: str, fast: bool) -> dict:
+    # Runs in a spawned process: import first so the baseline includes the libraries
+    from app.services import extractors
+    from app.services.ooxml_text import docx_chunks, pptx_chunks
+    if fast:
+        generator = docx_chunks if extension == 'docx' else pptx_chunks
+    else:
+        generator = extractors._docx_library_chunks if extension == 'docx' else extractors._pptx_library_chunks
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    chunks = characters = 0
+    for chunk in generator(path):
+        chunks += 1
+        characters += len(chunk[0])
+    seconds = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'seconds': seconds, 'peak_mb': (peak - baseline) / 1024, 'chunks': chunks, 'characters': characters}
+
+
+def measure(path: str, extension: str, fast: bool) -> dict:
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_measure, (path, extension, fast))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=500, help="DOCX pages (about 40 paragraphs each)")
+    parser.add_argument("--slides", type=int, default=300, help="PPTX slides, each with notes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        docx_path = os.path.join(directory, 'long.docx')
+        pptx_path = os.path.join(directory, 'deck.pptx')
+        build_docx(docx_path, args.pages)
+        build_pptx(pptx_path, args.slides)
+
+        print(f"{'file':<36} {'extractor':<12} {'seconds':>8} {'peak MB':>8} {'chunks':>7} {'chars':>10}")
+        for label, path, extension in (
+            (f"DOCX, {args.pages} pages", docx_path, 'docx'),
+            (f"PPTX, {args.slides} slides + notes", pptx_path, 'pptx'),
+        ):
+            size = os.path.getsize(path) / (1024 * 1024)
+            for name, fast in (('library', False), ('lxml', True)):
+                result = measure(path, extension, fast)
+                print(f"{label + f' ({size:.1f} MB)':<36} {name:<12} {result['seconds']:>8.2f} "
+                      f"{result['peak_mb']:>8.1f} {result['chunks']:>7} {result['characters']:>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,477 @@
+"""
+Load test for the upload and analysis HTTP endpoints.
+
+Replays a corpus of sample uploads against ``/api/analyze`` and/or
+``/upload`` at a fixed concurrency and, optionally, a Poisson arrival rate,
+then reports throughput, latency percentiles, error rates and how saturated
+the server was.
+
+By default the harness starts everything it needs on localhost:
+
+* a stub OpenAI-compatible LLM that answers every prompt with a canned
+  analysis after a configurable delay (``--llm-latency``),
+* an SMTP sink that accepts and counts report emails,
+* gunicorn with ``--workers`` / ``--threads``, pointed at both stubs
+  (analysis reuse is disabled so every upload reaches the LLM).
+
+Pass ``--url`` to load an already running server instead; start it with
+``OPENROUTER_BASE_URL`` and ``MAIL_SERVER`` / ``MAIL_PORT`` /
+``MAIL_USE_TLS=0`` pointing at the stubs, which ``--stubs-only`` runs on
+their own.
+
+Latency is measured from each request's scheduled arrival, so time spent
+waiting for a free client slot counts (no coordinated omission).  Server
+gauges (LLM calls in flight and queued) are sampled from ``/api/stats``.
+
+Usage:
+    python -m benchmarks.load_test [--corpus DIR] [--endpoints /api/analyze,/upload]
+        [--concurrency N] [--rate REQ_PER_S] [--requests N | --duration S]
+        [--workers W] [--threads T] [--llm-latency S] [--url URL] [--output FILE]
+        [--server-log FILE]
+"""
+import argparse
+import glob
+import http.client
+import json
+import os
+import random
+import socket
+import socketserver
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmarks.bench_json_parse import SAMPLE_ANALYSIS
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ---------------------------------------------------------------------------
+# Stub services
+# ---------------------------------------------------------------------------
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Answers ``POST .../chat/completions`` with a canned analysis."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        server = self.server
+        latency = server.latency * random.uniform(1 - server.jitter, 1 + server.jitter)
+        time.sleep(max(0.0, latency))
+        with server.lock:
+            server.calls += 1
+        payload = json.dumps({
+            'id': f'stub-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': json.dumps(SAMPLE_ANALYSIS)},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts any login and discards messages."""
+
+    def _reply(self, line: str):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        self._reply('220 trendlyzer-sink ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self._reply('250-trendlyzer-sink')
+                self._reply('250 AUTH PLAIN LOGIN')
+            elif command.startswith('AUTH'):
+                self._reply('235 Authentication successful')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP
+                self._reply('250 OK')
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_stubs(llm_latency: float, jitter: float):
+    """Start the stub LLM and SMTP sink on free ports; return both servers."""
+    llm = ThreadingHTTPServer(('127.0.0.1', 0), StubLLMHandler)
+    llm.daemon_threads = True
+    llm.latency, llm.jitter, llm.calls, llm.lock = llm_latency, jitter, 0, threading.Lock()
+    smtp = _ThreadingTCPServer(('127.0.0.1', 0), SMTPSinkHandler)
+    smtp.messages, smtp.lock = 0, threading.Lock()
+    for server in (llm, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return llm, smtp
+
+
+def stub_environment(llm, smtp) -> dict:
+    """Environment variables pointing the app at the stubs."""
+    return {
+        'OPENROUTER_BASE_URL': f'http://127.0.0.1:{llm.server_address[1]}/v1',
+        'OPENROUTER_API_KEY': 'stub',
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(smtp.server_address[1]),
+        'MAIL_USE_TLS': '0',
+        'MAIL_USERNAME': 'loadtest@example.com',
+        'MAIL_PASSWORD': 'stub',
+        'RECEIVER_MAIL': 'reports@example.com',
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, threads: int, env: dict, log_path: str = None,
+                 timeout: float = 180.0):
+    """Start gunicorn against the stubs and wait until it is ready."""
+    port = _free_port()
+    server_env = {**os.environ, **env}
+    server_env.setdefault('TRENDLYZER_REUSE_ANALYSES', '0')
+    log = open(log_path, 'ab') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'run:app', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+         '--timeout', '300', '--log-level', 'warning'],
+        env=server_env, stdout=log, stderr=log
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            if _request(url, 'GET', '/readyz')[0] == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError('gunicorn did not become ready')
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def build_corpus() -> list:
+    """Built-in uploads: chat transcripts of a few sizes and a plain report."""
+    corpus = []
+    for turns in (20, 200, 1000):
+        lines = []
+        for i in range(turns):
+            user = f'Customer{i % 7}'
+            lines.append(f'Agent: Hi {user}, how can I help you today?')
+            lines.append(f'{user}: I am interested in the premium plan, is it secure?')
+            if i % 5 == 0:
+                lines.append(f'{user}: Sure, reach me at user{i}@example.com or +1 555 {i % 1000:03d} 4567')
+            lines.append('Agent: Great, I will schedule a demo and follow up by email.')
+        corpus.append((f'chat_{turns}.txt', '\n'.join(lines).encode('utf-8')))
+    report = ('Quarterly revenue grew 12% on higher sales volume while costs held steady. ' * 400)
+    corpus.append(('quarterly_report.md', report.encode('utf-8')))
+    return corpus
+
+
+def load_corpus(directory: str) -> list:
+    """Load every file in a directory as an upload."""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, '*'))):
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                corpus.append((os.path.basename(path), f.read()))
+    return corpus
+
+
+def _multipart(fields: dict, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8'))
+    parts.append(data)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _request(url: str, method: str, path: str, body: bytes = None, headers: dict = None,
+             timeout: float = 600.0):
+    """Send one request on a fresh connection; return (status, body)."""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def send_upload(url: str, endpoint: str, upload: tuple, response_format: str) -> int:
+    """POST one document to an endpoint and return the HTTP status."""
+    filename, data = upload
+    fields = {'company_name': 'Load Test Corp'}
+    if endpoint == '/api/analyze':
+        fields['response_format'] = response_format
+    body, content_type = _multipart(fields, filename, data)
+    return _request(url, 'POST', endpoint, body, {'Content-Type': content_type})[0]
+
+
+class StatsSampler(threading.Thread):
+    """Polls ``/api/stats`` and keeps the LLM governor gauges."""
+
+    def __init__(self, url: str, interval: float = 1.0):
+        super().__init__(daemon=True)
+        self.url = url
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                status, body = _request(self.url, 'GET', '/api/stats', timeout=10)
+                if status == 200:
+                    self.samples.append(json.loads(body)['llm_governor'])
+            except (OSError, ValueError, KeyError):
+                continue
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_load(url: str, corpus: list, endpoints: list, concurrency: int, rate: float,
+             requests: int, duration: float, response_format: str) -> list:
+    """Send the load and return (endpoint, status, latency seconds, start offset) tuples."""
+    results = []
+    results_lock = threading.Lock()
+    slots = threading.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    def one(index: int, scheduled: float):
+        endpoint = endpoints[index % len(endpoints)]
+        upload = corpus[index % len(corpus)]
+        try:
+            status = send_upload(url, endpoint, upload, response_format)
+        except OSError as e:
+            status = f'error: {type(e).__name__}'
+        finally:
+            if not rate:
+                slots.release()
+        finished = time.perf_counter()
+        with results_lock:
+            results.append((endpoint, status, finished - scheduled, scheduled - started))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        index = 0
+        next_arrival = started
+        while True:
+            now = time.perf_counter()
+            if requests and index >= requests:
+                break
+            if not requests and now - started >= duration:
+                break
+            if rate:
+                # Open loop: Poisson arrivals, queued client-side when all slots are busy
+                if next_arrival > now:
+                    time.sleep(next_arrival - now)
+                pool.submit(one, index, next_arrival)
+                next_arrival += random.expovariate(rate)
+            else:
+                # Closed loop: keep exactly `concurrency` requests in flight
+                slots.acquire()
+                pool.submit(one, index, time.perf_counter())
+            index += 1
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarise(results: list, elapsed: float, capacity: int = None) -> dict:
+    """Aggregate request results per endpoint and overall."""
+    summary = {}
+    for endpoint in sorted({r[0] for r in results}) + ['all']:
+        rows = [r for r in results if endpoint == 'all' or r[0] == endpoint]
+        latencies = [r[2] for r in rows]
+        ok = [r for r in rows if isinstance(r[1], int) and r[1] < 400]
+        errors = {}
+        for r in rows:
+            if not (isinstance(r[1], int) and r[1] < 400):
+                errors[str(r[1])] = errors.get(str(r[1]), 0) + 1
+        entry = {
+            'requests': len(rows),
+            'ok': len(ok),
+            'error_rate': round(1 - len(ok) / len(rows), 4) if rows else 0.0,
+            'errors': errors,
+            'throughput_rps': round(len(ok) / elapsed, 3) if elapsed else 0.0,
+            'latency_s': {
+                **{f'p{p}': round(_percentile(latencies, p), 3) for p in PERCENTILES},
+                'mean': round(statistics.fmean(latencies), 3),
+                'max': round(max(latencies), 3)
+            } if latencies else {}
+        }
+        summary[endpoint] = entry
+    # Little's law: average number of requests in flight at the server
+    in_flight = sum(r[2] for r in results) / elapsed if elapsed else 0.0
+    summary['all']['avg_in_flight'] = round(in_flight, 2)
+    if capacity:
+        summary['all']['capacity'] = capacity
+        summary['all']['saturation'] = round(in_flight / capacity, 3)
+    return summary
+
+
+def _gauges(samples: list) -> dict:
+    if not samples:
+        return {}
+    return {
+        name: {'mean': round(statistics.fmean(s.get(name) or 0 for s in samples), 2),
+               'max': max(s.get(name) or 0 for s in samples)}
+        for name in ('in_flight', 'queued', 'limit')
+    }
+
+
+def print_report(summary: dict, gauges: dict, stubs: dict):
+    print(f"{'endpoint':<14} {'reqs':>6} {'ok':>6} {'err %':>6} {'req/s':>7} "
+          + ' '.join(f"{'p' + str(p):>7}" for p in PERCENTILES) + f" {'max':>7}")
+    for endpoint, entry in summary.items():
+        latency = entry['latency_s']
+        print(f"{endpoint:<14} {entry['requests']:>6} {entry['ok']:>6} {entry['error_rate'] * 100:>6.1f} "
+              f"{entry['throughput_rps']:>7.2f} "
+              + ' '.join(f"{latency.get('p' + str(p), 0):>7.2f}" for p in PERCENTILES)
+              + f" {latency.get('max', 0):>7.2f}")
+    overall = summary['all']
+    if overall['errors']:
+        print(f"errors: {overall['errors']}")
+    line = f"avg requests in flight: {overall['avg_in_flight']}"
+    if 'saturation' in overall:
+        # Above 100% requests were waiting for a free worker thread
+        line += f" of {overall['capacity']} worker threads (saturation {overall['saturation']:.0%})"
+    print(line)
+    for name, gauge in gauges.items():
+        print(f"LLM governor {name} (sampled, per worker): mean {gauge['mean']} max {gauge['max']}")
+    for name, value in stubs.items():
+        print(f"{name}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--corpus', help='directory of sample uploads (default: built-in corpus)')
+    parser.add_argument('--endpoints', default='/api/analyze',
+                        help='comma-separated endpoints, used round-robin (/api/analyze, /upload)')
+    parser.add_argument('--response-format', default='pdf', choices=('pdf', 'json'))
+    parser.add_argument('--concurrency', type=int, default=8, help='client requests in flight at most')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='Poisson arrival rate in requests/s (default: closed loop)')
+    parser.add_argument('--requests', type=int, default=0, help='total requests (default: run for --duration)')
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds of load when --requests is 0')
+    parser.add_argument('--url', help='load a running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers to start')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--llm-latency', type=float, default=2.0, help='stub LLM mean response time (s)')
+    parser.add_argument('--llm-jitter', type=float, default=0.5, help='stub LLM latency spread (fraction)')
+    parser.add_argument('--stubs-only', action='store_true', help='only run the stub LLM and SMTP sink')
+    parser.add_argument('--server-log', help='append the started server\'s output to this file')
+    parser.add_argument('--output', help='write the summary as JSON to this file')
+    args = parser.parse_args()
+
+    llm, smtp = start_stubs(args.llm_latency, args.llm_jitter)
+    env = stub_environment(llm, smtp)
+    if args.stubs_only:
+        print('Stubs running; start the server with:')
+        print(' '.join(f'{k}={v}' for k, v in env.items()) + ' gunicorn run:app')
+        try:
+            while True:
+                time.sleep(10)
+                print(f'LLM calls: {llm.calls}, emails: {smtp.messages}')
+        except KeyboardInterrupt:
+            return
+
+    server = None
+    capacity = None
+    if args.url:
+        url = args.url.rstrip('/')
+    else:
+        print(f'Starting gunicorn with {args.workers} workers x {args.threads} threads...')
+        server, url = start_server(args.workers, args.threads, env, args.server_log)
+        capacity = args.workers * args.threads
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus()
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    sampler = StatsSampler(url)
+    sampler.start()
+    try:
+        started = time.perf_counter()
+        results = run_load(url, corpus, endpoints, args.concurrency, args.rate,
+                           args.requests, args.duration, args.response_format)
+        elapsed = time.perf_counter() - started
+    finally:
+        sampler.stop()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    summary = summarise(results, elapsed, capacity)
+    gauges = _gauges(sampler.samples)
+    stubs = {'stub LLM calls': llm.calls, 'emails received': smtp.messages}
+    print(f"{len(results)} requests in {elapsed:.1f}s, concurrency {args.concurrency}"
+          + (f", arrival rate {args.rate}/s" if args.rate else ", closed loop"))
+    print_report(summary, gauges, stubs)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'config': vars(args),
+                'elapsed_s': round(elapsed, 3),
+                'summary': summary,
+                'llm_governor': gauges,
+                'stubs': stubs
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
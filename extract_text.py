@@ -1,72 +1,43 @@
-import pdfplumber
-import docx
-import pandas as pd
-from pptx import Presentation
-import os
+from app.services.extractors import extract_text as _extract, iter_chunks
 
 
 def extract_text_from_pdf(path):
-    with pdfplumber.open(path) as pdf:
-        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+    return _extract(path, "pdf")
 
 
 def extract_text_from_docx(path):
-    doc = docx.Document(path)
-    return "\n".join([p.text for p in doc.paragraphs])
+    return _extract(path, "docx")
 
 
 def extract_text_from_txt(path):
-    with open(path, encoding="utf-8") as f:
-        return f.read()
+    return _extract(path, "txt")
 
 
 def extract_text_from_csv(path):
-    df = pd.read_csv(path)
-    return df.to_string()
+    return _extract(path, "csv")
 
 
 def extract_text_from_xlsx(path):
-    df = pd.read_excel(path)
-    return df.to_string()
+    return _extract(path, "xlsx")
 
 
 def extract_text_from_md(path):
-    with open(path, encoding="utf-8") as f:
-        return f.read()
+    return _extract(path, "md")
 
 
 def extract_text_from_rtf(path):
-    with open(path, encoding="utf-8") as f:
-        return f.read()
+    return _extract(path, "rtf")
 
 
 def extract_text_from_pptx(path):
-    prs = Presentation(path)
-    text = []
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text.append(shape.text)
-    return "\n".join(text)
+    return _extract(path, "pptx")
+
+
+def extract_chunks(path, ext):
+    """Yield the document's pages, slides, sheet rows or paragraphs with their positions."""
+    return iter_chunks(path, ext.lower())
 
 
 def extract_text(path, ext):
-    ext = ext.lower()
-    if ext == "pdf":
-        return extract_text_from_pdf(path)
-    elif ext in ["doc", "docx"]:
-        return extract_text_from_docx(path)
-    elif ext == "txt":
-        return extract_text_from_txt(path)
-    elif ext == "csv":
-        return extract_text_from_csv(path)
-    elif ext in ["xls", "xlsx"]:
-        return extract_text_from_xlsx(path)
-    elif ext == "md":
-        return extract_text_from_md(path)
-    elif ext == "rtf":
-        return extract_text_from_rtf(path)
-    elif ext in ["ppt", "pptx"]:
-        return extract_text_from_pptx(path)
-    else:
-        raise ValueError("Unsupported file type")
+    # Raises ValueError("Unsupported file type: ...") for unknown extensions
+    return _extract(path, ext.lower())
@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the Trendlyzer application.
+
+Usage: gunicorn run:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Import the app (and run its warmup) once in the master so workers inherit
+# the initialised matplotlib, NLTK, font and OpenAI client state copy-on-write.
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Let the memory budget stop requests where RSS belongs to one request.
+
+    A sync worker with one thread serves one request at a time; threaded and
+    async workers share the process RSS between concurrent requests.
+    """
+    if server.cfg.threads == 1 and server.cfg.worker_class_str in ('sync', 'gthread'):
+        from app.services.memory_guard import memory_guard
+        memory_guard.abort_over_budget = True
@@ -8,6 +8,7 @@ import base64
 from ai_analyzer import AIAnalyzer
 import json
 from theme_analyzer import ThemeAnalyzer
+from app.utils.document_classifier import classify_document
 
 
 @dataclass
@@ -191,21 +192,7 @@ class ReportGenerator:
 
     def _detect_document_type(self, content: str) -> str:
         """Detect the type of document based on content"""
-        # Simple heuristic-based detection
-        content_lower = content.lower()
-
-        if any(word in content_lower for word in ['invoice', 'payment', 'due', 'amount']):
-            return "Invoice"
-        elif any(word in content_lower for word in ['quarterly', 'annual', 'revenue', 'profit']):
-            return "Financial Report"
-        elif any(word in content_lower for word in ['slide', 'presentation', 'powerpoint']):
-            return "Presentation"
-        elif any(word in content_lower for word in ['agent:', 'customer:', 'support:']):
-            return "Chat Transcript"
-        elif any(word in content_lower for word in ['sales', 'revenue', 'target', 'quota']):
-            return "Sales Report"
-        else:
-            return "General Document"
+        return classify_document(content).document_type
 
     def _prepare_chart_data(self, data_points: list) -> dict:
         """Prepare data for chart visualization"""
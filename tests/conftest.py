@@ -0,0 +1,14 @@
+"""
+Shared test setup.
+
+The environment is set before the application is imported: configuration is
+read at import time.
+"""
+import os
+
+os.environ.setdefault('TRENDLYZER_WARMUP', '0')
+os.environ.setdefault('TRENDLYZER_REUSE_ANALYSES', '0')
+os.environ.setdefault('TRENDLYZER_CPU_WORKERS', '1')
+os.environ.setdefault('OPENROUTER_API_KEY', 'test')
+# Never send report emails from tests
+os.environ.pop('RECEIVER_MAIL', None)
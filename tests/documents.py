@@ -0,0 +1,63 @@
+"""
+Builders for small office documents used by the extraction tests.
+"""
+import io
+
+import docx
+from openpyxl import Workbook
+from pptx import Presentation
+from pptx.util import Inches
+
+
+def make_docx() -> io.BytesIO:
+    document = docx.Document()
+    document.add_heading('Quarterly review', level=1)
+    document.add_paragraph('Revenue grew ').add_run('12%').bold = True
+    document.add_paragraph('')
+    paragraph = document.add_paragraph('Tab\tseparated')
+    paragraph.add_run().add_break()
+    paragraph.add_run('second line')
+    table = document.add_table(rows=2, cols=2)
+    for row, values in zip(table.rows, (('Region', 'Sales'), ('EMEA', '42'))):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    document.add_paragraph('Closing remarks')
+    stream = io.BytesIO()
+    document.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def make_pptx() -> io.BytesIO:
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = 'Customer feedback'
+    slide.placeholders[1].text = 'Faster delivery\nBetter support'
+    slide.notes_slide.notes_text_frame.text = 'Mention the survey size'
+    presentation.slides.add_slide(presentation.slide_layouts[6])  # blank
+    slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+    slide.shapes.title.text = 'Numbers'
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(4), Inches(1)).table
+    for row, values in enumerate((('Quarter', 'NPS'), ('Q1', '41'))):
+        for column, value in enumerate(values):
+            table.cell(row, column).text = value
+    box = slide.shapes.add_textbox(Inches(1), Inches(4), Inches(4), Inches(1))
+    box.text_frame.text = 'Up from 35'
+    stream = io.BytesIO()
+    presentation.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def make_xlsx(rows: int = 3) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Leads'
+    sheet.append(['Name', 'Email', 'Score'])
+    for number in range(1, rows + 1):
+        sheet.append([f'Lead {number}', f'lead{number}@example.com', number * 10])
+    workbook.create_sheet('Empty')
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return stream
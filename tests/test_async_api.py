@@ -0,0 +1,100 @@
+"""
+Tests for the ASGI ``/api/analyze`` route.
+"""
+import io
+import json
+import os
+import signal
+import time
+
+import pytest
+from starlette.testclient import TestClient
+
+from benchmarks.bench_json_parse import SAMPLE_ANALYSIS
+from app.routes.async_api import create_asgi_app
+from app.services import async_pipeline
+
+DOCUMENT = (
+    "Customer: Hi, I would like to know the price of your consultation service.\n"
+    "Agent: Sure, please leave your email and phone so we can schedule a meeting.\n"
+    "Customer: My email is jane@example.com and my phone is +1 555 123 4567.\n"
+) * 20
+
+
+@pytest.fixture(scope='module')
+def client():
+    with TestClient(create_asgi_app()) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(monkeypatch):
+    calls = []
+
+    async def call_openai_async(client, user_content, system_content):
+        calls.append(user_content)
+        return json.dumps(SAMPLE_ANALYSIS)
+
+    monkeypatch.setattr(async_pipeline, 'call_openai_async', call_openai_async)
+    return calls
+
+
+def upload(client, name='chat.txt', data=DOCUMENT.encode('utf-8'), **form):
+    form.setdefault('company_name', 'Example Corp')
+    return client.post('/api/analyze', data=form,
+                       files={'file': (name, io.BytesIO(data), 'text/plain')})
+
+
+def test_json_mode_returns_analysis_without_report(client, fake_llm):
+    response = upload(client, response_format='json')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['report_url'] is None
+    assert body['company_name'] == 'Example Corp'
+    assert body['overview']
+    assert 'metrics' in body
+    assert len(body['upload_sha256']) == 64
+    assert len(fake_llm) == 1
+
+
+def test_pdf_mode_returns_report_url(client):
+    response = upload(client)
+    assert response.status_code == 200
+    assert response.json()['report_url'].startswith('http://testserver/')
+
+
+def test_bad_extension_is_rejected(client, fake_llm):
+    response = upload(client, name='payload.exe')
+    assert response.status_code == 400
+    assert 'Invalid file type' in response.json()['error']
+    assert fake_llm == []
+
+
+def test_non_multipart_body_is_rejected(client):
+    response = client.post('/api/analyze', content=b'{"file": "x"}',
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+    assert 'multipart/form-data' in response.json()['error']
+
+
+def test_missing_file_is_rejected(client):
+    response = client.post('/api/analyze', data={'company_name': 'Example Corp'},
+                           files={'other': ('a.txt', io.BytesIO(b'x'), 'text/plain')})
+    assert response.status_code == 400
+    assert response.json()['error'] == 'No file provided'
+
+
+def test_broken_pool_is_replaced(client):
+    assert upload(client, response_format='json').status_code == 200
+    pool = async_pipeline.get_cpu_pool()
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    # Let the pool notice the dead worker
+    deadline = time.monotonic() + 10
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    response = upload(client, response_format='json')
+    assert response.status_code == 200
+    assert async_pipeline.get_cpu_pool() is not pool
+    assert upload(client, response_format='json').status_code == 200
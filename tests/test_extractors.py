@@ -0,0 +1,81 @@
+"""
+Tests for the chunk-yielding extractor registry.
+"""
+import io
+
+import pytest
+from fpdf import FPDF
+
+from app.services import extractors
+from app.services.extractors import (
+    ROWS_PER_CHUNK, extract_text, iter_chunks, register_extractor, supported_extensions
+)
+from app.config.config import ALLOWED_EXTENSIONS
+from tests.documents import make_docx, make_xlsx
+
+
+def make_pdf(*pages: str) -> io.BytesIO:
+    pdf = FPDF()
+    pdf.set_font('helvetica', size=12)
+    for text in pages:
+        pdf.add_page()
+        pdf.cell(0, 10, text)
+    return io.BytesIO(bytes(pdf.output()))
+
+
+def test_every_allowed_extension_has_an_extractor():
+    assert ALLOWED_EXTENSIONS <= supported_extensions()
+
+
+def test_unknown_extension_raises():
+    with pytest.raises(ValueError, match='Unsupported file type'):
+        extract_text(io.BytesIO(b''), 'exe')
+
+
+def test_text_chunks_carry_offsets(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes('café menu\n'.encode('latin-1'))
+    chunks = list(iter_chunks(str(path), 'txt'))
+    assert ''.join(chunk.text for chunk in chunks) == 'café menu\n'
+    assert chunks[0].unit == 'text' and chunks[0].index == 0
+
+
+def test_pdf_pages_are_joined_with_spaces():
+    chunks = list(iter_chunks(make_pdf('First page', 'Second page'), 'pdf'))
+    assert [(chunk.unit, chunk.index) for chunk in chunks] == [('page', 1), ('page', 2)]
+    assert extract_text(make_pdf('First page', 'Second page'), 'pdf') == 'First page Second page'
+
+
+def test_docx_paragraphs_then_table_rows():
+    chunks = list(iter_chunks(make_docx(), 'docx'))
+    paragraphs = [chunk.text for chunk in chunks if chunk.unit == 'paragraph']
+    rows = [(chunk.text, chunk.index, chunk.label) for chunk in chunks if chunk.unit == 'table_row']
+    assert paragraphs[:2] == ['Quarterly review', 'Revenue grew 12%']
+    assert paragraphs[-1] == 'Closing remarks'
+    assert rows == [('Region\tSales', 1, 'table 1'), ('EMEA\t42', 2, 'table 1')]
+
+
+def test_xlsx_rows_are_chunked_per_sheet():
+    rows = ROWS_PER_CHUNK + 10
+    chunks = list(iter_chunks(make_xlsx(rows), 'xlsx'))
+    assert [(chunk.unit, chunk.index, chunk.label) for chunk in chunks] == [
+        ('rows', 1, 'Leads'), ('rows', ROWS_PER_CHUNK + 1, 'Leads')]
+    assert chunks[0].text.split('\n')[1] == 'Lead 1\tlead1@example.com\t10'
+
+
+def test_max_chars_stops_early_and_closes_the_generator():
+    closed = []
+
+    @register_extractor('test-chunks', separator='')
+    def _chunks(source):
+        try:
+            for number in range(1000):
+                yield extractors.Chunk('x' * 10, 'text', number * 10)
+        finally:
+            closed.append(True)
+
+    try:
+        assert extract_text(None, 'test-chunks', max_chars=25) == 'x' * 25
+        assert closed == [True]
+    finally:
+        del extractors._EXTRACTORS['test-chunks']
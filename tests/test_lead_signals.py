@@ -0,0 +1,74 @@
+"""
+Tests for the linear-time email and phone scanners.
+"""
+import random
+import re
+import time
+
+import pytest
+
+from app.utils.lead_signals import contains_email, contains_phone, find_email, find_phone
+from benchmarks.bench_lead_signals import (
+    ADVERSARIAL, LEGACY_EMAIL, ORDINARY_MESSAGES, legacy_contains_phone
+)
+
+
+@pytest.mark.parametrize('message, has_email, has_phone', ORDINARY_MESSAGES)
+def test_ordinary_messages(message, has_email, has_phone):
+    assert contains_email(message) is has_email
+    assert contains_phone(message) is has_phone
+
+
+@pytest.mark.parametrize('message, has_email, has_phone', ORDINARY_MESSAGES)
+def test_agrees_with_legacy_regexes_on_ordinary_messages(message, has_email, has_phone):
+    assert contains_email(message) == bool(LEGACY_EMAIL.search(message))
+    assert contains_phone(message) == legacy_contains_phone(message)
+
+
+def test_email_matches_legacy_regex_on_random_text():
+    rng = random.Random(42)
+    alphabet = 'ab1.-_+%@ xZ'
+    for _ in range(20000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert contains_email(text) == bool(LEGACY_EMAIL.search(text)), text
+
+
+def test_find_email_returns_the_address():
+    assert find_email('write to jane.doe+sales@example.co.uk today') == 'jane.doe+sales@example.co.uk'
+    assert find_email('a@b@c.de') == 'b@c.de'
+    assert find_email('no address @ here.') is None
+
+
+@pytest.mark.parametrize('text, phone', [
+    ('Call +1 555 123 4567', '+1 555 123 4567'),
+    ('Phone: (555) 123-4567.', '(555) 123-4567'),
+    ('mobile 0412345678', '0412345678'),
+])
+def test_find_phone_returns_the_number(text, phone):
+    assert find_phone(text) == phone
+
+
+@pytest.mark.parametrize('text', [
+    '1 2 3 4 5 6 7 8 9',  # table of small numbers
+    'version 1.2.3.4.5',
+    'on 2024-05-17 at 10.30',
+])
+def test_not_phone_numbers(text):
+    assert not contains_phone(text)
+
+
+def test_long_order_numbers_are_no_longer_phones():
+    # Intended difference: more digits than E.164 allows
+    text = 'Order 1234567890123456789 shipped'
+    assert legacy_contains_phone(text)
+    assert not contains_phone(text)
+
+
+@pytest.mark.parametrize('name', sorted(ADVERSARIAL))
+def test_adversarial_input_is_fast(name):
+    message = ADVERSARIAL[name](100_000)
+    started = time.perf_counter()
+    contains_email(message)
+    contains_phone(message)
+    # Linear scans of 100k characters take milliseconds; the old regexes took minutes
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,138 @@
+"""
+Tests for the asyncio side of the LLM governor and hedger.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services.llm_governor import GovernorTimeout, LLMGovernor
+from app.services.llm_hedging import HedgedCaller
+
+
+def test_threads_and_coroutines_share_the_limit():
+    governor = LLMGovernor(initial_limit=1)
+    admitted = []
+
+    async def waiter():
+        async with governor.admit_async():
+            admitted.append('coroutine')
+
+    async def main():
+        held = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with governor.admit():
+                held.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        await asyncio.to_thread(held.wait, 5)
+        task = asyncio.ensure_future(waiter())
+        await asyncio.sleep(0.05)
+        assert governor.stats()['queued'] == 1
+        assert admitted == []
+        release.set()
+        await asyncio.wait_for(task, 5)
+        thread.join(5)
+
+    asyncio.run(main())
+    assert admitted == ['coroutine']
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    governor = LLMGovernor(initial_limit=1)
+
+    async def main():
+        async with governor.admit_async():
+            task = asyncio.ensure_future(governor.execute_async(lambda: asyncio.sleep(0)))
+            await asyncio.sleep(0.01)
+            assert governor.stats()['queued'] == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert governor.stats()['queued'] == 0
+
+    asyncio.run(main())
+    assert governor.stats()['in_flight'] == 0
+
+
+def test_async_queue_timeout():
+    governor = LLMGovernor(initial_limit=1, queue_timeout=0.05)
+
+    async def main():
+        async with governor.admit_async():
+            with pytest.raises(GovernorTimeout):
+                async with governor.admit_async():
+                    pass
+
+    asyncio.run(main())
+    assert governor.stats()['queue_timeouts'] == 1
+
+
+def test_coalesced_coroutines_share_one_result():
+    governor = LLMGovernor()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return object()
+
+    async def main():
+        return await asyncio.gather(*(governor.call_async('key', fn) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert len({id(result) for result in results}) == 1
+    assert governor.stats()['coalesced'] == 3
+
+
+def test_coalesced_coroutines_share_one_error():
+    governor = LLMGovernor()
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        raise ValueError('upstream failed')
+
+    async def main():
+        return await asyncio.gather(*(governor.coalesce_async('key', fn) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+
+
+def test_losing_async_attempt_is_cancelled_not_failed():
+    governor = LLMGovernor(initial_limit=4)
+    caller = HedgedCaller(['primary', 'fallback'], default_hedge_delay=0.05, min_hedge_delay=0.0,
+                          min_samples=1000, max_attempts=2, total_timeout=5.0, governor=governor)
+    requests = []
+
+    async def request(model):
+        requests.append(model)
+        await asyncio.sleep(10 if model == 'primary' else 0)
+        return f'answer from {model}'
+
+    def attempt(model, guarded):
+        return governor.execute_async(lambda: guarded(lambda: request(model)))
+
+    async def main():
+        result = await caller.call_async(attempt)
+        # Let the cancelled primary unwind
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(main()) == 'answer from fallback'
+    assert requests == ['primary', 'fallback']
+    stats = caller.stats()
+    assert stats['hedge_wins'] == 1
+    assert stats['cancelled_attempts'] == 1
+    assert stats['failed_attempts'] == 0
+    governor_stats = governor.stats()
+    assert governor_stats['failed'] == 0
+    assert governor_stats['in_flight'] == 0
@@ -0,0 +1,198 @@
+"""
+Tests for the LLM governor: adaptive limit, FIFO admission and coalescing.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import llm_governor as governor_module
+from app.services.llm_governor import GovernorTimeout, LLMGovernor
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+class Clock:
+    """Monotonic clock that only moves when a fake call takes time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(governor_module.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(governor_module.time, 'sleep', clock.sleep)
+    return clock
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+
+
+def test_limit_grows_while_latency_is_steady(clock):
+    governor = LLMGovernor(initial_limit=2, max_limit=4)
+
+    def call():
+        clock.now += 1.0
+        return 'ok'
+
+    for _ in range(10):
+        assert governor.execute(call) == 'ok'
+    stats = governor.stats()
+    assert stats['limit'] == 4
+    assert stats['succeeded'] == 10
+    assert stats['in_flight'] == 0
+
+
+def test_limit_shrinks_on_degraded_latency(clock):
+    governor = LLMGovernor(initial_limit=8, latency_tolerance=2.0)
+    for latency in (1.0, 10.0, 10.0, 10.0):
+        governor.execute(lambda: clock.sleep(latency))
+    assert governor.limit < 8
+
+
+def test_throttle_halves_limit_and_retries(clock):
+    governor = LLMGovernor(initial_limit=8, min_limit=1, max_throttle_retries=3)
+    responses = [Throttled(), Throttled(), 'ok']
+
+    def call():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert governor.execute(call) == 'ok'
+    stats = governor.stats()
+    assert stats['throttled'] == 2
+    assert stats['failed'] == 0
+    # Halved twice, then grown by 1/limit on the success
+    assert stats['limit'] == 2
+
+
+def test_throttle_out_of_retries_is_raised_and_counted(clock):
+    governor = LLMGovernor(initial_limit=4, max_throttle_retries=1)
+
+    def call():
+        raise Throttled()
+
+    with pytest.raises(Throttled):
+        governor.execute(call)
+    stats = governor.stats()
+    assert stats['throttled'] == 2
+    assert stats['failed'] == 1
+    assert stats['limit'] == 1
+
+
+def test_other_errors_are_not_retried():
+    governor = LLMGovernor()
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError('bad request')
+
+    with pytest.raises(ValueError):
+        governor.execute(call)
+    assert len(calls) == 1
+    assert governor.stats()['failed'] == 1
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    governor = LLMGovernor(initial_limit=1)
+    admitted = []
+
+    def waiter(number):
+        with governor.admit():
+            admitted.append(number)
+
+    threads = []
+    with governor.admit():
+        for number in range(5):
+            thread = threading.Thread(target=waiter, args=(number,))
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: governor.stats()['queued'] == number + 1)
+    for thread in threads:
+        thread.join(5)
+    assert admitted == [0, 1, 2, 3, 4]
+    assert governor.stats()['admitted'] == 6
+
+
+def test_queue_timeout():
+    governor = LLMGovernor(initial_limit=1, queue_timeout=0.05)
+    with governor.admit():
+        with pytest.raises(GovernorTimeout):
+            with governor.admit():
+                pass
+    stats = governor.stats()
+    assert stats['queue_timeouts'] == 1
+    assert stats['queued'] == 0
+    assert stats['in_flight'] == 0
+
+
+def _coalesce_concurrently(governor, fn, callers=4):
+    """Run ``callers`` threads coalescing on one key; the leader runs ``fn``."""
+    outcomes = [None] * callers
+
+    def run(index):
+        try:
+            outcomes[index] = ('result', governor.coalesce('key', fn))
+        except Exception as e:
+            outcomes[index] = ('error', e)
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_coalesced_callers_share_one_result():
+    governor = LLMGovernor()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads, outcomes = _coalesce_concurrently(governor, fn)
+    wait_until(lambda: governor.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert {kind for kind, _ in outcomes} == {'result'}
+    assert len({id(value) for _, value in outcomes}) == 1
+
+
+def test_coalesced_callers_share_one_error():
+    governor = LLMGovernor()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError('upstream failed')
+
+    threads, outcomes = _coalesce_concurrently(governor, fn)
+    wait_until(lambda: governor.stats()['coalesced'] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert {kind for kind, _ in outcomes} == {'error'}
+    assert len({id(error) for _, error in outcomes}) == 1
+    # The key is free again once the call is over
+    assert governor.coalesce('key', lambda: 'next') == 'next'
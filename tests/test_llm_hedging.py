@@ -0,0 +1,132 @@
+"""
+Tests for hedged LLM calls and model fallback.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.llm_governor import LLMGovernor
+from app.services.llm_hedging import HedgedCaller, HedgeTimeout
+
+
+def make_caller(governor=None, **kwargs):
+    options = dict(default_hedge_delay=0.05, min_hedge_delay=0.0, min_samples=1000,
+                   max_attempts=2, total_timeout=5.0, governor=governor)
+    options.update(kwargs)
+    return HedgedCaller(['primary', 'fallback'], **options)
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+
+
+class Upstream:
+    """Fake upstream: 'primary' blocks until released, other models answer at once."""
+
+    def __init__(self, governor: LLMGovernor):
+        self.governor = governor
+        self.release = threading.Event()
+        self.requests = []
+
+    def request(self, model):
+        self.requests.append(model)
+        if model == 'primary':
+            self.release.wait(5)
+        return f'answer from {model}'
+
+    def attempt(self, model, guarded):
+        return self.governor.execute(lambda: guarded(lambda: self.request(model)))
+
+
+def test_fast_primary_is_not_hedged():
+    governor = LLMGovernor(initial_limit=4)
+    upstream = Upstream(governor)
+    upstream.release.set()
+    caller = make_caller(governor)
+    assert caller.call(upstream.attempt) == 'answer from primary'
+    assert upstream.requests == ['primary']
+    assert caller.stats()['hedged_calls'] == 0
+
+
+def test_losing_attempt_is_not_counted_as_failed():
+    governor = LLMGovernor(initial_limit=4)
+    upstream = Upstream(governor)
+    caller = make_caller(governor)
+    assert caller.call(upstream.attempt) == 'answer from fallback'
+
+    upstream.release.set()
+    wait_until(lambda: governor.stats()['in_flight'] == 0)
+    stats = caller.stats()
+    assert stats['hedged_calls'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['failed_attempts'] == 0
+    assert governor.stats()['failed'] == 0
+
+
+def test_no_hedge_while_governor_is_full():
+    governor = LLMGovernor(initial_limit=1)
+    upstream = Upstream(governor)
+    caller = make_caller(governor)
+    timer = threading.Timer(0.3, upstream.release.set)
+    timer.start()
+    assert caller.call(upstream.attempt) == 'answer from primary'
+    timer.join()
+    assert upstream.requests == ['primary']
+    assert caller.stats()['hedged_calls'] == 0
+
+
+def test_queued_hedge_is_cancelled_after_the_call_is_decided():
+    # The hedger does not consult the governor, so a hedge queues for the
+    # only slot; it must not reach the upstream once the primary has won
+    governor = LLMGovernor(initial_limit=1)
+    upstream = Upstream(governor)
+    caller = make_caller()
+    timer = threading.Timer(0.3, upstream.release.set)
+    timer.start()
+    assert caller.call(upstream.attempt) == 'answer from primary'
+    timer.join()
+
+    wait_until(lambda: caller.stats()['cancelled_attempts'] == 1)
+    assert caller.stats()['hedged_calls'] == 1
+    assert upstream.requests == ['primary']
+    assert caller.stats()['failed_attempts'] == 0
+    assert governor.stats()['failed'] == 0
+
+
+def test_failed_attempt_falls_back_to_next_model():
+    caller = make_caller(default_hedge_delay=10.0)
+
+    def attempt(model, guarded):
+        if model == 'primary':
+            raise ConnectionError('upstream down')
+        return guarded(lambda: f'answer from {model}')
+
+    assert caller.call(attempt) == 'answer from fallback'
+    stats = caller.stats()
+    assert stats['failed_attempts'] == 1
+    assert stats['fallback_wins'] == 1
+
+
+def test_invalid_responses_raise_the_last_error():
+    caller = make_caller(default_hedge_delay=10.0)
+    with pytest.raises(ValueError, match='Invalid LLM response'):
+        caller.call(lambda model, guarded: guarded(lambda: ''))
+    assert caller.stats()['failed_attempts'] == 2
+
+
+def test_total_timeout():
+    release = threading.Event()
+    caller = make_caller(default_hedge_delay=10.0, total_timeout=0.1)
+    with pytest.raises(HedgeTimeout):
+        caller.call(lambda model, guarded: guarded(lambda: release.wait(5)))
+    release.set()
+    assert caller.stats()['timeouts'] == 1
+
+
+def test_thread_pool_fits_every_admissible_attempt():
+    caller = make_caller(LLMGovernor(max_limit=8), max_attempts=3)
+    assert caller._executor._max_workers == 24
@@ -0,0 +1,87 @@
+"""
+Tests for the per-request memory budget.
+"""
+import io
+import zipfile
+
+import pytest
+
+from app.services import memory_guard as memory_guard_module
+from app.services.memory_guard import MB, MemoryBudgetExceeded, MemoryGuard, ooxml_text_bytes
+
+
+def make_guard(**kwargs):
+    return MemoryGuard(budget_bytes=100 * MB, expansion={'txt': 10, 'docx': 250, 'xls': 100},
+                       text_part_expansion={'docx': 25}, bytes_per_char=16,
+                       sample_interval=60, **kwargs)
+
+
+def make_docx(document_xml: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('word/document.xml', document_xml)
+        package.writestr('word/media/image1.png', b'\0' * 1000)
+    return buffer.getvalue()
+
+
+def test_ooxml_text_bytes_reads_uncompressed_size():
+    data = make_docx(b'<w:t>hello</w:t>' * 1000)
+    stream = io.BytesIO(data)
+    stream.seek(5)
+    assert ooxml_text_bytes(stream, 'docx') == 16000
+    assert stream.tell() == 5
+    assert ooxml_text_bytes(data, 'docx') == 16000
+    assert ooxml_text_bytes(b'not a zip', 'docx') is None
+    assert ooxml_text_bytes(data, 'pdf') is None
+
+
+def test_docx_estimate_uses_document_xml():
+    guard = make_guard()
+    data = make_docx(b'<w:t>hello</w:t>' * 1000)
+    # 2 MB of compressed upload would be 500 MB by upload size alone
+    plan = guard.plan(2 * MB, 'docx', io.BytesIO(data))
+    assert plan == (16000 * 25, None)
+
+
+def test_format_without_partial_read_is_read_in_full():
+    guard = make_guard()
+    plan = guard.plan(5 * MB, 'xls')
+    assert plan.estimate > guard.budget_bytes
+    assert plan.max_chars is None
+    assert guard.stats()['over_budget'] == 1
+
+
+def test_streamable_format_over_budget_is_sampled():
+    guard = make_guard()
+    plan = guard.plan(20 * MB, 'txt')
+    assert plan.max_chars == 100 * MB // 16
+    assert guard.stats()['sampled'] == 1
+
+
+@pytest.fixture
+def rss(monkeypatch):
+    value = [500 * MB]
+    monkeypatch.setattr(memory_guard_module, 'current_rss', lambda: value[0])
+    return value
+
+
+def test_growth_over_budget_is_only_reported_by_default(rss):
+    guard = make_guard()
+    with guard.track('upload') as request:
+        with request.stage('extract'):
+            rss[0] += 300 * MB
+        with request.stage('analysis'):
+            pass
+    assert guard.stats()['aborted'] == 0
+    assert request.summary()['stages'][0]['retained_mb'] == 300
+
+
+def test_growth_over_budget_aborts_when_enabled(rss):
+    guard = make_guard(abort_over_budget=True)
+    with guard.track('upload') as request:
+        with request.stage('extract'):
+            rss[0] += 300 * MB
+        with pytest.raises(MemoryBudgetExceeded):
+            with request.stage('analysis'):
+                pass
+    assert guard.stats()['aborted'] == 1
@@ -0,0 +1,122 @@
+"""
+Tests for the lxml DOCX/PPTX fast path against python-docx/python-pptx.
+"""
+import io
+import zipfile
+
+import pytest
+
+from app.services import extractors
+from app.services.extractors import extract_text, iter_chunks
+from app.services.ooxml_text import OOXMLError, docx_chunks, pptx_chunks
+from tests.documents import make_docx, make_pptx
+
+
+def library_text(make, extension, monkeypatch):
+    monkeypatch.setitem(extractors.EXTRACTION_CONFIG, 'ooxml_fast_path', False)
+    text = extract_text(make(), extension)
+    monkeypatch.setitem(extractors.EXTRACTION_CONFIG, 'ooxml_fast_path', True)
+    return text
+
+
+def test_docx_fast_path_matches_library(monkeypatch):
+    expected = library_text(make_docx, 'docx', monkeypatch)
+    fast = extract_text(make_docx(), 'docx')
+    assert 'Tab\tseparated\nsecond line' in fast
+    # Same text; the fast path keeps tables in document order where the
+    # library lists them after all paragraphs
+    assert sorted(fast.split('\n')) == sorted(expected.split('\n'))
+    assert fast.index('EMEA\t42') < fast.index('Closing remarks')
+
+
+def test_docx_chunks_match_library_positions(monkeypatch):
+    monkeypatch.setitem(extractors.EXTRACTION_CONFIG, 'ooxml_fast_path', False)
+    library = [tuple(chunk) for chunk in iter_chunks(make_docx(), 'docx')]
+    assert sorted(docx_chunks(make_docx()), key=str) == sorted(library, key=str)
+
+
+def test_pptx_fast_path_matches_library(monkeypatch):
+    expected = library_text(make_pptx, 'pptx', monkeypatch)
+    chunks = list(pptx_chunks(make_pptx()))
+    assert [(unit, index) for _, unit, index, _ in chunks] == [('slide', 1), ('notes', 1), ('slide', 3)]
+    assert chunks[1][0] == 'Mention the survey size'
+    # Everything the library reads, plus table cells, which python-pptx
+    # shapes do not expose as text
+    fast = extract_text(make_pptx(), 'pptx').split('\n')
+    assert set(expected.split('\n')) <= set(fast)
+    assert set(fast) - set(expected.split('\n')) == {'Quarter', 'NPS', 'Q1', '41'}
+
+
+def test_fast_path_reads_from_a_path(tmp_path):
+    path = tmp_path / 'report.docx'
+    path.write_bytes(make_docx().getvalue())
+    assert next(docx_chunks(str(path)))[0] == 'Quarterly review'
+
+
+@pytest.mark.parametrize('data', [b'not a zip', b''])
+def test_not_a_package_raises_ooxml_error(data):
+    with pytest.raises(OOXMLError):
+        next(docx_chunks(io.BytesIO(data)))
+
+
+def test_missing_main_part_falls_back_to_library(monkeypatch):
+    stream = io.BytesIO()
+    with zipfile.ZipFile(make_docx()) as source, zipfile.ZipFile(stream, 'w') as target:
+        for item in source.infolist():
+            if item.filename != '_rels/.rels':
+                target.writestr(item, source.read(item))
+    with pytest.raises(OOXMLError):
+        next(docx_chunks(io.BytesIO(stream.getvalue())))
+
+    def library(source):
+        assert source.tell() == 0
+        yield extractors.Chunk('from the library', 'paragraph', 1)
+
+    monkeypatch.setattr(extractors, '_docx_library_chunks', library)
+    assert extract_text(io.BytesIO(stream.getvalue()), 'docx') == 'from the library'
+
+
+def replace_part(stream, name, make_data) -> io.BytesIO:
+    """Copy a package with one part rewritten by ``make_data(original)``."""
+    result = io.BytesIO()
+    with zipfile.ZipFile(stream) as source, zipfile.ZipFile(result, 'w') as target:
+        for item in source.infolist():
+            data = source.read(item)
+            target.writestr(item, make_data(data) if item.filename == name else data)
+    result.seek(0)
+    return result
+
+
+def fake_library(source):
+    for number in range(1, 4):
+        yield extractors.Chunk(f'library {number}', 'paragraph', number)
+
+
+def test_malformed_document_xml_falls_back_to_library(monkeypatch):
+    def broken():
+        return replace_part(make_docx(), 'word/document.xml', lambda data: b'<w:document')
+
+    with pytest.raises(OOXMLError):
+        next(docx_chunks(broken()))
+    monkeypatch.setattr(extractors, '_docx_library_chunks', fake_library)
+    assert extract_text(broken(), 'docx') == 'library 1\nlibrary 2\nlibrary 3'
+
+
+def test_malformed_xml_part_way_resumes_with_library(monkeypatch):
+    # Cut the document off after its first paragraph
+    def truncated():
+        return replace_part(make_docx(), 'word/document.xml',
+                            lambda data: data[:data.index(b'</w:p>') + len(b'</w:p>')])
+
+    chunks = docx_chunks(truncated())
+    assert next(chunks)[0] == 'Quarterly review'
+    with pytest.raises(OOXMLError):
+        next(chunks)
+    monkeypatch.setattr(extractors, '_docx_library_chunks', fake_library)
+    assert extract_text(truncated(), 'docx') == 'Quarterly review\nlibrary 2\nlibrary 3'
+
+
+def test_malformed_slide_raises_ooxml_error():
+    stream = replace_part(make_pptx(), 'ppt/slides/slide2.xml', lambda data: data[:-20])
+    with pytest.raises(OOXMLError):
+        list(pptx_chunks(stream))
@@ -0,0 +1,30 @@
+"""
+Tests for the server-side result store.
+"""
+from app.services import result_store as result_store_module
+from app.services.result_store import ResultStore
+
+
+def test_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60)
+    results = {'company_name': 'Example Corp', 'key_topics': [{'topic': 'Pricing', 'coverage_pct': 40.0}]}
+    result_id = store.put(results)
+    assert store.get(result_id) == results
+    assert store.get('unknown') is None
+
+
+def test_ids_are_opaque_and_unique(tmp_path):
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60)
+    ids = {store.put({'n': n}) for n in range(50)}
+    assert len(ids) == 50
+    assert all(len(result_id) >= 16 for result_id in ids)
+
+
+def test_expired_results_are_hidden_and_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_store_module.time, 'time', lambda: now[0])
+    store = ResultStore(str(tmp_path / 'results.sqlite3'), ttl_seconds=60)
+    result_id = store.put({'n': 1})
+    now[0] += 61
+    assert store.get(result_id) is None
+    assert store.purge_expired() == 1
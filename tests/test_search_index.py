@@ -0,0 +1,95 @@
+"""
+Tests for the full-text search index.
+"""
+import sqlite3
+
+import pytest
+
+from app.services.search_index import SearchIndex, summary_fields, to_match_query
+
+ANALYSIS = {
+    'document_type': 'Chat Transcript',
+    'executive_summary': 'Customers ask about pricing and refunds.',
+    'key_topics': [{'topic': 'Pricing', 'coverage_pct': 40}],
+    'themes': [{'phrase': 'Refund requests', 'weight': 0.6}],
+    'recommendations': [{'text': 'Publish a price list'}],
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / 'search.sqlite3'), ttl_seconds=60, flush_interval=60)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('globex complaint*', '"globex" "complaint"*'),
+    ('"unbalanced', '"unbalanced"'),
+    ('a OR b NOT c', '"a" "OR" "b" "NOT" "c"'),
+    ('col:umn (x) ^y', '"col" "umn" "x" "y"'),
+    ('*', ''),
+    ('', ''),
+])
+def test_to_match_query_quotes_every_term(query, expected):
+    assert to_match_query(query) == expected
+
+
+def test_summary_fields():
+    topics, summary = summary_fields(ANALYSIS)
+    assert topics.split('\n') == ['Chat Transcript', 'Pricing', 'Refund requests']
+    assert 'Publish a price list' in summary
+    assert summary_fields(None) == ('', '')
+
+
+def test_search_finds_queued_and_flushed_documents(index):
+    index.add('Acme', 'chats.txt', 'The customer wanted a refund for the late delivery.', ANALYSIS)
+    index.add('Globex', 'notes.txt', 'Quarterly revenue grew in every region.', {})
+    # Searching flushes what is still queued
+    results = index.search('refund deliv*', 'Acme')
+    assert [r['filename'] for r in results] == ['chats.txt']
+    assert results[0]['company_name'] == 'Acme'
+    assert '[' in results[0]['snippet']
+    assert index.search('revenue', 'Acme') == []
+    assert [r['filename'] for r in index.search('revenue', 'globex')] == ['notes.txt']
+
+
+def test_reupload_replaces_the_earlier_entry(index):
+    index.add('Acme', 'chats.txt', 'The customer wanted a refund.', ANALYSIS)
+    index.flush()
+    index.add('Acme', 'chats-again.txt', 'The customer wanted a refund.', ANALYSIS)
+    index.add('Globex', 'chats.txt', 'The customer wanted a refund.', ANALYSIS)
+    assert [r['filename'] for r in index.search('refund', 'Acme')] == ['chats-again.txt']
+    assert [r['filename'] for r in index.search('refund', 'Globex')] == ['chats.txt']
+
+
+@pytest.mark.parametrize('query', ['"', 'NEAR(', 'a AND', '-x', 'x:y:z', '***'])
+def test_operator_input_does_not_raise(index, query):
+    index.add('Acme', 'chats.txt', 'text', {})
+    assert isinstance(index.search(query, 'Acme'), list)
+
+
+def test_summary_matches_rank_above_body_matches(index):
+    index.add('Acme', 'body.txt', 'pricing ' + 'filler ' * 50, {})
+    index.add('Acme', 'summary.txt', 'filler ' * 50, ANALYSIS)
+    assert index.search('pricing', 'Acme')[0]['filename'] == 'summary.txt'
+
+
+def test_batch_flushes_at_batch_size(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'), ttl_seconds=60, batch_size=2, flush_interval=60)
+    index.add('Acme', 'a.txt', 'alpha', {})
+    assert len(index._pending) == 1
+    index.add('Acme', 'b.txt', 'beta', {})
+    assert index._pending == []
+
+
+def test_failed_flush_keeps_the_batch(index, monkeypatch):
+    index.add('Acme', 'a.txt', 'alpha', {})
+
+    def fail(batch):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(index, '_write', fail)
+    with pytest.raises(sqlite3.OperationalError):
+        index.flush()
+    assert len(index._pending) == 1
+    monkeypatch.undo()
+    assert [r['filename'] for r in index.search('alpha', 'Acme')] == ['a.txt']
@@ -0,0 +1,83 @@
+"""
+Tests for near-duplicate detection with MinHash/LSH.
+"""
+import random
+
+import pytest
+
+from app.services.similarity_index import (
+    SimilarityIndex, added_lines, content_hash, estimated_similarity, minhash_signature
+)
+
+ANALYSIS = {'executive_summary': 'Customers ask about pricing.'}
+
+
+def transcript(seed: int, lines: int = 200) -> str:
+    rng = random.Random(seed)
+    words = ['price', 'refund', 'order', 'delivery', 'agent', 'customer', 'email', 'phone',
+             'schedule', 'meeting', 'support', 'invoice', 'account', 'late', 'thanks', 'help']
+    return '\n'.join(
+        f"{rng.choice(['Customer', 'Agent'])}: " + ' '.join(rng.choice(words) for _ in range(12))
+        for _ in range(lines))
+
+
+def shingle_jaccard(first: str, second: str) -> float:
+    def shingles(text):
+        words = text.lower().replace(':', ' ').split()
+        return {tuple(words[i:i + 5]) for i in range(len(words) - 4)}
+    a, b = shingles(first), shingles(second)
+    return len(a & b) / len(a | b)
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SimilarityIndex(str(tmp_path / 'similarity.sqlite3'), ttl_seconds=60, threshold=0.85)
+
+
+def test_content_hash_ignores_case_and_whitespace():
+    assert content_hash('Hello   World\n') == content_hash('hello world')
+    assert content_hash('hello world') != content_hash('hello there')
+
+
+def test_signature_estimates_jaccard_similarity():
+    base = transcript(1)
+    edited = '\n'.join(base.splitlines()[:170] + transcript(2, 30).splitlines())
+    estimate = estimated_similarity(minhash_signature(base), minhash_signature(edited))
+    assert estimate == pytest.approx(shingle_jaccard(base, edited), abs=0.1)
+    assert estimated_similarity(minhash_signature(base), minhash_signature(base)) == 1.0
+    assert minhash_signature('  ...  ') is None
+
+
+def test_whitespace_only_change_is_an_exact_hit(index):
+    base = transcript(1)
+    index.add('Acme', base, ANALYSIS)
+    match = index.find('ACME', '  ' + base.replace('\n', '\n\n'))
+    assert match.similarity == 1.0
+    assert match.analysis == ANALYSIS
+    assert index.stats()['exact_hits'] == 1
+
+
+def test_few_added_lines_match_above_threshold(index):
+    base = transcript(1)
+    index.add('Acme', base, ANALYSIS)
+    match = index.find('Acme', base + '\n' + transcript(3, 5))
+    assert match is not None
+    assert 0.85 <= match.similarity < 1.0
+    assert match.text == base
+    assert index.stats()['similar_hits'] == 1
+
+
+def test_different_documents_and_companies_do_not_match(index):
+    base = transcript(1)
+    index.add('Acme', base, ANALYSIS)
+    assert index.find('Acme', transcript(4)) is None
+    # Half the document changed: well below the threshold
+    half = '\n'.join(base.splitlines()[:100] + transcript(5, 100).splitlines())
+    assert index.find('Acme', half) is None
+    assert index.find('Globex', base) is None
+
+
+def test_added_lines_ignore_reflowed_lines():
+    previous = 'Agent: hello\nCustomer:   hi there\n'
+    current = 'Agent:  hello\nCustomer: hi there\n\nCustomer: my email is a@b.co\n'
+    assert added_lines(previous, current) == 'Customer: my email is a@b.co'
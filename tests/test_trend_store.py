@@ -0,0 +1,54 @@
+"""
+Tests for the per-company trend store and its rollups.
+"""
+from datetime import datetime, timezone
+
+from app.models.report_metrics import ReportMetrics
+from app.services.trend_store import TrendStore, bucket_for, company_key, first_bucket, metric_values
+
+
+def timestamp(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def conversational(email_rate: float) -> ReportMetrics:
+    return ReportMetrics(
+        mode='Conversational Document', email_conversion_rate=email_rate,
+        ai_analysis={'key_topics': [{'topic': ' Pricing ', 'coverage_pct': '40'}],
+                     'themes': [{'phrase': 'Lead capture', 'weight': 0.5}, {'phrase': None}]})
+
+
+def test_buckets():
+    moment = timestamp(2025, 5, 15, 12)  # a Thursday
+    assert bucket_for(moment, 'day') == '2025-05-15'
+    assert bucket_for(moment, 'week') == '2025-05-12'
+    assert bucket_for(moment, 'month') == '2025-05'
+    assert first_bucket('month', 12, now=timestamp(2025, 1, 10)) == '2024-02'
+    assert first_bucket('week', 2, now=moment) == '2025-05-05'
+
+
+def test_metric_values():
+    values = metric_values(conversational(25.0))
+    assert values['email_conversion_rate'] == 25.0
+    assert values['topic:pricing'] == 40.0
+    assert values['theme:lead capture'] == 0.5
+    # Normal documents only contribute AI topics and themes
+    assert 'email_conversion_rate' not in metric_values(ReportMetrics())
+
+
+def test_record_and_series_round_trip(tmp_path, monkeypatch):
+    store = TrendStore(str(tmp_path / 'trends.sqlite3'))
+    monkeypatch.setattr('app.services.trend_store.time.time', lambda: timestamp(2025, 6, 20))
+    store.record('Acme', conversational(10.0), recorded_at=timestamp(2025, 5, 1))
+    store.record(' acme ', conversational(30.0), recorded_at=timestamp(2025, 5, 20))
+    store.record('ACME', conversational(50.0), recorded_at=timestamp(2025, 6, 2))
+    store.record('Globex', conversational(90.0), recorded_at=timestamp(2025, 6, 2))
+
+    assert store.series('Acme', 'email_conversion_rate', 'month', 12) == [
+        {'bucket': '2025-05', 'count': 2, 'avg': 20.0, 'min': 10.0, 'max': 30.0},
+        {'bucket': '2025-06', 'count': 1, 'avg': 50.0, 'min': 50.0, 'max': 50.0},
+    ]
+    # Only the last periods are returned
+    assert [row['bucket'] for row in store.series('acme', 'email_conversion_rate', 'month', 1)] == ['2025-06']
+    assert 'topic:pricing' in store.metrics('Acme')
+    assert company_key('  Acme   Corp ') == 'acme corp'
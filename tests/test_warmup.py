@@ -0,0 +1,34 @@
+"""
+Tests for startup warmup and the readiness probe.
+"""
+import pytest
+
+from app import create_app
+from app.services import warmup
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+def fail():
+    raise OSError('missing data')
+
+
+def test_failed_optional_step_keeps_the_app_ready(app, monkeypatch):
+    monkeypatch.setattr(warmup, 'WARMUP_STEPS', {'stopwords': lambda: None, 'matplotlib': fail})
+    state = warmup.warm_up(app)
+    assert state['ready'] is True
+    assert state['failed'] == []
+    assert state['steps']['matplotlib']['status'] == 'failed: OSError'
+    assert app.test_client().get('/readyz').status_code == 200
+
+
+def test_failed_required_step_makes_readyz_fail(app, monkeypatch):
+    monkeypatch.setattr(warmup, 'WARMUP_STEPS', {'stopwords': fail, 'matplotlib': lambda: None})
+    warmup.warm_up(app)
+    response = app.test_client().get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['ready'] is False
+    assert response.get_json()['failed'] == ['stopwords']